@@ -1,13 +1,16 @@
 import {
   RunSummaryData,
-  RunSummary,
-  ProvidersData,
-  CategoriesData,
-  QueryData,
+  DashboardData,
+  DashboardSection,
+  QueryFilters,
+  QueryPage,
   QueryRawData,
   CompareData,
   PreviewResponse,
+  PreviewQuery,
+  PreviewStreamEvent,
   SSEMessage,
+  RunStatus,
   BrandsConfig,
   TemplatesConfig,
   ConfigItem,
@@ -15,7 +18,8 @@ import {
   OnboardRequest,
   OnboardConfig,
   CompetitorsRegenerateRequest,
-  BrandEntry
+  BrandEntry,
+  OnboardJob
 } from './types';
 
 const BASE_URL = '/api';
@@ -28,17 +32,42 @@ async function fetchApi<T>(url: string, options?: RequestInit): Promise<T> {
   return response.json();
 }
 
+const JOB_POLL_MS = 500;
+
+// Onboarding runs as a background job: poll it until it finishes, reporting partial results on the way.
+async function waitForJob<T>(job: OnboardJob<T>, onProgress?: (job: OnboardJob<T>) => void): Promise<T> {
+  while (job.status !== 'done') {
+    if (job.status === 'failed') throw new Error(job.error || 'Onboarding failed');
+    onProgress?.(job);
+    await new Promise(resolve => setTimeout(resolve, JOB_POLL_MS));
+    job = await fetchApi<OnboardJob<T>>(`/onboard/jobs/${job.id}`);
+  }
+  return job.result as T;
+}
+
 export const api = {
   getRuns: () => fetchApi<RunSummaryData[]>('/runs'),
-  getRunSummary: (run: string) => fetchApi<RunSummary>(`/runs/${run}/summary`),
-  getRunProviders: (run: string) => fetchApi<ProvidersData>(`/runs/${run}/providers`),
-  getRunCategories: (run: string) => fetchApi<CategoriesData>(`/runs/${run}/categories`),
-  getRunQueries: (run: string) => fetchApi<QueryData[]>(`/runs/${run}/queries`),
+  getRunDashboard: (run: string, sections?: DashboardSection[]) => fetchApi<DashboardData>(
+    `/runs/${run}/dashboard${sections && sections.length > 0 ? `?sections=${sections.join(',')}` : ''}`
+  ),
+  getRunQueriesPage: (run: string, filters: QueryFilters = {}, cursor?: string, limit = 50, fields?: string[]) => {
+    const params = new URLSearchParams({ limit: String(limit) });
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value !== undefined && value !== '') params.set(key, String(value));
+    });
+    if (cursor) params.set('cursor', cursor);
+    if (fields && fields.length > 0) params.set('fields', fields.join(','));
+    return fetchApi<QueryPage>(`/runs/${run}/queries?${params.toString()}`);
+  },
   getQueryRaw: (run: string, id: number) => fetchApi<QueryRawData>(`/runs/${run}/queries/${id}/raw`),
   compareRuns: (a: string, b: string) => fetchApi<CompareData>(`/runs/compare?run_a=${a}&run_b=${b}`),
   getPreviewQueries: () => fetchApi<PreviewResponse>('/queries/preview'),
+  regenerateQueries: (category?: string) => fetchApi<PreviewResponse>(
+    category ? `/queries/regenerate?category=${encodeURIComponent(category)}` : '/queries/regenerate',
+    { method: 'POST' }
+  ),
   
-  startRun: (queryIds?: number[], runLabel?: string) => fetchApi<{ status: string }>('/runs/start', {
+  startRun: (queryIds?: number[], runLabel?: string) => fetchApi<{ status: RunStatus; id: string }>('/runs/start', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({
@@ -46,7 +75,10 @@ export const api = {
       run_label: runLabel?.trim() || undefined,
     })
   }),
-  stopRun: () => fetchApi<{ status: string }>('/runs/stop', { method: 'POST' }),
+  stopRun: (runId?: string) => fetchApi<{ status: string; id: string }>(
+    runId ? `/runs/stop?id=${encodeURIComponent(runId)}` : '/runs/stop',
+    { method: 'POST' }
+  ),
   
   getBrands: () => fetchApi<BrandsConfig>('/brands'),
   getBrandsRaw: () => fetchApi<Record<string, unknown>>('/brands/raw'),
@@ -63,35 +95,76 @@ export const api = {
     body: JSON.stringify(templates)
   }),
   
-  onboard: (req: OnboardRequest) => fetchApi<OnboardConfig>('/onboard', {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(req)
-  }),
-  regenerateCompetitors: (req: CompetitorsRegenerateRequest) => fetchApi<{ competitors: BrandEntry[] }>('/onboard/competitors', {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(req)
-  }),
+  onboard: async (req: OnboardRequest, onProgress?: (job: OnboardJob<OnboardConfig>) => void) => waitForJob(
+    await fetchApi<OnboardJob<OnboardConfig>>('/onboard', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(req)
+    }),
+    onProgress,
+  ),
+  regenerateCompetitors: async (req: CompetitorsRegenerateRequest) => waitForJob(
+    await fetchApi<OnboardJob<{ competitors: BrandEntry[] }>>('/onboard/competitors', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(req)
+    }),
+  ),
+  getOnboardJob: <T>(id: string) => fetchApi<OnboardJob<T>>(`/onboard/jobs/${id}`),
 
   getConfigs: () => fetchApi<ConfigItem[]>('/configs'),
   getConfig: (name: string) => fetchApi<FullConfig>(`/configs/${name}`),
   deleteConfig: (name: string) => fetchApi<{ status: string }>(`/configs/${name}`, { method: 'DELETE' }),
   activateConfig: (name: string) => fetchApi<{ status: string }>(`/configs/${name}/activate`, { method: 'POST' }),
 
-  subscribeToActiveRun: (onMessage: (msg: SSEMessage) => void, onError: (err: unknown) => void) => {
+  // Queries arrive category by category; onDone gets the final, ordered list with near-duplicates removed.
+  streamPreviewQueries: (
+    onQueries: (queries: PreviewQuery[]) => void,
+    onDone: (queries: PreviewQuery[], dropped: PreviewResponse['dropped']) => void,
+    onError: (err: unknown) => void,
+  ) => {
+    const received = new Map<number, PreviewQuery>();
+    const es = new EventSource(`${BASE_URL}/queries/preview?stream=true`);
+
+    es.onmessage = (event) => {
+      try {
+        const data = JSON.parse(event.data) as PreviewStreamEvent;
+        if ('done' in data) {
+          es.close();
+          onDone(data.ids.map(id => received.get(id)).filter((q): q is PreviewQuery => !!q), data.dropped);
+          return;
+        }
+        data.queries.forEach(q => received.set(q.id, q));
+        onQueries(Array.from(received.values()));
+      } catch (err) {
+        onError(err);
+      }
+    };
+
+    es.onerror = (err) => {
+      es.close();
+      onError(err);
+    };
+
+    return () => {
+      es.close();
+    };
+  },
+
+  subscribeToActiveRun: (onMessage: (msg: SSEMessage) => void, onError: (err: unknown) => void, runId?: string) => {
     let hasStarted = false;
-    const es = new EventSource(`${BASE_URL}/runs/active`);
+    const es = new EventSource(runId ? `${BASE_URL}/runs/active?id=${encodeURIComponent(runId)}` : `${BASE_URL}/runs/active`);
     
     es.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data) as SSEMessage;
+        const waiting = data.running || data.status === 'queued';
         
-        if (data.running) {
+        if (waiting) {
           hasStarted = true;
         }
         
-        if (hasStarted && !data.running) {
+        if (hasStarted && !waiting) {
           es.close();
         }
         
@@ -1,9 +1,9 @@
 import React, { useState, useEffect } from 'react';
-import { useQuery } from '@tanstack/react-query';
+import { useInfiniteQuery, useQuery } from '@tanstack/react-query';
 import { Target, Trophy, Search, TrendingUp, ChevronRight, Check } from 'lucide-react';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '../components/ui/select';
 import { api } from '../api';
-import { RunSummaryData, RunSummary, ProvidersData, QueryData } from '../types';
+import { RunSummaryData, DashboardData } from '../types';
 import StatCard from '../components/dashboard/StatCard';
 import Podium from '../components/dashboard/Podium';
 import Leaderboard from '../components/dashboard/Leaderboard';
@@ -25,21 +25,32 @@ export default function DashboardPage({ onOpenCompare }: { onOpenCompare: () =>
     if (runs.length > 0 && !selectedRun) setSelectedRun(runs[0].name);
   }, [runs]);
 
-  const { data: summary, isLoading: loadingSummary } = useQuery<RunSummary>({
-    queryKey: ['runSummary', selectedRun],
-    queryFn: () => api.getRunSummary(selectedRun),
+  const { data: dashboard, isLoading: loadingSummary } = useQuery<DashboardData>({
+    queryKey: ['runDashboard', selectedRun],
+    queryFn: () => api.getRunDashboard(selectedRun, ['summary', 'providers', 'categories']),
     enabled: !!selectedRun,
   });
+  const summary = dashboard?.summary;
+  const providers = dashboard?.providers;
 
-  const { data: providers } = useQuery<ProvidersData>({
-    queryKey: ['runProviders', selectedRun],
-    queryFn: () => api.getRunProviders(selectedRun),
-    enabled: !!selectedRun,
-  });
-
-  const { data: queries = [] } = useQuery<QueryData[]>({
-    queryKey: ['runQueries', selectedRun],
-    queryFn: () => api.getRunQueries(selectedRun),
+  // Query details are paged and filtered server-side, so large runs load one page at a time.
+  const {
+    data: queryPages,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = useInfiniteQuery({
+    queryKey: ['runQueries', selectedRun, catFilter, providerFilter],
+    queryFn: ({ pageParam }) => api.getRunQueriesPage(
+      selectedRun,
+      {
+        category: catFilter === "all" ? undefined : catFilter,
+        provider: providerFilter === "all" ? undefined : providerFilter,
+      },
+      pageParam,
+    ),
+    initialPageParam: undefined as string | undefined,
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined,
     enabled: !!selectedRun,
   });
 
@@ -53,12 +64,10 @@ export default function DashboardPage({ onOpenCompare }: { onOpenCompare: () =>
     : 0;
   const targetRank = summary.brands.findIndex(b => b.is_target) + 1;
 
-  const filteredQueries = queries.filter(q =>
-    (catFilter === "all" || q.category === catFilter) &&
-    (providerFilter === "all" || q.providers[providerFilter] !== undefined)
-  );
+  const filteredQueries = queryPages?.pages.flatMap(page => page.items) ?? [];
+  const matchingQueries = queryPages?.pages[0]?.total ?? 0;
 
-  const allCategories = Array.from(new Set(queries.map(q => q.category)));
+  const allCategories = dashboard?.categories?.categories ?? [];
 
   return (
     <div className="space-y-6 pb-12 animate-fade-in-up">
@@ -142,7 +151,7 @@ export default function DashboardPage({ onOpenCompare }: { onOpenCompare: () =>
           <div>
             <h2 className="font-semibold flex items-center gap-2">
               <Search size={16} className="text-accent" /> Query details
-              <span className="bg-muted text-muted-foreground text-xs px-2 py-0.5 rounded-full">{filteredQueries.length}</span>
+              <span className="bg-muted text-muted-foreground text-xs px-2 py-0.5 rounded-full">{matchingQueries}</span>
             </h2>
           </div>
           <div className="flex gap-2 w-full sm:w-auto">
@@ -248,6 +257,17 @@ export default function DashboardPage({ onOpenCompare }: { onOpenCompare: () =>
             </tbody>
           </table>
         </div>
+        {hasNextPage && (
+          <div className="px-5 py-3 border-t border-border text-center">
+            <button
+              className="text-xs font-semibold text-accent hover:underline disabled:opacity-50"
+              onClick={() => fetchNextPage()}
+              disabled={isFetchingNextPage}
+            >
+              {isFetchingNextPage ? 'Loading...' : `Load more (${filteredQueries.length} of ${matchingQueries})`}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
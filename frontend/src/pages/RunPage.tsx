@@ -1,6 +1,6 @@
 import { useState, useEffect, useCallback, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { Check, Rocket, X } from 'lucide-react';
+import { Check, RefreshCw, Rocket, X } from 'lucide-react';
 import { api } from '../api';
 import { PreviewQuery, RunSummaryData } from '../types';
 import ProviderCard from '../components/run/ProviderCard';
@@ -19,13 +19,15 @@ function sleep(ms: number) { return new Promise(r => setTimeout(r, ms)); }
 
 /* ─── Query List with fly animation ─── */
 function QueryList({
-  queries, selectedIds, onToggle, onSelectAll, onClear, flyingId, disabled
+  queries, selectedIds, onToggle, onSelectAll, onClear, onRegenerate, regenerating, flyingId, disabled
 }: {
   queries: PreviewQuery[];
   selectedIds: Set<number>;
   onToggle: (id: number) => void;
   onSelectAll: () => void;
   onClear: () => void;
+  onRegenerate?: (category?: string) => void;
+  regenerating?: boolean;
   flyingId: number | null;
   disabled?: boolean;
 }) {
@@ -45,6 +47,14 @@ function QueryList({
             className="text-xs px-3 py-1.5 rounded-md border border-border text-muted-foreground hover:text-foreground transition disabled:opacity-40">
             Clear
           </button>
+          {onRegenerate && (
+            <button onClick={() => onRegenerate(filter === 'all' ? undefined : filter)} disabled={disabled || regenerating}
+              title={filter === 'all' ? 'Generate every category afresh' : `Generate ${filter} afresh`}
+              className="text-xs px-3 py-1.5 rounded-md border border-border text-muted-foreground hover:text-foreground transition disabled:opacity-40 flex items-center gap-1.5">
+              <RefreshCw className={`w-3 h-3 ${regenerating ? 'spin-loader' : ''}`} />
+              {regenerating ? 'Regenerating…' : 'Regenerate'}
+            </button>
+          )}
         </div>
         <div className="flex items-center gap-3">
           <span className="text-xs text-muted-foreground">
@@ -161,6 +171,7 @@ export default function RunPage() {
   const [phase, setPhase] = useState<Phase>('idle');
   const [selectedIds, setSelectedIds] = useState<Set<number>>(new Set());
   const [runError, setRunError] = useState<string | null>(null);
+  const [regenerating, setRegenerating] = useState(false);
 
   // Run naming
   const [pastRuns, setPastRuns] = useState<RunSummaryData[]>([]);
@@ -186,6 +197,7 @@ export default function RunPage() {
     google: { mentions: 0, wins: 0 },
   });
   const [sseRunName, setSseRunName] = useState('');
+  const [runId, setRunId] = useState<string | undefined>(undefined);
 
   // Refs for values read inside the async simulation effect
   const queriesRef = useRef(queries);
@@ -201,10 +213,14 @@ export default function RunPage() {
 
   // Fetch queries & brand data
   useEffect(() => {
-    api.getPreviewQueries().then(res => {
-      setQueries(res.queries || []);
-      setSelectedIds(new Set(res.queries?.slice(0, 8).map(q => q.id) || []));
-    }).catch(console.error);
+    const stopPreview = api.streamPreviewQueries(
+      setQueries,
+      (finalQueries) => {
+        setQueries(finalQueries);
+        setSelectedIds(new Set(finalQueries.slice(0, 8).map(q => q.id)));
+      },
+      console.error,
+    );
 
     api.getBrandsRaw().then((data: Record<string, unknown>) => {
       const name = data?.target?.name || data?.target || '';
@@ -219,6 +235,7 @@ export default function RunPage() {
     }).catch(console.error);
 
     api.getRuns().then(setPastRuns).catch(console.error);
+    return stopPreview;
   }, []);
 
   // Runs are numbered per brand — past runs from other brands (and legacy runs
@@ -241,16 +258,32 @@ export default function RunPage() {
           setPhase('done');
         }
       },
-      () => {}
+      () => {},
+      runId
     );
     return unsub;
-  }, [phase]);
+  }, [phase, runId]);
 
   const toggle = useCallback((id: number) => {
     setSelectedIds(s => { const n = new Set(s); if (n.has(id)) n.delete(id); else n.add(id); return n; });
   }, []);
   const selectAll = useCallback(() => setSelectedIds(new Set(queries.map(q => q.id))), [queries]);
   const clearAll = useCallback(() => setSelectedIds(new Set()), []);
+  // Regenerated queries get fresh ids, so only selections that still exist are kept.
+  const regenerate = useCallback(async (category?: string) => {
+    setRegenerating(true);
+    setRunError(null);
+    try {
+      const data = await api.regenerateQueries(category);
+      setQueries(data.queries);
+      const ids = new Set(data.queries.map(q => q.id));
+      setSelectedIds(s => new Set(Array.from(s).filter(id => ids.has(id))));
+    } catch (e) {
+      setRunError(e instanceof Error ? e.message : 'Failed to regenerate queries');
+    } finally {
+      setRegenerating(false);
+    }
+  }, []);
 
   /* ─── LAUNCH ─── */
   const launch = async () => {
@@ -277,7 +310,8 @@ export default function RunPage() {
 
     // Start real backend run
     try {
-      await api.startRun(ids, label);
+      const started = await api.startRun(ids, label);
+      setRunId(started.id);
     } catch (err: unknown) {
       setRunError(err instanceof Error ? err.message : 'Failed to start run — is the backend running?');
       setPhase('idle');
@@ -404,6 +438,8 @@ export default function RunPage() {
               onToggle={toggle}
               onSelectAll={selectAll}
               onClear={clearAll}
+              onRegenerate={regenerate}
+              regenerating={regenerating}
               flyingId={null}
             />
           </div>
@@ -426,7 +462,7 @@ export default function RunPage() {
               <div className="text-sm text-muted-foreground flex-1">
                 Selected queries will be sent to all 3 providers — you'll see each response stream in.
               </div>
-              <LaunchButton disabled={!selectedIds.size} onClick={launch} count={selectedIds.size} />
+              <LaunchButton disabled={!selectedIds.size || regenerating} onClick={launch} count={selectedIds.size} />
             </div>
           </div>
         </div>
@@ -4,6 +4,8 @@ export interface RunSummaryData {
   brand: string | null;
   query_count: number;
   has_analysis: boolean;
+  created?: string;
+  updated?: string;
 }
 
 export interface BrandStat {
@@ -57,6 +59,29 @@ export interface QueryData {
   providers: Record<string, QueryProviderData>;
 }
 
+export interface QueryFilters {
+  category?: string;
+  provider?: string;
+  winner?: string;
+  target_lost?: boolean;
+  brand_found?: string;
+}
+
+export interface QueryPage {
+  items: QueryData[];
+  total: number;
+  next_cursor: string | null;
+}
+
+export type DashboardSection = 'summary' | 'providers' | 'categories' | 'queries';
+
+export interface DashboardData {
+  summary?: RunSummary;
+  providers?: ProvidersData;
+  categories?: CategoriesData;
+  queries?: QueryData[];
+}
+
 export interface ProviderResponseTokenInfo {
   input: number;
   output: number;
@@ -99,12 +124,28 @@ export interface PreviewQuery {
   category: string;
 }
 
+// A generated query left out of runs as a near-duplicate of an earlier one.
+export interface DroppedQuery extends PreviewQuery {
+  duplicate_of: number;
+  similarity: number;
+}
+
 export interface PreviewResponse {
   queries: PreviewQuery[];
   total: number;
+  dropped: DroppedQuery[];
 }
 
+// Streamed preview: one event per category as it is generated, then the final list's ids in order.
+export type PreviewStreamEvent =
+  | { category: string; queries: PreviewQuery[] }
+  | { done: true; ids: number[]; total: number; dropped: DroppedQuery[] };
+
+export type RunStatus = 'queued' | 'running' | 'done' | 'failed' | 'cancelled';
+
 export interface SSEMessage {
+  id?: string;
+  status?: RunStatus;
   running: boolean;
   run_name: string;
   label: string | null;
@@ -113,6 +154,7 @@ export interface SSEMessage {
   current_query: string;
   error: string | null;
   cancel_requested: boolean;
+  dropped?: number;
 }
 
 export interface BrandsConfig {
@@ -131,6 +173,7 @@ export interface TemplatesConfig {
 export interface ConfigItem {
   name: string;
   created: string;
+  active?: boolean;
 }
 
 export interface FullConfig {
@@ -155,6 +198,18 @@ export interface CompetitorsRegenerateRequest {
   exclude: string[];
 }
 
+export type OnboardJobStatus = 'queued' | 'running' | 'done' | 'failed';
+
+// Background onboarding job; `partial` fills in ("placeholders", "templates") before `result`.
+export interface OnboardJob<T> {
+  id: string;
+  kind: 'onboard' | 'competitors';
+  status: OnboardJobStatus;
+  partial: Record<string, unknown>;
+  result: T | null;
+  error: string | null;
+}
+
 export interface BrandEntry {
   name: string;
   aliases: string[];
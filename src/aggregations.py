@@ -0,0 +1,190 @@
+"""Columnar aggregation of mention-analysis rows.
+
+Analysis results are one row per (answer, brand). Summing those rows with
+per-row dict loops gets slow once several runs are combined, so the rows are
+held as pandas columns and every breakdown below is a vectorized group-by.
+The functions accept either a DataFrame or the list of dicts produced by
+`MentionsAnalyzer.mention_analyzer()`.
+"""
+
+import numpy as np
+import pandas as pd
+
+ANALYSIS_COLUMNS = [
+    'provider',
+    'question_id',
+    'category',
+    'brand',
+    'is_target',
+    'found',
+    'count',
+    'most_mentioned',
+    'score',
+]
+
+
+def as_frame(results):
+    """Return analysis rows as a DataFrame with the standard columns."""
+    if isinstance(results, pd.DataFrame):
+        return results
+    if isinstance(results, dict):
+        df = pd.DataFrame(results, columns=ANALYSIS_COLUMNS)
+    else:
+        df = pd.DataFrame.from_records(list(results), columns=ANALYSIS_COLUMNS)
+    # Rows built by older code paths may lack these — match the `.get(..., "unknown")`
+    # fallback the row-based aggregations used.
+    df['provider'] = df['provider'].fillna('unknown')
+    df['category'] = df['category'].fillna('unknown')
+    # Group keys have a handful of distinct values; categorical codes make the
+    # group-bys and brand comparisons integer operations instead of string ones.
+    for column in ('provider', 'category'):
+        df[column] = df[column].astype('category')
+    brands = pd.Index(df['brand'].dropna().unique()).union(pd.Index(df['most_mentioned'].dropna().unique()))
+    df['brand'] = pd.Categorical(df['brand'], categories=brands)
+    df['most_mentioned'] = pd.Categorical(df['most_mentioned'], categories=brands)
+    return df
+
+
+def _is_categorical(column):
+    return isinstance(column.dtype, pd.CategoricalDtype)
+
+
+def _equals(column, value):
+    if not _is_categorical(column):
+        return np.asarray(column, dtype=object) == value
+    code = column.cat.categories.get_indexer([value])[0]
+    if code < 0:
+        return np.zeros(len(column), dtype=bool)
+    return column.cat.codes.to_numpy() == code
+
+
+def _wins(df):
+    brand, winner = df['brand'], df['most_mentioned']
+    if _is_categorical(brand) and _is_categorical(winner) and brand.cat.categories.equals(winner.cat.categories):
+        codes = winner.cat.codes.to_numpy()
+        return (codes == brand.cat.codes.to_numpy()) & (codes >= 0)
+    return np.asarray(winner, dtype=object) == np.asarray(brand, dtype=object)
+
+
+def brand_totals(results, by=('brand',)):
+    """Per-group mention count, score sum, found-in and win counts.
+
+    Groups keep the order in which they first appear in the rows; `rows` is
+    the number of analysis rows in the group.
+    """
+    df = as_frame(results)
+    keyed = df[list(by)].assign(
+        is_target=df['is_target'],
+        count=df['count'],
+        score_sum=df['score'],
+        found=df['found'].astype(bool),
+        wins=_wins(df),
+    )
+    grouped = keyed.groupby(list(by), sort=False, observed=True)
+    totals = grouped.agg(
+        is_target=('is_target', 'first'),
+        count=('count', 'sum'),
+        score_sum=('score_sum', 'sum'),
+        found=('found', 'sum'),
+        wins=('wins', 'sum'),
+    )
+    totals['rows'] = grouped.size()
+    return totals
+
+
+def brand_summary(results):
+    """Brand leaderboard sorted by total mentions (ties keep first-seen order)."""
+    df = as_frame(results)
+    totals = brand_totals(df)
+    total = len(df)
+    num_brands = len(totals)
+    avg = totals['score_sum'] / total * num_brands if total else 0.0
+    totals = totals.assign(avg_score=avg).sort_values('count', ascending=False, kind='stable')
+    return [
+        {
+            'brand': brand,
+            'is_target': bool(is_target),
+            'mentions': int(count),
+            'found_in': int(found),
+            'avg_score': round(float(avg_score), 2),
+            'wins': int(wins),
+        }
+        for brand, is_target, count, found, avg_score, wins in zip(
+            totals.index,
+            totals['is_target'],
+            totals['count'],
+            totals['found'],
+            totals['avg_score'],
+            totals['wins'],
+        )
+    ]
+
+
+def provider_comparison(results, target_brand):
+    """Target brand's mentions, average score, wins and found-in per provider."""
+    df = as_frame(results)
+    provider_totals = df.groupby('provider', sort=False, observed=True).size()
+    num_brands = df['brand'].nunique()
+
+    target_rows = df[_equals(df['brand'], target_brand)]
+    by_provider = target_rows.assign(
+        found=target_rows['found'].astype(bool),
+        wins=_equals(target_rows['most_mentioned'], target_brand),
+    ).groupby('provider', observed=True).agg(
+        count=('count', 'sum'),
+        score_sum=('score', 'sum'),
+        found=('found', 'sum'),
+        wins=('wins', 'sum'),
+    )
+
+    providers = [str(p) for p in by_provider.index]
+    totals = provider_totals.reindex(by_provider.index).to_numpy()
+    avg_scores = np.where(totals > 0, by_provider['score_sum'].to_numpy() / np.maximum(totals, 1) * num_brands, 0)
+    return {
+        'providers': providers,
+        'mentions': [int(v) for v in by_provider['count']],
+        'avg_scores': [round(float(v), 2) for v in avg_scores],
+        'wins': [int(v) for v in by_provider['wins']],
+        'found_in': [int(v) for v in by_provider['found']],
+    }
+
+
+def category_performance(results, target_brand):
+    """Target win rate per category, over the target's rows in each category."""
+    df = as_frame(results)
+    is_target = df['is_target'].astype(bool).to_numpy()
+    stats = pd.DataFrame({
+        'category': df['category'],
+        'total': is_target,
+        'target_wins': is_target & _equals(df['most_mentioned'], target_brand),
+    }).groupby('category', observed=True).sum()
+
+    total = stats['total'].to_numpy()
+    wins = stats['target_wins'].to_numpy()
+    win_rates = np.where(total > 0, wins / np.maximum(total, 1) * 100, 0)
+    return {
+        'categories': [str(c) for c in stats.index],
+        'win_rates': [round(float(v), 1) for v in win_rates],
+        'total_queries': [int(v) for v in total],
+        'target_wins': [int(v) for v in wins],
+    }
+
+
+def query_outcomes(results):
+    """One row per (provider, question_id): winner, target brand, category and result.
+
+    The winner and category come from the question's first row, the target from
+    its target row — the same values the per-row loops picked.
+    """
+    df = as_frame(results)
+    grouped = df.groupby(['provider', 'question_id'], sort=False, observed=True)
+    outcomes = grouped.agg(winner=('most_mentioned', 'first'), category=('category', 'first'))
+    outcomes['winner'] = np.asarray(outcomes['winner'], dtype=object)
+    outcomes['winner'] = outcomes['winner'].where(outcomes['winner'].notna(), None)
+
+    target = df[df['is_target'].astype(bool).to_numpy()].groupby(['provider', 'question_id'], sort=False, observed=True)['brand'].last()
+    outcomes['target'] = np.asarray(target.reindex(outcomes.index), dtype=object)
+
+    winner, target_brand = outcomes['winner'], outcomes['target']
+    outcomes['target_won'] = ((winner == target_brand) | (winner.isna() & target_brand.isna())).to_numpy()
+    return outcomes.reset_index()
@@ -7,14 +7,26 @@ def main():
     
     subparsers.add_parser("generate", help="Generate queries from templates")
     subparsers.add_parser("run", help="Run queries against LLMs")
-    subparsers.add_parser("analyze", help="Analyze brand mentions")
+    analyze_parser = subparsers.add_parser("analyze", help="Analyze brand mentions")
+    analyze_parser.add_argument("--workers", type=int, default=None, help="Analyze in a pool of this many processes")
+
+    subparsers.add_parser("reanalyze", help="Re-analyze every stored run, rescanning only brands whose aliases changed")
 
     args = parser.parse_args()
 
     if args.command == "generate":
+        from .llm_clients import client_pool
         from .queries_generator import generate_all_queries, save_queries
-        queries = aio.run(generate_all_queries())
-        save_queries(queries)
+        from .query_dedup import drop_near_duplicates
+
+        async def generate():
+            async with client_pool():
+                return await generate_all_queries()
+
+        queries, dropped = drop_near_duplicates(aio.run(generate()))
+        save_queries(queries, dropped=dropped)
+        for query in dropped:
+            print(f"  dropped #{query['id']} (near-duplicate of #{query['duplicate_of']}): {query['query']}")
 
     elif args.command == "run":
         from .query_runner import QueryRunner
@@ -22,13 +34,34 @@ def main():
         aio.run(QueryRunner.run_queries(data))
         
     elif args.command == "analyze":
-        from .mention_analyzer import print_query_results, load_answers, MentionsAnalyzer, save_analysis, print_summary
-        responses = load_answers()
+        from .mention_analyzer import print_query_results, iter_answers, latest_run_dir, load_answers, MentionsAnalyzer, MentionTotals, save_analysis, print_summary
         analyzer = MentionsAnalyzer()
-        results = analyzer.mention_analyzer(responses)
-        save_analysis(results)
-        print_summary(results)
-        print_query_results(results)
+        run_dir = latest_run_dir()
+        if args.workers and args.workers > 1:
+            results = analyzer.mention_analyzer(load_answers(run_dir), workers=args.workers)
+            save_analysis(results, run_dir)
+            print_summary(results)
+            print_query_results(results)
+        else:
+            # Stream answers through the analyzer so memory stays flat on large runs.
+            totals = MentionTotals()
+            save_analysis(totals.track(analyzer.iter_analysis(iter_answers(run_dir))), run_dir)
+            totals.print_summary()
+            totals.print_query_results()
+    elif args.command == "reanalyze":
+        import os
+        from .mention_analyzer import OUTPUT_DIR, load_brands, save_analysis
+        from .mention_store import analysis_rows, brand_aliases, load_store, refresh_runs
+        name, target, competitors = load_brands()
+        rescanned = refresh_runs(OUTPUT_DIR, brand_aliases(name, target, competitors))
+        for run_name in sorted(os.listdir(OUTPUT_DIR)):
+            store = load_store(os.path.join(OUTPUT_DIR, run_name))
+            if store is None:
+                continue
+            save_analysis(analysis_rows(store, name, competitors), run_name)
+            if run_name in rescanned:
+                print(f"  {run_name}: rescanned {', '.join(rescanned[run_name])}")
+        print(f"Rescanned {len(rescanned)} run(s); the rest were reused.")
     else:
         parser.print_help()
 
@@ -1,4 +1,5 @@
 from pathlib import Path
+import copy
 import os
 import json
 import yaml
@@ -59,11 +60,74 @@ def load_api_key(provider_name: str) -> str:
     )
 
 
-def load_brand_config(saved_config_path=None):
-    base = Path(saved_config_path) if saved_config_path else SAVED_CONFIGS_PATH
+# Name of the active config file, kept next to the configs. Without it (or
+# when it names a deleted file) the config with the newest mtime is active.
+ACTIVE_CONFIG_POINTER = ".active"
+
+# Parsed active config per configs directory, reused while the directory's
+# mtime is unchanged. Every write below goes through os.replace(), which
+# moves the directory mtime, so a stat of the directory is the whole check.
+_brand_config_cache = {}
+
+
+def _configs_dir(saved_config_path=None):
+    return Path(saved_config_path) if saved_config_path else SAVED_CONFIGS_PATH
+
+
+def _replace_file(path, write):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as fh:
+        write(fh)
+    os.replace(tmp_path, path)
+
+
+def invalidate_brand_config(saved_config_path=None):
+    _brand_config_cache.pop(str(_configs_dir(saved_config_path)), None)
+
+
+def active_config_path(saved_config_path=None):
+    """Path of the active config file (raises FileNotFoundError if there is none)."""
+    base = _configs_dir(saved_config_path)
+    try:
+        name = (base / ACTIVE_CONFIG_POINTER).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        name = ""
+    if name and (base / name).is_file():
+        return base / name
     files = [f for f in base.iterdir() if f.suffix == ".json"]
     if not files:
         raise FileNotFoundError(f"No saved configs found in {base}")
-    latest = max(files, key=lambda f: f.stat().st_mtime)
-    with latest.open("r", encoding="utf-8") as fh:
-        return json.load(fh)
+    return max(files, key=lambda f: f.stat().st_mtime)
+
+
+def load_brand_config(saved_config_path=None):
+    base = _configs_dir(saved_config_path)
+    key = str(base)
+    stamp = base.stat().st_mtime_ns
+    cached = _brand_config_cache.get(key)
+    if cached is None or cached[0] != stamp:
+        path = active_config_path(base)
+        with path.open("r", encoding="utf-8") as fh:
+            cached = (stamp, path.name, json.load(fh))
+        _brand_config_cache[key] = cached
+    # Callers edit the returned dict before saving it; keep the cached one intact.
+    return copy.deepcopy(cached[2])
+
+
+def set_active_config(name, saved_config_path=None):
+    """Make the config file `name` (e.g. "config_2025-01-01_00-00-00.json") active."""
+    base = _configs_dir(saved_config_path)
+    _replace_file(base / ACTIVE_CONFIG_POINTER, lambda fh: fh.write(name))
+    invalidate_brand_config(base)
+
+
+def save_brand_config(config, name=None, saved_config_path=None):
+    """Write a config atomically, by default over the active one; a new `name` becomes active."""
+    base = _configs_dir(saved_config_path)
+    path = base / name if name else active_config_path(base)
+    _replace_file(path, lambda fh: json.dump(config, fh, indent=4, ensure_ascii=False))
+    if name:
+        set_active_config(name, base)
+    else:
+        invalidate_brand_config(base)
+    return path
@@ -21,6 +21,14 @@ from google.genai import errors as genai_errors
 from google.genai import types as genai_types
 from google.api_core import exceptions as google_exceptions
 import asyncio as aio
+import copy
+import importlib.util
+import time
+import weakref
+from contextlib import asynccontextmanager
+import httpx
+from openai import DefaultAsyncHttpxClient as DefaultOpenAIHttpxClient
+from anthropic import DefaultAsyncHttpxClient as DefaultAnthropicHttpxClient
 from src.config_loader import CONFIG, get_provider_config, load_api_key
 
 # Setup logging
@@ -42,7 +50,25 @@ class APIKeyMissingError(LLMClientError):
 class ProviderNotFoundError(LLMClientError):
     pass
 
-_clients = {}
+
+# HTTP/2 multiplexes concurrent requests over one connection; httpx needs the
+# optional `h2` package for it (pip install "httpx[http2]").
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+WARMUP_TIMEOUT_SECONDS = 15
+
+# Per-provider concurrency limits shared by everything calling a provider in
+# this process, so concurrent runs interleave within one quota instead of each
+# assuming they own it. asyncio primitives belong to one event loop, hence the
+# per-loop map.
+_limiters = weakref.WeakKeyDictionary()
+
+# Identical requests in flight, per event loop: {request key: task}. Callers
+# asking the same thing at the same time share one provider call.
+_inflight = weakref.WeakKeyDictionary()
+
+# {provider: {"calls": requests sent, "coalesced": requests that joined one in flight}}
+_coalescing_stats = {}
 
 
 def get_llm_setting(provider_name: str, key: str, default: Any = None) -> Any:
@@ -60,39 +86,175 @@ def get_llm_setting(provider_name: str, key: str, default: Any = None) -> Any:
     return default
 
 
-def build_client(provider_name: Optional[str] = None) -> Optional[Tuple[str, Any]]:
-    
-    
-    if not provider_name:
-        logger.error("No provider name provided")
-        return None
-    
-    if provider_name in _clients:
-          return _clients[provider_name]
+def provider_limiter(provider_name: str) -> aio.Semaphore:
+    """The semaphore capping in-flight requests to a provider (`max_concurrency`)."""
+    limiters = _limiters.setdefault(aio.get_running_loop(), {})
+    if provider_name not in limiters:
+        limiters[provider_name] = aio.Semaphore(get_llm_setting(provider_name, "max_concurrency", 8))
+    return limiters[provider_name]
 
-    try:
+
+def coalescing_stats() -> Dict[str, Dict[str, int]]:
+    """Per-provider counts of requests sent and requests served by joining an identical one."""
+    return copy.deepcopy(_coalescing_stats)
+
+
+async def singleflight(provider_name: str, key: tuple, call) -> Any:
+    """Await `call()`, or the result of an identical request (`key`) already in flight.
+
+    The call runs as its own task, so a caller giving up does not cancel it
+    for the others waiting on it. All callers receive the same result
+    object, so treat it as read-only.
+    """
+    inflight = _inflight.setdefault(aio.get_running_loop(), {})
+    stats = _coalescing_stats.setdefault(provider_name, {"calls": 0, "coalesced": 0})
+    task = inflight.get(key)
+    if task is not None:
+        stats["coalesced"] += 1
+        return await aio.shield(task)
+
+    stats["calls"] += 1
+    task = aio.ensure_future(call())
+    inflight[key] = task
+
+    def finished(t):
+        inflight.pop(key, None)
+        # Retrieve the outcome so a failure nobody is waiting for any more isn't reported as unhandled.
+        if not t.cancelled():
+            t.exception()
+
+    task.add_done_callback(finished)
+    return await aio.shield(task)
+
+
+def _http_limits(provider_name: str) -> httpx.Limits:
+    """Keep-alive connections for every request the provider's limiter lets through.
+
+    Calls that bypass `ask_provider` (onboarding, warmup) get headroom on top,
+    rather than queueing for a pooled connection.
+    """
+    concurrency = get_llm_setting(provider_name, "max_concurrency", 8)
+    return httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency)
+
+
+class ClientPool:
+    """Provider SDK clients for one event loop, with HTTP connection pools sized to `max_concurrency`.
+
+    SDK clients hold connections bound to the loop that opened them, so a
+    pool belongs to one loop; enter it with `client_pool()` for the lifetime
+    of that loop's work and it closes every client on exit.
+    """
+
+    def __init__(self):
+        self._clients = {}
+
+    def get(self, provider_name: str) -> Tuple[str, Any]:
+        if provider_name not in self._clients:
+            self._clients[provider_name] = self._build(provider_name)
+        return self._clients[provider_name]
+
+    @staticmethod
+    def _build(provider_name: str) -> Tuple[str, Any]:
         timeout_seconds = get_llm_setting(provider_name, "timeout_seconds", 60)
+        http_args = {"limits": _http_limits(provider_name), "http2": HTTP2}
 
         if provider_name == "openai":
             api_key = load_api_key("openai")
             logger.info("Building OpenAI client")
-            result = ("openai", AsyncOpenAI(api_key=api_key, timeout=timeout_seconds))
+            return "openai", AsyncOpenAI(
+                api_key=api_key, timeout=timeout_seconds, http_client=DefaultOpenAIHttpxClient(**http_args)
+            )
 
-        elif provider_name == "anthropic":
+        if provider_name == "anthropic":
             api_key = load_api_key("anthropic")
             logger.info("Building Anthropic client")
-            result = ("anthropic", AsyncAnthropic(api_key=api_key, timeout=timeout_seconds))
+            return "anthropic", AsyncAnthropic(
+                api_key=api_key, timeout=timeout_seconds, http_client=DefaultAnthropicHttpxClient(**http_args)
+            )
 
-        elif provider_name == "google":
+        if provider_name == "google":
             api_key = load_api_key("google")
             logger.info("Building Google Gemini client")
             # google-genai expects the request timeout in milliseconds
-            http_options = genai_types.HttpOptions(timeout=int(timeout_seconds * 1000))
-            result = ("google", genai.Client(api_key=api_key, http_options=http_options).aio)
-        
+            http_options = genai_types.HttpOptions(timeout=int(timeout_seconds * 1000), async_client_args=http_args)
+            return "google", genai.Client(api_key=api_key, http_options=http_options).aio
+
+        raise ProviderNotFoundError(f"Provider '{provider_name}' is not supported")
+
+    async def _validate(self, provider_name: str) -> None:
+        """Open a connection and check the key and model with a free metadata request."""
+        provider_key, client = self.get(provider_name)
+        model = get_provider_config(provider_key)["model"]
+        if provider_key == "google":
+            await client.models.get(model=model)
         else:
-            raise ProviderNotFoundError(f"Provider '{provider_name}' is not supported")
-        
+            await client.models.retrieve(model)
+
+    async def warmup(self, providers=None, timeout: float = WARMUP_TIMEOUT_SECONDS) -> Dict[str, Optional[str]]:
+        """Build and validate every provider concurrently: {provider: None if usable, else the error}."""
+        providers = list(providers or CONFIG["llm"]["providers"])
+
+        async def check(provider_name):
+            try:
+                await aio.wait_for(self._validate(provider_name), timeout)
+                return None
+            except Exception as e:
+                return f"{type(e).__name__}: {e}".splitlines()[0]
+
+        errors = dict(zip(providers, await aio.gather(*(check(p) for p in providers))))
+        for provider_name, error in errors.items():
+            if error:
+                logger.warning(f"{provider_name} unavailable: {error}")
+            else:
+                logger.info(f"{provider_name} client ready")
+        return errors
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for provider_key, client in clients.values():
+            try:
+                await (client.aclose() if provider_key == "google" else client.close())
+            except Exception as e:
+                logger.warning(f"Error closing {provider_key} client: {e}")
+
+
+# The pool in use on each event loop: the one entered with client_pool(), or
+# one created on first use for code running outside such a context.
+_pools = weakref.WeakKeyDictionary()
+
+
+@asynccontextmanager
+async def client_pool(warmup: bool = False):
+    """Own the provider clients of the running event loop until the block exits, then close them.
+
+    With `warmup`, clients are built and validated concurrently in the background.
+    """
+    loop = aio.get_running_loop()
+    pool = ClientPool()
+    previous = _pools.get(loop)
+    _pools[loop] = pool
+    warming = aio.create_task(pool.warmup()) if warmup else None
+    try:
+        yield pool
+    finally:
+        if warming is not None:
+            warming.cancel()
+        if previous is None:
+            _pools.pop(loop, None)
+        else:
+            _pools[loop] = previous
+        await pool.aclose()
+
+
+def build_client(provider_name: Optional[str] = None) -> Optional[Tuple[str, Any]]:
+    """The (provider, SDK client) pair for `provider_name` from the running loop's pool."""
+    if not provider_name:
+        logger.error("No provider name provided")
+        return None
+
+    pool = _pools.setdefault(aio.get_running_loop(), ClientPool())
+    try:
+        return pool.get(provider_name)
     except KeyError as e:
         logger.error(f"Configuration error for {provider_name}: {e}")
         raise LLMClientError(f"Invalid configuration for {provider_name}")
@@ -100,9 +262,6 @@ def build_client(provider_name: Optional[str] = None) -> Optional[Tuple[str, Any
         logger.error(f"Error building client for {provider_name}: {e}")
         raise
 
-    _clients[provider_name] = result
-    return result
-
 
 # Transient failures worth a second chance: rate limits, connection drops,
 # timeouts and 5xx/server-side errors across all three SDKs.
@@ -162,7 +321,7 @@ async def call_with_retry(
     raise last_exception
 
 
-async def ask_openai(client: AsyncOpenAI, question: str, model: str) -> Dict[str, Any]:
+async def ask_openai(client: AsyncOpenAI, question: str, model: str, json_mode: bool = False) -> Dict[str, Any]:
     async def _call():
         response = await client.chat.completions.create(
             model=model,
@@ -171,13 +330,15 @@ async def ask_openai(client: AsyncOpenAI, question: str, model: str) -> Dict[str
                 {"role": "user", "content": question}
             ],
             max_completion_tokens=get_llm_setting("openai", "max_tokens", 512),
-            temperature=get_llm_setting("openai", "temperature", 0.7)
+            temperature=get_llm_setting("openai", "temperature", 0.7),
+            # JSON mode only guarantees an object, so lists come back wrapped in one.
+            **({"response_format": {"type": "json_object"}} if json_mode else {}),
         )
         return response
     
     try:
         logger.info(f"Calling OpenAI with model: {model}")
-        response = await call_with_retry(_call)
+        response = await singleflight("openai", ("openai", model, question, json_mode), lambda: call_with_retry(_call))
         
         result = {
             "text": response.choices[0].message.content,
@@ -215,7 +376,9 @@ async def ask_anthropic(client: AsyncAnthropic, question: str, model: str, prefi
     
     try:
         logger.info(f"Calling Anthropic with model: {model}")
-        response =  await call_with_retry(_call)
+        response = await singleflight(
+            "anthropic", ("anthropic", model, question, prefill, max_tokens), lambda: call_with_retry(_call)
+        )
         
         result = {
             "text": prefill + response.content[0].text,
@@ -237,7 +400,7 @@ async def ask_anthropic(client: AsyncAnthropic, question: str, model: str, prefi
         raise
 
 
-async def ask_google(client: genai.Client, question: str, model: str) -> Dict[str, Any]:
+async def ask_google(client: genai.Client, question: str, model: str, json_mode: bool = False) -> Dict[str, Any]:
     
     async def _call():
         response = await client.models.generate_content(
@@ -246,13 +409,14 @@ async def ask_google(client: genai.Client, question: str, model: str) -> Dict[st
             config=genai_types.GenerateContentConfig(
                 temperature=get_llm_setting("google", "temperature", 0.7),
                 max_output_tokens=get_llm_setting("google", "max_tokens", 512),
+                response_mime_type="application/json" if json_mode else None,
             ),
         )
         return response
     
     try:
         logger.info(f"Calling Google Gemini with model: {model}")
-        response = await call_with_retry(_call)
+        response = await singleflight("google", ("google", model, question, json_mode), lambda: call_with_retry(_call))
         
         result = {
             "text": response.text,
@@ -273,8 +437,159 @@ async def ask_google(client: genai.Client, question: str, model: str) -> Dict[st
         logger.error(f"Unexpected error calling Google: {e}")
         raise
 
-async def ask_provider(provider_name: str, question: str) -> Optional[Dict[str, Any]]:
-    
+def streaming_enabled(provider_name: str) -> bool:
+    """Whether `llm.streaming.enabled` (or the provider's override of it) asks for streamed answers."""
+    return bool((get_llm_setting(provider_name, "streaming", {}) or {}).get("enabled"))
+
+
+# Streamed readers: async generators of answer text pieces that record the
+# answer's model and token usage in `meta` as the stream reports them.
+
+async def _stream_openai(client: AsyncOpenAI, question: str, model: str, meta: Dict[str, Any]):
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": question}
+        ],
+        max_completion_tokens=get_llm_setting("openai", "max_tokens", 512),
+        temperature=get_llm_setting("openai", "temperature", 0.7),
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    try:
+        async for chunk in stream:
+            meta["model"] = chunk.model
+            if chunk.usage:
+                meta["input_tokens"] = chunk.usage.prompt_tokens
+                meta["output_tokens"] = chunk.usage.completion_tokens
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        await stream.close()
+
+
+async def _stream_anthropic(client: AsyncAnthropic, question: str, model: str, meta: Dict[str, Any]):
+    stream = await client.messages.create(
+        model=model,
+        max_tokens=get_llm_setting("anthropic", "max_tokens", 512),
+        temperature=get_llm_setting("anthropic", "temperature", 0.7),
+        messages=[{"role": "user", "content": question}],
+        stream=True,
+    )
+    try:
+        async for event in stream:
+            if event.type == "message_start":
+                meta["model"] = event.message.model
+                meta["input_tokens"] = event.message.usage.input_tokens
+            elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                yield event.delta.text
+            elif event.type == "message_delta":
+                meta["output_tokens"] = event.usage.output_tokens
+    finally:
+        await stream.close()
+
+
+async def _stream_google(client: genai.Client, question: str, model: str, meta: Dict[str, Any]):
+    stream = await client.models.generate_content_stream(
+        model=model,
+        contents=question,
+        config=genai_types.GenerateContentConfig(
+            temperature=get_llm_setting("google", "temperature", 0.7),
+            max_output_tokens=get_llm_setting("google", "max_tokens", 512),
+        ),
+    )
+    try:
+        async for chunk in stream:
+            usage = chunk.usage_metadata
+            if usage is not None:
+                meta["input_tokens"] = usage.prompt_token_count
+                meta["output_tokens"] = usage.candidates_token_count
+            if chunk.text:
+                yield chunk.text
+    finally:
+        await stream.aclose()
+
+
+STREAM_READERS = {
+    "openai": _stream_openai,
+    "anthropic": _stream_anthropic,
+    "google": _stream_google,
+}
+
+
+async def ask_streaming(provider_key: str, client: Any, question: str, model: str, cutoff: Any = None) -> Dict[str, Any]:
+    """Ask for a streamed answer and read it until it ends or `cutoff` says to stop.
+
+    `cutoff` is fed every piece as it arrives (see `src.stream_cutoff`). The
+    result has the usual text/model/tokens plus "stream": time to first
+    token, output tokens per second, whether the answer was cut off, and the
+    brands seen in it, in order. A cut-off answer never receives the
+    provider's final usage, so its output tokens are counted as pieces read.
+    """
+    read = STREAM_READERS[provider_key]
+
+    async def _call():
+        if cutoff is not None:
+            cutoff.reset()
+        meta = {"model": model}
+        pieces = []
+        stopped_early = False
+        first_piece_at = None
+        started = time.perf_counter()
+        stream = read(client, question, model, meta)
+        try:
+            async for piece in stream:
+                if first_piece_at is None:
+                    first_piece_at = time.perf_counter()
+                pieces.append(piece)
+                if cutoff is not None and cutoff.feed(piece):
+                    stopped_early = True
+                    break
+        finally:
+            await stream.aclose()
+        finished = time.perf_counter()
+        if cutoff is not None and not stopped_early:
+            cutoff.finish()
+
+        input_tokens = meta.get("input_tokens") or 0
+        output_tokens = meta.get("output_tokens") or len(pieces)
+        generating = finished - first_piece_at if first_piece_at is not None else 0
+        return {
+            "text": "".join(pieces),
+            "model": meta["model"],
+            "tokens": {
+                "input": input_tokens,
+                "output": output_tokens,
+                "total": input_tokens + output_tokens
+            },
+            "stream": {
+                "ttft_seconds": round(first_piece_at - started, 3) if first_piece_at is not None else None,
+                "tokens_per_second": round(output_tokens / generating, 1) if generating > 0 else None,
+                "stopped_early": stopped_early,
+                "first_mentions": cutoff.first_mentions() if cutoff is not None else [],
+            },
+        }
+
+    logger.info(f"Streaming {provider_key} with model: {model}")
+    key = ("stream", provider_key, model, question, cutoff.signature() if cutoff is not None else None)
+    result = await singleflight(provider_key, key, lambda: call_with_retry(_call))
+    logger.info(
+        f"{provider_key} stream finished ({result['tokens']['total']} tokens, "
+        f"first token after {result['stream']['ttft_seconds']}s"
+        f"{', cut off' if result['stream']['stopped_early'] else ''})"
+    )
+    return result
+
+
+async def ask_provider(provider_name: str, question: str, json_mode: bool = False, cutoff: Any = None) -> Optional[Dict[str, Any]]:
+    """Ask one provider; None if it is unavailable or the call fails.
+
+    `json_mode` asks for a JSON answer: OpenAI's JSON mode, Gemini's JSON
+    response type, or an Anthropic answer prefilled with "[". Other answers
+    are streamed when `llm.streaming.enabled` is set, and stopped early as
+    `cutoff` decides (see `ask_streaming`).
+    """
     try:
         built = build_client(provider_name)
         
@@ -285,25 +600,31 @@ async def ask_provider(provider_name: str, question: str) -> Optional[Dict[str,
         provider_key, client = built
         model = get_provider_config(provider_key)["model"]
         
-        if provider_key == "openai":
-            return await ask_openai(client, question, model)
-        elif provider_key == "anthropic":
-            return await ask_anthropic(client, question, model)
-        elif provider_key == "google":
-            return await ask_google(client, question, model)
+        async with provider_limiter(provider_key):
+            if not json_mode and streaming_enabled(provider_key):
+                return await ask_streaming(provider_key, client, question, model, cutoff=cutoff)
+            if provider_key == "openai":
+                return await ask_openai(client, question, model, json_mode=json_mode)
+            elif provider_key == "anthropic":
+                return await ask_anthropic(client, question, model, prefill="[" if json_mode else "")
+            elif provider_key == "google":
+                return await ask_google(client, question, model, json_mode=json_mode)
     
     except Exception as e:
         logger.error(f"Error asking {provider_name}: {e}")
         return None
 
 
-async def ask_all_providers(question: str) -> Dict[str, Optional[Dict[str, Any]]]:
-    
+async def ask_all_providers(question: str, new_cutoff=None) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Ask every provider; `new_cutoff(provider_name)` builds each streamed answer's cutoff."""
+
+    def cutoff(provider_name):
+        return new_cutoff(provider_name) if new_cutoff is not None else None
 
     responses = await aio.gather(
-    ask_provider("openai", question),
-    ask_provider("anthropic", question),
-    ask_provider("google", question)
+    ask_provider("openai", question, cutoff=cutoff("openai")),
+    ask_provider("anthropic", question, cutoff=cutoff("anthropic")),
+    ask_provider("google", question, cutoff=cutoff("google"))
     )
 
     
@@ -2,14 +2,23 @@ import logging
 import re
 import json
 import os
+import textwrap
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
 from .query_runner import QueryRunner
 from .config_loader import load_brand_config
+from .aggregations import as_frame, brand_totals, query_outcomes
+from .run_index import refresh_run, run_sort_key
 
 OUTPUT_DIR = 'data/results'
 
 logger = logging.getLogger(__name__)
 
 class Answer:
+    # Runs can hold tens of thousands of answers; slots drop the per-instance __dict__.
+    __slots__ = ('provider', 'category', 'question_id', 'question', 'answer')
+
     def __init__(self, provider, category, question_id, question, answer):
         self.provider = provider
         self.category = category
@@ -27,53 +36,36 @@ class Answer:
         }
 
 
-def load_answers(run_dir=None):
-    base_path = 'data/results'
+def latest_run_dir(base_path=OUTPUT_DIR):
+    all_dirs = os.listdir(base_path)
+    all_dirs = [d for d in all_dirs if os.path.isdir(os.path.join(base_path, d))]
+    if not all_dirs:
+        raise FileNotFoundError("No runs found in data/results. Run query first.")
+    return max(all_dirs, key=run_sort_key)
+
+
+def iter_answers(run_dir=None):
+    """Yield the answers of a run one at a time, ordered by question id.
+
+    Output files are ordered by the id in their name, so only one file is
+    held in memory at a time.
+    """
+    base_path = OUTPUT_DIR
 
     if run_dir is None:
-        all_dirs = os.listdir(base_path)
-        all_dirs = [d for d in all_dirs if os.path.isdir(os.path.join(base_path, d))]
-        all_dirs.sort(key=lambda d: os.path.getmtime(os.path.join(base_path, d)), reverse=True)
-        if not all_dirs:
-            raise FileNotFoundError("No runs found in data/results. Run query first.")
-        else:
-            run_dir = all_dirs[0]
-        
+        run_dir = latest_run_dir(base_path)
 
     run_path = os.path.join(base_path, run_dir)
 
     all_files = os.listdir(run_path)
     output_files = [f for f in all_files if f.startswith('output_') and f.endswith('.json')]
+    output_files.sort(key=lambda f: int(f[7:-5]))
 
-    responses = []
     for filename in output_files:
         file_path = os.path.join(run_path, filename)
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
                 data = json.load(file)
-                for provider, response_data in data['response'].items():
-
-                    if response_data is None:
-                        continue
-
-                    # A provider can return a null/empty body (e.g. OpenAI
-                    # `content: None` on a cut-off completion) — skip it
-                    # instead of letting None reach detect_mentions().
-                    text = response_data.get('text') if isinstance(response_data, dict) else None
-                    if not text:
-                        logger.warning(
-                            f"Skipping empty response from {provider} in {filename}"
-                        )
-                        continue
-
-                    answer = Answer(
-                        provider=provider,
-                        category=data['category'],
-                        question_id=data['id'],
-                        question=data['question'],
-                        answer=text
-                    )
-                    responses.append(answer)
         except FileNotFoundError:
             logger.error(f"File {file_path} not found.")
             print(f"File {file_path} not found.")
@@ -86,8 +78,32 @@ def load_answers(run_dir=None):
             print(f"Permission denied reading file: {file_path}")
             continue
 
-    responses.sort(key=lambda x: x.question_id)
-    return responses
+        for provider, response_data in data['response'].items():
+
+            if response_data is None:
+                continue
+
+            # A provider can return a null/empty body (e.g. OpenAI
+            # `content: None` on a cut-off completion) — skip it
+            # instead of letting None reach detect_mentions().
+            text = response_data.get('text') if isinstance(response_data, dict) else None
+            if not text:
+                logger.warning(
+                    f"Skipping empty response from {provider} in {filename}"
+                )
+                continue
+
+            yield Answer(
+                provider=provider,
+                category=data['category'],
+                question_id=data['id'],
+                question=data['question'],
+                answer=text
+            )
+
+
+def load_answers(run_dir=None):
+    return list(iter_answers(run_dir))
 
 
 def load_brands():
@@ -100,6 +116,19 @@ def load_brands():
 
 
 
+def compile_aliases(aliases: list):
+    """One case-folded regex matching any alias, or None when there are none.
+
+    Alternatives are ordered longest first so that, at any position, the
+    longest alias wins — the same result as collecting every alias span and
+    keeping the longest of overlapping ones.
+    """
+    keys = sorted({alias.lower() for alias in aliases if alias}, key=len, reverse=True)
+    if not keys:
+        return None
+    return re.compile(r'\b(?:' + '|'.join(re.escape(key) for key in keys) + r')\b')
+
+
 def find_alias_matches(text_lower: str, aliases: list):
     """Find all alias occurrences, deduplicated by span.
 
@@ -107,60 +136,70 @@ def find_alias_matches(text_lower: str, aliases: list):
     the same span and are counted once. Overlapping aliases (e.g. "Roam" and
     "Roam Research") are resolved by keeping the longest match.
     """
-    spans = []
-    for alias in aliases:
-        if not alias:
-            continue
-        pattern = r'\b' + re.escape(alias.lower()) + r'\b'
-        for match in re.finditer(pattern, text_lower):
-            spans.append((match.start(), match.end()))
-
-    # Same-span duplicates (case-variant aliases) collapse here.
-    spans = sorted(set(spans), key=lambda s: (s[0], -(s[1] - s[0])))
-
-    kept = []
-    last_end = -1
-    for start, end in spans:
-        if start < last_end:
-            # Overlaps a longer match already kept — skip the shorter alias.
-            continue
-        kept.append((start, end))
-        last_end = end
-    return kept
+    pattern = compile_aliases(aliases)
+    if pattern is None:
+        return []
+    return [match.span() for match in pattern.finditer(text_lower)]
 
 
-class MentionsAnalyzer:
-    @staticmethod
-    def detect_mentions(text: str, name:str ,target: list, competitors: dict):
+class AliasMatcher:
+    """Compiled alias patterns for the target and every competitor.
+
+    Building the patterns once and reusing them for every answer avoids
+    recompiling each alias per answer.
+    """
+
+    def __init__(self, name: str, target: list, competitors: dict):
+        self.brands = [(name, True, compile_aliases(target))]
+        self.brands.extend(
+            (brand_name, False, compile_aliases(aliases))
+            for brand_name, aliases in competitors.items()
+        )
+
+    def detect(self, text: str):
         text = text or ""
         text_lower = text.lower()
         text_length = len(text)
         mentions = []
 
-        target_matches = find_alias_matches(text_lower, target)
-
-        mentions.append({
-            'brand': name ,
-            'is_target': True,
-            'found': len(target_matches) > 0,
-            'count': len(target_matches),
-            'first_position': target_matches[0][0] if target_matches else None,
-            'text_length': text_length
-        })
-        
-        for brand_name, aliases in competitors.items():
-            brand_matches = find_alias_matches(text_lower, aliases)
-
+        for brand_name, is_target, pattern in self.brands:
+            matches = [m.start() for m in pattern.finditer(text_lower)] if pattern else []
             mentions.append({
                 'brand': brand_name,
-                'is_target': False,
-                'found': len(brand_matches) > 0,
-                'count': len(brand_matches),
-                'first_position': brand_matches[0][0] if brand_matches else None,
+                'is_target': is_target,
+                'found': len(matches) > 0,
+                'count': len(matches),
+                'first_position': matches[0] if matches else None,
                 'text_length': text_length
             })
-        
+
         return mentions
+
+
+# Matcher built once per pool worker by _init_worker().
+_worker_matcher = None
+
+
+def _init_worker(name, target, competitors):
+    global _worker_matcher
+    _worker_matcher = AliasMatcher(name, target, competitors)
+
+
+def _analyze_chunk(chunk):
+    rows = []
+    for provider, category, question_id, text in chunk:
+        rows.extend(MentionsAnalyzer.analyze_answer(_worker_matcher, provider, category, question_id, text))
+    return rows
+
+
+class MentionsAnalyzer:
+    # Below this many answers a process pool costs more to start than it saves.
+    PARALLEL_MIN_ANSWERS = 500
+    DEFAULT_CHUNK_SIZE = 200
+
+    @staticmethod
+    def detect_mentions(text: str, name:str ,target: list, competitors: dict):
+        return AliasMatcher(name, target, competitors).detect(text)
         
     @staticmethod
     def calculate_position_score( first_position: int, text_length: int):
@@ -176,144 +215,265 @@ class MentionsAnalyzer:
         else:
             return 0.3
     
-    def mention_analyzer(self, responses):
+    @staticmethod
+    def analyze_answer(matcher, provider, category, question_id, text):
+        mentions = matcher.detect(text)
+        max_mention = max(mentions, key=lambda x: x['count'])
+        max_brand = max_mention['brand'] if max_mention['count'] > 0 else None
+
+        return [{
+            'provider': provider,
+            'question_id': question_id,
+            'category': category,
+            'brand' : mention['brand'],
+            'is_target': mention['is_target'],
+            'found': mention['found'],
+            'count': mention['count'],
+            'most_mentioned' : max_brand,
+            'score' : MentionsAnalyzer.calculate_position_score(
+                mention['first_position'],
+                mention['text_length'])
+        } for mention in mentions]
+
+    def mention_analyzer(self, responses, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Analyze answers into one row per (answer, brand).
+
+        With `workers` > 1 and enough answers, the answers are split into chunks
+        and analyzed in a process pool. Chunks are merged back in submission
+        order, so the rows are identical to a sequential run.
+        """
         name, target, competitors = load_brands()
-        analysis_results = []
 
-        for answer in responses:     
-            mentions = MentionsAnalyzer.detect_mentions(answer.answer, name, target, competitors)  
-            max_mention = max(mentions, key=lambda x: x['count'])
-            max_brand = max_mention['brand'] if max_mention['count'] > 0 else None
-              
-            for mention in mentions:
-                analysis_results.append({
-                'provider': answer.provider,
-                'question_id': answer.question_id,
-                'category': answer.category,
-                'brand' : mention['brand'],
-                'is_target': mention['is_target'],
-                'found': mention['found'],
-                'count': mention['count'],
-                'most_mentioned' : max_brand,
-                'score' : self.calculate_position_score(
-                    mention['first_position'],
-                    mention['text_length'])  
-                    })
-                
-        return analysis_results
+        if workers and workers > 1 and len(responses) >= self.PARALLEL_MIN_ANSWERS:
+            return self._analyze_parallel(responses, (name, target, competitors), workers, chunk_size)
 
+        return list(self.iter_analysis(responses, (name, target, competitors)))
 
-def save_analysis(results, run_dir=None):
-    base_path = 'data/results'
-    
-    if run_dir is None:
-        all_dirs = os.listdir(base_path)
-        all_dirs = [d for d in all_dirs if os.path.isdir(os.path.join(base_path, d))]
-        all_dirs.sort(key=lambda d: os.path.getmtime(os.path.join(base_path, d)), reverse=True)
-        if not all_dirs:
-            raise FileNotFoundError("No runs found in data/results. Run query first.")
-        else:
-            run_dir = all_dirs[0]
-            
-    output_path = os.path.join(base_path, run_dir, 'analysis.json')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=4)
-    
-    print(f"Analysis saved to {output_path}")
+    def iter_analysis(self, answers, brands=None):
+        """Yield analysis rows one at a time for any iterable of answers."""
+        name, target, competitors = brands or load_brands()
+        matcher = AliasMatcher(name, target, competitors)
+        for answer in answers:
+            yield from self.analyze_answer(
+                matcher, answer.provider, answer.category, answer.question_id, answer.answer)
 
+    @staticmethod
+    def _analyze_parallel(responses, brands, workers, chunk_size):
+        items = [(a.provider, a.category, a.question_id, a.answer) for a in responses]
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
 
-def print_summary(results): 
-    brands = {}
-    for r in results:
-        brand = r['brand']
-
-        if brand not in  brands:
-            brands[brand] =  {'count': 0, 
-                              'score_sum': 0, 
-                              'found': 0, 
-                              'wins': 0, 
-                              'is_target': r['is_target']}
-                              
-        brands[brand]['count'] += r['count']
-        brands[brand]['score_sum'] += r['score']
-
-        if r['found']: 
-            brands[brand]['found'] += 1
-
-        if r['most_mentioned'] == brand:
-                brands[brand]['wins'] +=1 
-        
+        analysis_results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=brands) as pool:
+            for rows in pool.map(_analyze_chunk, chunks):
+                analysis_results.extend(rows)
+        return analysis_results
 
-    print("\n Brand Mentions Summary \n")
-    for brand, stats in sorted(brands.items(), key=lambda x: x[1]['count'], reverse=True):
-        avg_score = stats['score_sum'] / len(results) * len(brands)
-        marker = " (TARGET)" if stats['is_target'] else ""
-        print(f"{brand}{marker}: {stats['count']} mentions, found in {stats['found']} answers, avg score: {avg_score:.2f}, won {stats['wins']} queries")
-
-    by_provider = {}
-    for r in results:
-        key = (r['brand'], r['provider'])
-        if key not in by_provider:
-            by_provider[key] = {'count': 0, 'score_sum': 0, 'found': 0, 'wins': 0, 'is_target': r['is_target']}
-        by_provider[key]['count'] += r['count']
-        by_provider[key]['score_sum'] += r['score']
-        if r['found']:
-            by_provider[key]['found'] += 1
-        if r['most_mentioned'] == r['brand']:
-            by_provider[key]['wins'] += 1
 
-    print("\n Per-Provider Breakdown \n")
-    for (brand, provider), stats in sorted(by_provider.items(), key=lambda x: (x[0][0], -x[1]['count'])):
-        total_for_provider = sum(1 for r in results if r['provider'] == provider)
-        avg_score = stats['score_sum'] / total_for_provider * len(brands) if total_for_provider else 0
-        marker = " (TARGET)" if stats['is_target'] else ""
-        print(f"  [{provider}] {brand}{marker}: {stats['count']} mentions, found in {stats['found']} answers, avg score: {avg_score:.2f}, won {stats['wins']} queries")
+def save_analysis(results, run_dir=None):
+    """Write analysis rows to the run's analysis.json.
 
-def print_query_results(results):
-    providers = sorted(set(r['provider'] for r in results))
+    `results` may be any iterable; rows are written as they arrive, in the
+    same layout as `json.dump(results, indent=4)`, and the file is replaced
+    only once every row is written.
+    """
+    base_path = OUTPUT_DIR
 
-    for provider in providers:
-        provider_results = [r for r in results if r['provider'] == provider]
+    if run_dir is None:
+        run_dir = latest_run_dir(base_path)
 
-        seen = {}
-        for r in provider_results:
-            qid = r['question_id']
-            if qid not in seen:
-                seen[qid] = {'winner': r['most_mentioned'], 'target': None}
-            if r['is_target']:
-                seen[qid]['target'] = r['brand']
+    output_path = os.path.join(base_path, run_dir, 'analysis.json')
+    # Rows go to a temp file first: a failure mid-stream must not leave a
+    # truncated analysis.json where a valid one used to be.
+    tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            separator = '[\n'
+            for row in results:
+                f.write(separator + textwrap.indent(json.dumps(row, indent=4), '    '))
+                separator = ',\n'
+            f.write('[]' if separator == '[\n' else '\n]')
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    refresh_run(base_path, run_dir)
+    
+    print(f"Analysis saved to {output_path}")
 
-        wins = [qid for qid, q in seen.items() if q['target'] == q['winner']]
-        losses = [(qid, q['winner']) for qid, q in seen.items() if q['target'] != q['winner']]
-        total = len(seen)
 
-        print(f"\n Query Results — {provider} \n")
-        print(f"TARGET won: {len(wins)}/{total} ({len(wins)/total*100:.1f}%)")
-        print(f"TARGET lost: {len(losses)}/{total} ({len(losses)/total*100:.1f}%)")
+def _print_brand_lines(brands, total_rows):
+    """Print (brand, is_target, count, found, score_sum, wins) tuples, already ordered."""
+    print("\n Brand Mentions Summary \n")
+    for brand, is_target, count, found, score_sum, wins in brands:
+        avg_score = score_sum / total_rows * len(brands)
+        marker = " (TARGET)" if is_target else ""
+        print(f"{brand}{marker}: {count} mentions, found in {found} answers, avg score: {avg_score:.2f}, won {wins} queries")
 
-        if losses:
-            print(f"\nQueries where TARGET lost (first 5):")
-            for qid, winner in losses[:5]:
-                print(f"  - Query {qid}: won by {winner}")
 
-        category_losses = {}
-        for qid, winner in losses:
-            categ = next(r['category'] for r in provider_results if r['question_id'] == qid)
-            if categ not in category_losses:
-                category_losses[categ] = 0
-            category_losses[categ] += 1
-        print("\nWorst categories for Target:")
-        for categ, count in sorted(category_losses.items(), key=lambda x: x[1], reverse=True)[:3]:
-            print(f" - {categ}: lost {count} queries")
+def _print_provider_lines(by_provider, num_brands):
+    """Print (brand, provider, is_target, count, found, score_sum, wins, total_for_provider) tuples."""
+    print("\n Per-Provider Breakdown \n")
+    for brand, provider, is_target, count, found, score_sum, wins, total_for_provider in by_provider:
+        avg_score = score_sum / total_for_provider * num_brands if total_for_provider else 0
+        marker = " (TARGET)" if is_target else ""
+        print(f"  [{provider}] {brand}{marker}: {count} mentions, found in {found} answers, avg score: {avg_score:.2f}, won {wins} queries")
+
+
+def _print_provider_outcome(provider, wins, total, first_losses, worst_categories):
+    losses = total - wins
+    print(f"\n Query Results — {provider} \n")
+    print(f"TARGET won: {wins}/{total} ({wins/total*100:.1f}%)")
+    print(f"TARGET lost: {losses}/{total} ({losses/total*100:.1f}%)")
+
+    if losses:
+        print(f"\nQueries where TARGET lost (first 5):")
+        for qid, winner in first_losses:
+            print(f"  - Query {qid}: won by {winner}")
+
+    print("\nWorst categories for Target:")
+    for categ, count in worst_categories:
+        print(f" - {categ}: lost {count} queries")
+
+
+def _print_totals(brands, by_provider, provider_rows, total_rows):
+    """Print `brand_totals()` frames by brand and by (brand, provider)."""
+    brands = brands.sort_values('count', ascending=False, kind='stable')
+    _print_brand_lines(
+        list(zip(brands.index, brands['is_target'], brands['count'], brands['found'], brands['score_sum'], brands['wins'])),
+        total_rows,
+    )
+
+    by_provider = by_provider.reset_index()
+    by_provider['total_for_provider'] = provider_rows.reindex(by_provider['provider']).to_numpy()
+    by_provider = by_provider.sort_values(['brand', 'count'], ascending=[True, False], kind='stable')
+    _print_provider_lines(
+        by_provider[['brand', 'provider', 'is_target', 'count', 'found', 'score_sum', 'wins', 'total_for_provider']].itertuples(index=False),
+        len(brands),
+    )
+
+
+def _provider_outcomes(outcomes):
+    """{provider: (wins, total, first five losses, losses per category)} of `query_outcomes()` rows."""
+    result = {}
+    for provider in outcomes['provider'].unique():
+        provider_outcomes = outcomes[(outcomes['provider'] == provider).to_numpy()]
+        lost = provider_outcomes[~provider_outcomes['target_won'].to_numpy()]
+        result[provider] = (
+            len(provider_outcomes) - len(lost),
+            len(provider_outcomes),
+            list(zip(lost['question_id'].iloc[:5], lost['winner'].iloc[:5])),
+            lost.groupby('category', sort=False, observed=True).size(),
+        )
+    return result
+
+
+def _print_outcomes(by_provider):
+    for provider in sorted(by_provider):
+        wins, total, first_losses, category_losses = by_provider[provider]
+        worst = category_losses.sort_values(ascending=False, kind='stable').iloc[:3]
+        _print_provider_outcome(provider, wins, total, first_losses, list(worst.items()))
+
+
+def print_summary(results):
+    df = as_frame(results)
+    _print_totals(
+        brand_totals(df),
+        brand_totals(df, by=('brand', 'provider')),
+        df.groupby('provider', observed=True).size(),
+        len(df),
+    )
 
 
+def print_query_results(results):
+    _print_outcomes(_provider_outcomes(query_outcomes(results)))
+
+
+def _merge_totals(total, part):
+    """Add one chunk's `brand_totals()` frame to the running one, keeping first-seen order."""
+    if total is None:
+        return part
+    combined = pd.concat([total, part])
+    grouped = combined.groupby(level=list(range(combined.index.nlevels)), sort=False, observed=True)
+    return grouped.agg(
+        is_target=('is_target', 'first'),
+        count=('count', 'sum'),
+        score_sum=('score_sum', 'sum'),
+        found=('found', 'sum'),
+        wins=('wins', 'sum'),
+        rows=('rows', 'sum'),
+    )
+
+
+class MentionTotals:
+    """Running aggregates over a stream of analysis rows.
+
+    Rows are folded in chunks through the same `aggregations` group-bys
+    `print_summary()` / `print_query_results()` use, so memory holds one
+    chunk plus per-brand and per-provider totals however large the run.
+    Rows of one answer must arrive together, as `iter_analysis()` yields them.
+    """
+    CHUNK_ROWS = 10000
+
+    def __init__(self):
+        self.rows = 0
+        self._chunk = []
+        self._brands = None
+        self._by_provider = None
+        self._provider_rows = None
+        self._outcomes = {}
+
+    def add(self, row):
+        chunk = self._chunk
+        # Cut chunks between answers, so query_outcomes() sees every answer whole.
+        if len(chunk) >= self.CHUNK_ROWS and (chunk[-1]['provider'], chunk[-1]['question_id']) != (row['provider'], row['question_id']):
+            self._fold()
+        self.rows += 1
+        self._chunk.append(row)
+
+    def track(self, rows):
+        """Pass rows through unchanged while adding them to the totals."""
+        for row in rows:
+            self.add(row)
+            yield row
+
+    def _fold(self):
+        if not self._chunk:
+            return
+        df = as_frame(self._chunk)
+        self._chunk = []
+        self._brands = _merge_totals(self._brands, brand_totals(df))
+        self._by_provider = _merge_totals(self._by_provider, brand_totals(df, by=('brand', 'provider')))
+        provider_rows = df.groupby('provider', observed=True).size()
+        self._provider_rows = provider_rows if self._provider_rows is None else self._provider_rows.add(provider_rows, fill_value=0)
+        for provider, (wins, total, first_losses, category_losses) in _provider_outcomes(query_outcomes(df)).items():
+            if provider not in self._outcomes:
+                self._outcomes[provider] = (wins, total, first_losses, category_losses)
+                continue
+            seen_wins, seen_total, seen_losses, seen_categories = self._outcomes[provider]
+            parts = [c for c in (seen_categories, category_losses) if len(c)]
+            categories = pd.concat(parts).groupby(level=0, sort=False, observed=True).sum() if parts else seen_categories
+            self._outcomes[provider] = (seen_wins + wins, seen_total + total, (seen_losses + first_losses)[:5], categories)
+
+    def print_summary(self):
+        self._fold()
+        if self._brands is None:
+            print_summary([])
+            return
+        _print_totals(self._brands, self._by_provider, self._provider_rows, self.rows)
+
+    def print_query_results(self):
+        self._fold()
+        _print_outcomes(self._outcomes)
 
 
 if __name__ == "__main__":
-    responses = load_answers()
+    run_dir = latest_run_dir()
     analyzer = MentionsAnalyzer()
-    results = analyzer.mention_analyzer(responses)
-    
-    save_analysis(results)
-    print_summary(results)
-    print_query_results(results)
\ No newline at end of file
+    totals = MentionTotals()
+
+    save_analysis(totals.track(analyzer.iter_analysis(iter_answers(run_dir))), run_dir)
+    totals.print_summary()
+    totals.print_query_results()
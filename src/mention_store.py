@@ -0,0 +1,215 @@
+"""Per-run, per-brand mention results that survive alias edits.
+
+Every stored run keeps a `mentions.json` next to its output files holding, for
+each brand, the mention count and first position in every answer together
+with a fingerprint of the aliases they were computed with. When the brand
+config changes, only brands whose alias set actually changed are rescanned;
+everything else is reused as is.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+from .mention_analyzer import compile_aliases
+
+logger = logging.getLogger(__name__)
+
+STORE_FILE = 'mentions.json'
+STORE_VERSION = 1
+
+# One lock per run directory: the app's background refresh, request handlers
+# and comparison threads can all update the same run's store at once.
+_run_locks = {}
+_run_locks_guard = threading.Lock()
+
+
+def alias_fingerprint(aliases):
+    """Hash of an alias set as the matcher sees it (case-folded, unordered)."""
+    keys = sorted({alias.lower() for alias in aliases if alias})
+    return hashlib.sha1(json.dumps(keys, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _output_files(run_path):
+    names = [f for f in os.listdir(run_path) if f.startswith('output_') and f.endswith('.json')]
+    return sorted(names, key=lambda f: int(f[7:-5]))
+
+
+def _source_signature(run_path, output_files):
+    digest = hashlib.sha1()
+    for filename in output_files:
+        stat = os.stat(os.path.join(run_path, filename))
+        digest.update(f"{filename}:{stat.st_mtime_ns}:{stat.st_size};".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def source_signature(run_path):
+    """Changes whenever any output file of a run is added, removed or rewritten."""
+    return _source_signature(run_path, _output_files(run_path))
+
+
+def _iter_texts(run_path, output_files):
+    """Yield (question_id, category, question, provider, text) for every non-empty answer."""
+    for filename in output_files:
+        file_path = os.path.join(run_path, filename)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            logger.error(f"Could not read {file_path}, skipping it")
+            continue
+        for provider, response_data in data['response'].items():
+            text = response_data.get('text') if isinstance(response_data, dict) else None
+            if not text:
+                continue
+            yield data['id'], data.get('category'), data.get('question', ''), provider, text
+
+
+def load_store(run_path):
+    try:
+        with open(os.path.join(run_path, STORE_FILE), 'r', encoding='utf-8') as file:
+            store = json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(store, dict) or store.get('version') != STORE_VERSION:
+        return None
+    return store
+
+
+def _run_lock(run_path):
+    with _run_locks_guard:
+        return _run_locks.setdefault(os.path.abspath(run_path), threading.Lock())
+
+
+def _write_store(run_path, store):
+    path = os.path.join(run_path, STORE_FILE)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(store, file, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def update_store(run_path, brands):
+    """Bring a run's mention store up to date with `brands` and return it.
+
+    `brands` is a list of (brand_name, aliases). Returns (store, rescanned)
+    where `rescanned` names the brands whose mentions had to be recomputed.
+    New or changed output files invalidate the whole store.
+    """
+    with _run_lock(run_path):
+        return _update_store(run_path, brands)
+
+
+def _update_store(run_path, brands):
+    output_files = _output_files(run_path)
+    signature = _source_signature(run_path, output_files)
+
+    store = load_store(run_path)
+    if store is None or store.get('source') != signature:
+        store = {'version': STORE_VERSION, 'source': signature, 'answers': None, 'questions': {}, 'brands': {}}
+
+    stale = []
+    for brand_name, aliases in brands:
+        fingerprint = alias_fingerprint(aliases)
+        if store['brands'].get(brand_name, {}).get('aliases') != fingerprint:
+            stale.append((brand_name, fingerprint, compile_aliases(aliases)))
+
+    if not stale and store['answers'] is not None:
+        return store, []
+
+    collect_answers = store['answers'] is None
+    answers, questions = [], {}
+    results = {brand_name: ([], []) for brand_name, _, _ in stale}
+    for question_id, category, question, provider, text in _iter_texts(run_path, output_files):
+        if collect_answers:
+            answers.append([question_id, category, provider, len(text)])
+            questions[str(question_id)] = question
+        text_lower = text.lower()
+        for brand_name, _, pattern in stale:
+            counts, firsts = results[brand_name]
+            positions = [m.start() for m in pattern.finditer(text_lower)] if pattern else []
+            counts.append(len(positions))
+            firsts.append(positions[0] if positions else -1)
+
+    if collect_answers:
+        store['answers'] = answers
+        store['questions'] = questions
+    for brand_name, fingerprint, _ in stale:
+        counts, firsts = results[brand_name]
+        store['brands'][brand_name] = {'aliases': fingerprint, 'counts': counts, 'first': firsts}
+
+    _write_store(run_path, store)
+    return store, [brand_name for brand_name, _, _ in stale]
+
+
+def brand_aliases(name, target, competitors):
+    """The (brand_name, aliases) list `update_store()` expects, target first."""
+    return [(name, target)] + list(competitors.items())
+
+
+def refresh_runs(results_dir, brands):
+    """Update the mention store of every run under `results_dir`.
+
+    Returns {run_name: rescanned_brands} for the runs that needed any work.
+    """
+    rescanned = {}
+    for run_name in sorted(os.listdir(results_dir)):
+        run_path = os.path.join(results_dir, run_name)
+        if not os.path.isdir(run_path) or not _output_files(run_path):
+            continue
+        _, brand_names = update_store(run_path, brands)
+        if brand_names:
+            rescanned[run_name] = brand_names
+    return rescanned
+
+
+def analysis_columns(store, name, competitors, categories=None):
+    """Analysis rows for the current brand list, as a dict of columns.
+
+    Rows come out answer by answer with the target first, then competitors in
+    config order — the layout `MentionsAnalyzer.mention_analyzer()` produces.
+    `categories` maps question ids to a fallback category for answers
+    stored without one.
+    """
+    categories = categories or {}
+    brand_names = [name] + list(competitors)
+    answers = store['answers']
+    n_answers, n_brands = len(answers), len(brand_names)
+
+    counts = np.array([store['brands'][b]['counts'] for b in brand_names], dtype=np.int64).reshape(n_brands, n_answers).T
+    firsts = np.array([store['brands'][b]['first'] for b in brand_names], dtype=np.int64).reshape(n_brands, n_answers).T
+    lengths = np.array([a[3] for a in answers], dtype=np.float64).reshape(n_answers, 1)
+
+    # First brand with the highest count wins, like max() over the mentions list.
+    top = counts.argmax(axis=1) if n_brands else np.zeros(n_answers, dtype=np.int64)
+    has_winner = counts.max(axis=1) > 0 if n_brands else np.zeros(n_answers, dtype=bool)
+    winners = [brand_names[t] if won else None for t, won in zip(top, has_winner)]
+
+    relative = np.where(firsts >= 0, firsts / np.maximum(lengths, 1), np.inf)
+    scores = np.select([relative <= 0.20, relative <= 0.60, np.isfinite(relative)], [1.0, 0.6, 0.3], 0.0)
+
+    def per_answer(values):
+        return [v for v in values for _ in range(n_brands)]
+
+    return {
+        'provider': per_answer(a[2] for a in answers),
+        'question_id': per_answer(a[0] for a in answers),
+        'category': per_answer(a[1] or categories.get(a[0], 'unknown') for a in answers),
+        'brand': brand_names * n_answers,
+        'is_target': ([True] + [False] * (n_brands - 1)) * n_answers if n_brands else [],
+        'found': (counts > 0).ravel().tolist(),
+        'count': counts.ravel().tolist(),
+        'most_mentioned': per_answer(winners),
+        'score': scores.ravel().tolist(),
+    }
+
+
+def analysis_rows(store, name, competitors, categories=None):
+    """Same as `analysis_columns()`, as the list of row dicts the CLI writes to analysis.json."""
+    columns = analysis_columns(store, name, competitors, categories)
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*columns.values())]
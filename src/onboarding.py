@@ -1,17 +1,28 @@
+from .config_loader import save_brand_config
 from .llm_clients import ask_anthropic, build_client
+from . import onboarding_cache
 import asyncio
 import json
 import re
 from datetime import datetime
-import os
 
 OUTPUT_PATH = "data/entries/configs/"
 TEMPLATES_PATH = "data/entries/query_template.json"
 
+TRANSLATION_MODEL = "claude-haiku-4-5-20251001"
+SUGGESTION_MODEL = "claude-sonnet-4-6"
+
 
 async def translate_templates(client, templates: dict, language: str) -> dict:
     if language.strip().lower() == "english":
         return templates
+    # The same template version is translated into the same language over and over.
+    cache_key = onboarding_cache.key(
+        onboarding_cache.content_hash(templates), onboarding_cache.normalize(language), TRANSLATION_MODEL
+    )
+    cached = onboarding_cache.get("translations", cache_key)
+    if cached is not None:
+        return cached
     prompt = f"""Translate the string values in the following JSON to {language}.
 Preserve every {{placeholder}} token EXACTLY (e.g. {{category}}, {{category_noun}}, {{category_plural}}, {{use_case}}). Do not translate the placeholder names.
 Keep the JSON structure identical: same keys, same array lengths.
@@ -24,14 +35,16 @@ Return ONLY the translated JSON object, no other text."""
     resp = await ask_anthropic(
         client=client,
         question=prompt,
-        model="claude-haiku-4-5-20251001",
+        model=TRANSLATION_MODEL,
         prefill="{",
         max_tokens=4000,
     )
     try:
-        return json.loads(resp["text"])
+        translated = json.loads(resp["text"])
     except json.JSONDecodeError:
         return templates
+    onboarding_cache.put("translations", cache_key, translated)
+    return translated
 
 
 def build_aliases(name: str) -> list:
@@ -65,6 +78,17 @@ def build_competitors(competitors: list, brand_name: str) -> list:
 
 async def regenerate_competitors(brand_name: str, description: str, language: str, market: str, exclude: list = None) -> list:
     exclude = [e for e in (exclude or []) if e.strip()]
+    cache_key = onboarding_cache.key(
+        onboarding_cache.normalize(brand_name),
+        onboarding_cache.normalize(description),
+        onboarding_cache.normalize(market),
+        sorted({onboarding_cache.normalize(e) for e in exclude}),
+        SUGGESTION_MODEL,
+    )
+    names = onboarding_cache.get("competitors", cache_key)
+    if names is not None:
+        return build_competitors(names, brand_name)
+
     exclude_line = f"\n  Already suggested (do NOT repeat any of these): {', '.join(exclude)}" if exclude else ""
     prompt = f"""You are finding real competitor brands for a brand visibility analysis tool.
 
@@ -85,7 +109,7 @@ async def regenerate_competitors(brand_name: str, description: str, language: st
   Return ONLY a JSON array of strings, no other text.
   Example: ["Brand A", "Brand B"]"""
     _, client = build_client("anthropic")
-    result = await ask_anthropic(client=client, question=prompt, model="claude-sonnet-4-6")
+    result = await ask_anthropic(client=client, question=prompt, model=SUGGESTION_MODEL)
     match = re.search(r"\[.*\]", result["text"], re.DOTALL)
     names = json.loads(match.group(0) if match else result["text"])
 
@@ -94,10 +118,44 @@ async def regenerate_competitors(brand_name: str, description: str, language: st
     exclude_keys = {e.lower() for e in exclude}
     names = [n for n in names if n.strip().lower() not in exclude_keys]
 
+    onboarding_cache.put("competitors", cache_key, names)
     return build_competitors(names, brand_name)
 
 
-async def generate_placeholders(brand_name: str, description: str, language: str, market: str) -> dict:
+async def _suggest_placeholders(client, prompt, brand_name, description, language, market):
+    """Parsed placeholder answer for this brand, from the cache when it was asked before."""
+    cache_key = onboarding_cache.key(
+        onboarding_cache.normalize(brand_name),
+        onboarding_cache.normalize(description),
+        onboarding_cache.normalize(language),
+        onboarding_cache.normalize(market),
+        SUGGESTION_MODEL,
+    )
+    result = onboarding_cache.get("placeholders", cache_key)
+    if result is not None:
+        return result
+    answer = await ask_anthropic(client=client, question=prompt, model=SUGGESTION_MODEL)
+    text = answer["text"]
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    result = json.loads(match.group(0) if match else text)
+    onboarding_cache.put("placeholders", cache_key, result)
+    return result
+
+
+async def _reported(stage, coro, progress):
+    value = await coro
+    if progress is not None:
+        progress(stage, value)
+    return value
+
+
+async def generate_placeholders(brand_name: str, description: str, language: str, market: str, progress=None) -> dict:
+    """Build and save a brand config for a new brand.
+
+    `progress(stage, value)`, if given, receives each partial result as it
+    arrives: "placeholders" (the parsed suggestion) and "templates" (the
+    translated templates), in whichever order they finish.
+    """
 
     with open('data/entries/config_template.json', 'r', encoding='utf-8') as file:
         cfg = json.load(file)
@@ -127,15 +185,11 @@ async def generate_placeholders(brand_name: str, description: str, language: str
     # Placeholder generation and template translation are independent LLM
     # calls (translation only needs `language`, not the placeholder result),
     # so run them concurrently instead of one after the other.
-    placeholders_result, translated_templates = await asyncio.gather(
-        ask_anthropic(client=client, question=prompt, model="claude-sonnet-4-6"),
-        translate_templates(client, templates, language),
+    result, translated_templates = await asyncio.gather(
+        _reported("placeholders", _suggest_placeholders(client, prompt, brand_name, description, language, market), progress),
+        _reported("templates", translate_templates(client, templates, language), progress),
     )
 
-    text = placeholders_result["text"]
-    match = re.search(r"\{.*\}", text, re.DOTALL)
-    result = json.loads(match.group(0) if match else text)
-
     cfg["brand_name"] = brand_name
     cfg["description"] = description
     cfg["language"] = language
@@ -149,7 +203,5 @@ async def generate_placeholders(brand_name: str, description: str, language: str
     cfg["templates"] = translated_templates
 
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    run_dir = os.path.join(OUTPUT_PATH, f'config_{timestamp}.json')
-    with open(run_dir, 'w', encoding='utf-8') as outfile:
-        json.dump(cfg, outfile, indent=4)
+    save_brand_config(cfg, name=f'config_{timestamp}.json', saved_config_path=OUTPUT_PATH)
     return cfg
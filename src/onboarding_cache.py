@@ -0,0 +1,84 @@
+"""Persistent cache of onboarding LLM results.
+
+Every onboarding sent the whole query template through a 4000-token
+translation call, and asked again for placeholders and competitors, even
+when the same template, language and brand had been seen many times before.
+Results are stored here under a hash of everything their prompt depends on
+(`key()`), one file each under `data/entries/onboarding_cache/<kind>/`, and
+mirrored in memory, so a repeat onboarding makes no LLM call at all.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "entries" / "onboarding_cache"
+
+# Entries kept on disk per kind, and in memory overall; least recently used go first.
+MAX_ENTRIES = 256
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+
+
+def normalize(text):
+    return " ".join(str(text).split()).casefold()
+
+
+def content_hash(value):
+    """Hash of a JSON value's content, independent of key order."""
+    return hashlib.sha1(json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def key(*parts):
+    """Cache key of the prompt inputs `parts` (JSON values)."""
+    return content_hash(list(parts))[:24]
+
+
+def _cache_file(kind, cache_key):
+    return CACHE_DIR / kind / f"{cache_key}.json"
+
+
+def _remember(kind, cache_key, value):
+    _memory[(kind, cache_key)] = value
+    _memory.move_to_end((kind, cache_key))
+    while len(_memory) > MAX_ENTRIES:
+        _memory.popitem(last=False)
+
+
+def get(kind, cache_key):
+    """A copy of the value stored under `cache_key`, or None."""
+    with _lock:
+        if (kind, cache_key) in _memory:
+            _memory.move_to_end((kind, cache_key))
+            return copy.deepcopy(_memory[(kind, cache_key)])
+        path = _cache_file(kind, cache_key)
+        try:
+            with path.open("r", encoding="utf-8") as fh:
+                value = json.load(fh)
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            return None
+        _remember(kind, cache_key, value)
+        return copy.deepcopy(value)
+
+
+def put(kind, cache_key, value):
+    with _lock:
+        _remember(kind, cache_key, copy.deepcopy(value))
+        path = _cache_file(kind, cache_key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("w", encoding="utf-8") as fh:
+                json.dump(value, fh, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            files = sorted(path.parent.glob("*.json"), key=lambda f: f.stat().st_mtime_ns)
+            for stale in files[:max(0, len(files) - MAX_ENTRIES)]:
+                stale.unlink()
+        except OSError:
+            pass
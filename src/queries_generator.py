@@ -4,6 +4,7 @@ from pathlib import Path
 from .config_loader import load_brand_config, CONFIG
 import asyncio as aio
 from .llm_clients import ask_provider
+from .query_registry import REGISTRY_PATH, query_id, register
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +48,9 @@ def parse_query_list(text):
                 text = "\n".join(text.split("\n")[:-1])
             text = text.strip()
         parsed = json.loads(text)
+        # JSON-mode answers wrap the list in an object, e.g. {"questions": [...]}.
+        if isinstance(parsed, dict):
+            parsed = next((value for value in parsed.values() if isinstance(value, list)), parsed)
         if not isinstance(parsed, list):
             logger.warning(f"Expected list, got {type(parsed)}. Raw: {text}")
             return []
@@ -56,62 +60,130 @@ def parse_query_list(text):
         return []
 
 
-async def generate_all_queries():
-    cfg = load_brand_config()
-    language = cfg['language']
-    market = cfg.get('market') or language
-    description = cfg['description']
-    placeholders = cfg['placeholders']
-    use_cases = placeholders['use_cases']
-    cat_noun = placeholders['category_noun']
-    cat_plural = placeholders['category_plural']
-
-    categories = [
-        ("recommendation",   "User wants to find the best option in this category"),
-        ("comparison",       "User wants to compare options or understand differences"),
-        ("problem_solving",  "User has a constraint or pain point and needs a solution"),
-        ("feature_based",    "User wants something with specific features or for a specific context"),
-        ("how_to",           "User wants guidance on how to evaluate or choose"),
-        ("audience_specific","User asking on behalf of a specific type of person"),
-        ("opinion",          "User wants subjective opinions or community sentiment"),
-    ]
+CATEGORIES = [
+    ("recommendation",   "User wants to find the best option in this category"),
+    ("comparison",       "User wants to compare options or understand differences"),
+    ("problem_solving",  "User has a constraint or pain point and needs a solution"),
+    ("feature_based",    "User wants something with specific features or for a specific context"),
+    ("how_to",           "User wants guidance on how to evaluate or choose"),
+    ("audience_specific","User asking on behalf of a specific type of person"),
+    ("opinion",          "User wants subjective opinions or community sentiment"),
+]
 
-    all_queries = []
-    id_x = 1
+# Prompt inputs a config may override for a single category, under
+# "category_overrides": {"<category>": {...}}.
+OVERRIDABLE_INPUTS = ("description", "use_cases", "cat_noun", "cat_plural", "cat_desc")
 
-    prompts = [
-        build_prompt(language, market, description, use_cases, cat_noun, cat_plural, cat_name, cat_desc)
-        for (cat_name, cat_desc) in categories
-    ]
-    provider = CONFIG["llm"]["default_provider"]
-    responses = await aio.gather(*(ask_provider(provider, prompt) for prompt in prompts))
 
-    for (cat_name, cat_desc), response in zip(categories, responses):
-        queries = parse_query_list(response['text'])
+def category_inputs(cfg, cat_name):
+    """Every value that goes into the prompt for one category, overrides applied."""
+    language = cfg['language']
+    placeholders = cfg['placeholders']
+    inputs = {
+        "language": language,
+        "market": cfg.get('market') or language,
+        "description": cfg['description'],
+        "use_cases": placeholders['use_cases'],
+        "cat_noun": placeholders['category_noun'],
+        "cat_plural": placeholders['category_plural'],
+        "cat_name": cat_name,
+        "cat_desc": dict(CATEGORIES)[cat_name],
+    }
+    overrides = (cfg.get('category_overrides') or {}).get(cat_name) or {}
+    inputs.update({key: value for key, value in overrides.items() if key in OVERRIDABLE_INPUTS})
+    return inputs
+
+
+def generation_providers():
+    """Providers to generate queries with, in order: the default, then `llm.fallback_providers`."""
+    llm = CONFIG["llm"]
+    providers = [llm["default_provider"], *(llm.get("fallback_providers") or [])]
+    return list(dict.fromkeys(providers))
+
+
+async def generate_category(cfg, cat_name):
+    """The query strings generated for one category (empty if every provider failed).
+
+    An answer that does not parse is asked for again in JSON mode; a provider
+    that fails outright, or still answers unparseably, hands over to the next
+    of `generation_providers()`, asked in JSON mode straight away.
+    """
+    prompt = build_prompt(**category_inputs(cfg, cat_name))
+    for index, provider in enumerate(generation_providers()):
+        for json_mode in ((False, True) if index == 0 else (True,)):
+            response = await ask_provider(provider, prompt, json_mode=json_mode)
+            if response is None:
+                break
+            queries = parse_query_list(response['text'] or "")
+            if queries:
+                return queries
+            logger.warning(f"{provider} returned no usable queries for {cat_name} (json_mode={json_mode})")
+    logger.error(f"Could not generate queries for {cat_name}")
+    return []
+
+
+async def iter_categories(cfg, cat_names):
+    """Yield (category, queries) for each of `cat_names` as soon as its generation finishes."""
+    tasks = {aio.ensure_future(generate_category(cfg, cat_name)): cat_name for cat_name in cat_names}
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await aio.wait(pending, return_when=aio.FIRST_COMPLETED)
+            for task in done:
+                yield tasks[task], task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def number_queries(by_category):
+    """Flatten [(category, [query, ...]), ...] into the query list, each with its stable `query_id()`.
+
+    A question repeated verbatim (up to case, accents and punctuation) keeps
+    only its first occurrence, since both would share one id.
+    """
+    all_queries = []
+    seen = set()
+    for cat_name, queries in by_category:
         for query in queries:
+            qid = query_id(query)
+            if qid in seen:
+                logger.debug(f"Skipping repeated query: {query}")
+                continue
+            seen.add(qid)
             all_queries.append({
-                'id': id_x,
+                'id': qid,
                 'category': cat_name,
                 'query': query
             })
-            id_x += 1
-
     return all_queries
 
 
-def save_queries(queries, queries_path=OUTPUT_PATH):
-    config = load_brand_config()
+async def generate_all_queries(cfg=None):
+    cfg = cfg if cfg is not None else load_brand_config()
+    names = [cat_name for cat_name, _ in CATEGORIES]
+    results = {cat_name: queries async for cat_name, queries in iter_categories(cfg, names)}
+    return number_queries((cat_name, results[cat_name]) for cat_name in names)
+
+
+def save_queries(queries, queries_path=OUTPUT_PATH, config=None, dropped=()):
+    """Write the queries to run, plus the near-duplicates dropped from them (not run)."""
+    config = config if config is not None else load_brand_config()
     output = {
         "brand": config["target"]["name"],
         "competitors": [c["name"] for c in config["competitors"]],
         "queries": queries
     }
+    if dropped:
+        output["dropped"] = list(dropped)
 
     try:
         with open(queries_path, 'w', encoding='utf-8') as outfile:
             json.dump(output, outfile, indent=2)
 
         logger.info(f"Saved {len(queries)} queries to {queries_path}")
+        # The id registry lives next to the query list.
+        register([*queries, *dropped], Path(queries_path).with_name(REGISTRY_PATH.name))
 
     except PermissionError:
         logger.error(f"Permission denied writing to: {queries_path}")
@@ -119,6 +191,7 @@ def save_queries(queries, queries_path=OUTPUT_PATH):
 
 
 if __name__ == "__main__":
-    queries = aio.run(generate_all_queries())
-    save_queries(queries)
-    print(f"Generated {len(queries)} queries")
+    from .query_dedup import drop_near_duplicates
+    queries, dropped = drop_near_duplicates(aio.run(generate_all_queries()))
+    save_queries(queries, dropped=dropped)
+    print(f"Generated {len(queries)} queries ({len(dropped)} near-duplicates dropped)")
@@ -0,0 +1,173 @@
+"""Near-duplicate detection for generated queries.
+
+The category prompts are generated independently, so they often come back
+with paraphrases of the same question, and every duplicate costs one paid
+call per provider per run. Queries are compared by the Jaccard similarity of
+their character shingles (after normalizing case, accents and punctuation).
+
+Comparing every pair is quadratic, so candidates are found with MinHash
+signatures bucketed by LSH bands: two queries share a bucket with high
+probability only when they are similar. Candidate pairs whose signatures
+estimate them clearly below the threshold are discarded, and the rest are
+checked exactly.
+"""
+
+import logging
+import re
+import unicodedata
+
+import numpy as np
+
+from .config_loader import CONFIG
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 5
+
+# 16 bands of 4 rows: pairs at Jaccard 0.5 become candidates ~65% of the time,
+# pairs at 0.7 ~98% of the time, so any threshold from about 0.6 up is covered.
+BANDS = 16
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+
+# Candidates whose estimated similarity is this far below the threshold are
+# not checked exactly (the estimate's standard error is ~0.06 at 64 hashes).
+ESTIMATE_SLACK = 0.2
+
+_rng = np.random.default_rng(20240611)
+# Multiply-shift hash family: odd 64-bit multipliers, keep the high 32 bits.
+_MULTIPLIERS = _rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_OFFSETS = _rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64)
+_SHINGLE_BASE = np.uint64(0x100000001B3)
+_SHINGLE_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+_COMBINING_MARKS = re.compile(r"[\u0300-\u036f]")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def default_threshold():
+    """`query_runner.dedup_threshold` from config.yaml; None disables deduplication."""
+    return CONFIG.get("query_runner", {}).get("dedup_threshold")
+
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation, and collapse whitespace."""
+    text = _COMBINING_MARKS.sub("", unicodedata.normalize("NFKD", text))
+    return _NON_WORD.sub(" ", text.casefold()).strip()
+
+
+def shingle_hashes(texts, size=SHINGLE_SIZE):
+    """Hashes of the character `size`-grams of every normalized text.
+
+    Returns (owners, hashes): parallel arrays of text index and shingle hash,
+    sorted and without repeats. Texts shorter than `size` form one shingle.
+    """
+    texts = [normalize(text).ljust(size) for text in texts]
+    lengths = np.array([len(text) for text in texts])
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    count = len(codes) - size + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(size):
+        hashes = hashes * _SHINGLE_BASE + codes[offset:offset + count]
+    owners = np.repeat(np.arange(len(texts)), lengths)[:count]
+    ends = np.cumsum(lengths)[owners]
+    # Keep windows that lie within a single text.
+    inside = np.arange(count) + size <= ends
+    # One sortable key per shingle: text index in the top 24 bits, the hash's
+    # high bits (mixed so every character reaches them) below.
+    mixed = (hashes[inside] * _SHINGLE_MIX) >> np.uint64(24)
+    keys = np.sort((owners[inside].astype(np.uint64) << np.uint64(40)) | mixed)
+    keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    return (keys >> np.uint64(40)).astype(np.intp), keys & np.uint64(2**40 - 1)
+
+
+def signatures(owners, hashes, n):
+    """(n, NUM_PERM) MinHash signature matrix of the shingles each text owns."""
+    starts = np.searchsorted(owners, np.arange(n))
+    signature = np.empty((NUM_PERM, n), dtype=np.uint64)
+    # A few permutations at a time keeps the (permutations x shingles) block small.
+    hashed = np.empty((16, len(hashes)), dtype=np.uint64)
+    for lo in range(0, NUM_PERM, 16):
+        np.multiply(_MULTIPLIERS[lo:lo + 16, None], hashes, out=hashed)
+        hashed += _OFFSETS[lo:lo + 16, None]
+        hashed >>= np.uint64(32)
+        signature[lo:lo + 16] = np.minimum.reduceat(hashed, starts, axis=1)
+    return signature.T
+
+
+def candidate_pairs(signature):
+    """(earlier, later) index arrays of signatures sharing at least one band."""
+    pairs = set()
+    for band in range(BANDS):
+        rows = np.ascontiguousarray(signature[:, band * ROWS:(band + 1) * ROWS])
+        keys = rows.view(np.dtype((np.void, rows.dtype.itemsize * ROWS))).ravel()
+        _, bucket, sizes = np.unique(keys, return_inverse=True, return_counts=True)
+        shared = np.flatnonzero(sizes[bucket] > 1)
+        buckets = {}
+        for index in shared.tolist():
+            buckets.setdefault(bucket[index], []).append(index)
+        for members in buckets.values():
+            pairs.update((a, b) for pos, b in enumerate(members) for a in members[:pos])
+    if not pairs:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    earlier, later = np.array(sorted(pairs), dtype=np.intp).T
+    return earlier, later
+
+
+def near_duplicates(texts, threshold):
+    """{index: (earlier_index, similarity)} for every text to drop.
+
+    A text is dropped when it is at least `threshold` similar to an earlier
+    text that is itself kept, so of each group of paraphrases the first one
+    survives.
+    """
+    if len(texts) < 2:
+        return {}
+    owners, hashes = shingle_hashes(texts)
+    signature = signatures(owners, hashes, len(texts))
+    earlier, later = candidate_pairs(signature)
+    estimate = (signature[earlier] == signature[later]).mean(axis=1)
+    close = estimate >= threshold - ESTIMATE_SLACK
+
+    starts = np.searchsorted(owners, np.arange(len(texts) + 1))
+    sets = {}
+
+    def shingle_set(index):
+        if index not in sets:
+            sets[index] = set(hashes[starts[index]:starts[index + 1]].tolist())
+        return sets[index]
+
+    dropped = {}
+    # Pairs are sorted by later index, so every earlier text's fate is settled first.
+    for a, b in sorted(zip(later[close].tolist(), earlier[close].tolist())):
+        if b in dropped:
+            continue
+        a_set, b_set = shingle_set(a), shingle_set(b)
+        common = len(a_set & b_set)
+        similarity = common / (len(a_set) + len(b_set) - common)
+        if similarity >= threshold and (a not in dropped or similarity > dropped[a][1]):
+            dropped[a] = (b, similarity)
+    return dropped
+
+
+def drop_near_duplicates(queries, threshold=None):
+    """Split generated queries into (kept, dropped).
+
+    Dropped entries are the query dicts plus `duplicate_of` (the id of the
+    kept query they repeat) and `similarity`. `threshold` defaults to
+    `default_threshold()`; with no threshold every query is kept.
+    """
+    threshold = threshold if threshold is not None else default_threshold()
+    if threshold is None:
+        return list(queries), []
+    duplicates = near_duplicates([q["query"] for q in queries], threshold)
+    kept, dropped = [], []
+    for index, query in enumerate(queries):
+        if index in duplicates:
+            earlier, similarity = duplicates[index]
+            dropped.append({**query, "duplicate_of": queries[earlier]["id"], "similarity": round(similarity, 3)})
+        else:
+            kept.append(query)
+    if dropped:
+        logger.info(f"Dropped {len(dropped)} near-duplicate queries of {len(queries)}")
+    return kept, dropped
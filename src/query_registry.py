@@ -0,0 +1,105 @@
+"""Stable query ids and the registry mapping them back to question text.
+
+Numbering queries 1..N in generation order gave the same question a different
+id in every run, so anything joining runs had to match on question text.
+Ids are now a 48-bit hash of the normalized question: the same question gets
+the same id in every run and for every brand config, and the ids still fit
+in a JavaScript number. Every id ever saved is recorded with its question in
+`data/entries/query_registry.json`, so an id can be resolved without opening
+any run's output files.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+from .query_dedup import normalize
+
+logger = logging.getLogger(__name__)
+
+QUERY_ID_BYTES = 6  # 48 bits, well inside Number.MAX_SAFE_INTEGER
+
+REGISTRY_PATH = Path(__file__).resolve().parent.parent / "data" / "entries" / "query_registry.json"
+
+_lock = threading.Lock()
+
+# Parsed registry of the last file read, reused while the file's mtime is unchanged.
+_cache = {
+    "path": None,
+    "stamp": None,
+    "registry": None,
+}
+
+
+def query_id(text):
+    """Stable integer id of a question (equal for texts that only differ in case, accents or punctuation)."""
+    digest = hashlib.blake2b(normalize(text).encode("utf-8"), digest_size=QUERY_ID_BYTES).digest()
+    return int.from_bytes(digest, "big")
+
+
+def load_registry(path=REGISTRY_PATH):
+    """{query_id: question} of every query saved so far."""
+    path = Path(path)
+    try:
+        stamp = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if _cache["path"] == path and _cache["stamp"] == stamp:
+        return _cache["registry"]
+    try:
+        with path.open("r", encoding="utf-8") as fh:
+            stored = json.load(fh)
+    except (json.JSONDecodeError, OSError):
+        return {}
+    registry = {int(qid): question for qid, question in stored.items()}
+    _cache.update(path=path, stamp=stamp, registry=registry)
+    return registry
+
+
+def lookup(qid, path=REGISTRY_PATH):
+    """The question registered under `qid`, or None."""
+    return load_registry(path).get(int(qid))
+
+
+def select(queries, ids, path=REGISTRY_PATH):
+    """The queries whose id is in `ids`, in `queries` order.
+
+    Ids not in `queries` but registered (questions from an earlier query
+    list) are resolved to their question and added after them, without a
+    category. Ids nobody registered are logged and skipped.
+    """
+    ids = {int(qid) for qid in ids}
+    selected = [q for q in queries if q["id"] in ids]
+    for qid in sorted(ids - {q["id"] for q in selected}):
+        question = lookup(qid, path)
+        if question is None:
+            logger.warning(f"Unknown query id {qid}")
+            continue
+        selected.append({"id": qid, "category": None, "query": question})
+    return selected
+
+
+def register(queries, path=REGISTRY_PATH):
+    """Record the question of every query dict ({"id", "query", ...}) not registered yet."""
+    path = Path(path)
+    with _lock:
+        registry = load_registry(path)
+        new = {}
+        for query in queries:
+            known = registry.get(query["id"])
+            if known is None:
+                new[query["id"]] = query["query"]
+            elif normalize(known) != normalize(query["query"]):
+                logger.warning(f"Query id {query['id']} collides: {known!r} vs {query['query']!r}")
+        if not new:
+            return
+        registry = {**registry, **new}
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp_path.open("w", encoding="utf-8") as fh:
+            json.dump({str(qid): question for qid, question in registry.items()}, fh, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        _cache.update(path=path, stamp=path.stat().st_mtime_ns, registry=registry)
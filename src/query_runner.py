@@ -1,9 +1,14 @@
 import json
-from .llm_clients import ask_provider, ask_all_providers
+import re
+from .llm_clients import ask_provider, ask_all_providers, client_pool
+from .run_index import refresh_run
+from .config_loader import load_brand_config
+from .query_registry import select
 import os
 from datetime import datetime
 import asyncio as aio
 import argparse
+from functools import partial
 
 
 class QueryOutput:
@@ -54,13 +59,14 @@ class QueryRunner:
     def filter_queries(queries, start=None, limit=None, ids=None):
 
         if ids is not None:
-            return [q for q in queries if q['id'] in ids]
+            return select(queries, ids)
         
         result = queries
         
-        # Filter by start ID
+        # Start from the query with this ID (ids are hashes, so by position, not value)
         if start is not None:
-            result = [q for q in result if q['id'] >= start]
+            positions = [i for i, q in enumerate(result) if q['id'] == start]
+            result = result[positions[0]:] if positions else []
         
         # Limit
         if limit is not None:
@@ -70,7 +76,7 @@ class QueryRunner:
 
   
     @staticmethod
-    async def process_one(semaphore, run_dir, query, counter, total, mode="all"):
+    async def process_one(semaphore, run_dir, query, counter, total, mode="all", new_cutoff=None):
 
         async with semaphore: 
             query_id = query['id']
@@ -78,9 +84,9 @@ class QueryRunner:
             category = query['category']
             
             if mode == "all":
-                responses = await ask_all_providers(question)
+                responses = await ask_all_providers(question, new_cutoff=new_cutoff)
             else:
-                responses = {mode: await ask_provider(mode, question)}
+                responses = {mode: await ask_provider(mode, question, cutoff=new_cutoff(mode) if new_cutoff else None)}
             
             
             output = QueryOutput(query_id, question, category, responses)
@@ -90,6 +96,7 @@ class QueryRunner:
             try:
                 with open(output_path, 'w', encoding='utf-8') as outfile:
                     json.dump(output.to_dict(), outfile, indent=4)
+                append_summary(run_dir, output.to_dict())
 
                 counter[0] += 1
                 print(f"[{counter[0]}/{total}] Query {query_id} saved to {output_path}")
@@ -133,37 +140,104 @@ class QueryRunner:
         total = len(queries)
         counter = [0]
 
-        tasks = [QueryRunner.process_one(semaphore=sem, query=query, run_dir=run_dir, counter=counter, total=total, mode=mode) for query in queries]
+        # Imported here: the mention analyzer imports this module.
+        from .stream_cutoff import StreamCutoff, config_brands
+        new_cutoff = partial(StreamCutoff.from_config, brands=config_brands(load_brand_config()))
 
-        await aio.gather(*tasks)
+        tasks = [QueryRunner.process_one(semaphore=sem, query=query, run_dir=run_dir, counter=counter, total=total, mode=mode, new_cutoff=new_cutoff) for query in queries]
+
+        # The index is refreshed when the run starts and ends, not per query;
+        # the webapp's reconciler picks up progress in between.
+        results_dir, run_name = os.path.split(os.path.normpath(run_dir))
+        refresh_run(results_dir, run_name)
+        async with client_pool():
+            await aio.gather(*tasks)
         generate_summary(run_dir)
+        refresh_run(results_dir, run_name)
+
+SUMMARY_LOG = 'summary.jsonl'
+
+# Log lines start with the query id (`QueryOutput.to_dict()` puts it first),
+# so the ids can be read without parsing whole entries.
+_LOGGED_ID = re.compile(rb'^\{"id": (-?\d+)[,}]')
+
+
+def append_summary(run_dir, entry):
+    """Append one query output to the run's summary log.
+
+    The log is JSON Lines so each finished query costs a single short append
+    instead of a rewrite of everything collected so far.
+    """
+    log_path = os.path.join(run_dir, SUMMARY_LOG)
+    with open(log_path, 'a', encoding='utf-8') as log:
+        log.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+def _rebuild_summary_log(run_dir, output_files):
+    # Runs written before the log existed, or interrupted between writing an
+    # output file and appending it, get their log rebuilt once from disk.
+    log_path = os.path.join(run_dir, SUMMARY_LOG)
+    tmp_path = log_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as log:
+        for filename in sorted(output_files, key=lambda f: int(f[7:-5])):
+            with open(os.path.join(run_dir, filename), 'r', encoding='utf-8') as file:
+                log.write(json.dumps(json.load(file), ensure_ascii=False) + '\n')
+    os.replace(tmp_path, log_path)
+
+
+def _logged_ids(log_path):
+    """Query ids in the summary log, in log order; None if it is missing or unreadable."""
+    ids = []
+    try:
+        with open(log_path, 'rb') as log:
+            for line in log:
+                match = _LOGGED_ID.match(line)
+                if match:
+                    ids.append(int(match.group(1)))
+                elif line.strip():
+                    ids.append(json.loads(line)["id"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return ids
+
 
 def generate_summary(run_dir):
-    results = []
+    """Finalize the run summary from the incrementally written log.
 
+    Only the output file names and the log's ids are read; the outputs
+    themselves are reread just when the log is missing or does not hold
+    each output exactly once.
+    """
+    output_files = [f for f in os.listdir(run_dir) if f.startswith("output_") and f.endswith(".json")]
 
-    for filename in os.listdir(run_dir):
-        if filename.startswith("output_") and filename.endswith(".json"):
-            with open(os.path.join(run_dir,filename),'r', encoding='utf-8') as file:
-                data = json.load(file)
-                results.append(data)
-    
-    rundirname = os.path.basename(run_dir)
+    logged = _logged_ids(os.path.join(run_dir, SUMMARY_LOG))
+    if logged is None or sorted(logged) != sorted(int(f[7:-5]) for f in output_files):
+        _rebuild_summary_log(run_dir, output_files)
+
+    rundirname = os.path.basename(os.path.normpath(run_dir))
     summary = {
         "run_info": {
             "timestamp": rundirname[4:],
-            "total_queries": len(results),
+            "total_queries": len(output_files),
+            "results_file": SUMMARY_LOG,
         },
-        "results": results
     }
 
     output_path = os.path.join(run_dir, 'summary.json')
     with open(output_path, 'w', encoding='utf-8') as outfile:
-        json.dump(summary , outfile, indent=4)
-    
+        json.dump(summary, outfile, indent=4)
+
     print(f"Summary saved to {output_path}")
 
 
+def load_summary_results(run_dir):
+    """Yield every query output recorded in the run's summary log."""
+    with open(os.path.join(run_dir, SUMMARY_LOG), 'r', encoding='utf-8') as log:
+        for line in log:
+            if line.strip():
+                yield json.loads(line)
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Run queries against LLMs")
     
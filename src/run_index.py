@@ -0,0 +1,167 @@
+"""Catalog of stored runs kept in `data/results/index.json`.
+
+Listing runs used to glob every output file of every run and open each
+`meta.json` on every request. The index keeps one small entry per run
+(label, brand, query count, analysis status, timestamps) that writers
+refresh when a run starts and finishes, so listing is a single cached file read.
+`reconcile()` catches directories changed by anything else by comparing
+each run directory's mtime with the one recorded in its entry.
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+INDEX_FILE = 'index.json'
+INDEX_VERSION = 1
+
+_lock = threading.Lock()
+
+# Run directories are named after their start time, with a suffix when
+# several runs start within the same second.
+_RUN_NAME = re.compile(r"run_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})(?:_(\d+))?$")
+
+# Parsed index of the last file read, reused while the file's mtime is unchanged.
+_cache = {
+    "path": None,
+    "stamp": None,
+    "index": None,
+}
+
+
+def _index_path(results_dir):
+    return os.path.join(results_dir, INDEX_FILE)
+
+
+def _empty_index():
+    return {"version": INDEX_VERSION, "runs": {}}
+
+
+def run_sort_key(run_name):
+    """Orders run names by start time, then suffix; names not from a run's start time sort first.
+
+    Directory mtimes are no guide: reading an old run can write into it.
+    """
+    match = _RUN_NAME.match(run_name)
+    if match is None:
+        return ("", 0, run_name)
+    return (match.group(1), int(match.group(2) or 1), run_name)
+
+
+def _run_created(run_name, run_path):
+    match = _RUN_NAME.match(run_name)
+    if match is not None:
+        return datetime.strptime(match.group(1), "%Y-%m-%d_%H-%M-%S").isoformat()
+    return datetime.fromtimestamp(os.stat(run_path).st_ctime).isoformat(timespec="seconds")
+
+
+def scan_run(run_path):
+    """Build a run's index entry from its directory."""
+    run_name = os.path.basename(os.path.normpath(run_path))
+    names = os.listdir(run_path)
+    meta = {}
+    if 'meta.json' in names:
+        try:
+            with open(os.path.join(run_path, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            meta = {}
+        if not isinstance(meta, dict):
+            meta = {}
+    stat = os.stat(run_path)
+    return {
+        "name": run_name,
+        "label": meta.get("label") or run_name,
+        "brand": meta.get("brand") or None,
+        "query_count": sum(1 for f in names if f.startswith("output_") and f.endswith(".json")),
+        "has_analysis": 'analysis.json' in names,
+        "created": _run_created(run_name, run_path),
+        "updated": datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds"),
+        "dir_mtime": stat.st_mtime_ns,
+    }
+
+
+def load_index(results_dir):
+    """The parsed index, or None if it has not been built yet."""
+    path = _index_path(results_dir)
+    try:
+        stamp = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _cache["path"] == path and _cache["stamp"] == stamp:
+        return _cache["index"]
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+    if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+        return None
+    _cache.update(path=path, stamp=stamp, index=index)
+    return index
+
+
+def _write_index(results_dir, index):
+    path = _index_path(results_dir)
+    # The run worker and the API process both write the index: a temp file of
+    # their own each keeps one writer from replacing another's half-written file.
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    _cache.update(path=path, stamp=os.stat(path).st_mtime_ns, index=index)
+
+
+def refresh_run(results_dir, run_name):
+    """Re-read one run's directory into the index (call after writing to it)."""
+    run_path = os.path.join(results_dir, run_name)
+    with _lock:
+        index = load_index(results_dir) or _empty_index()
+        runs = dict(index["runs"])
+        if os.path.isdir(run_path):
+            runs[run_name] = scan_run(run_path)
+        else:
+            runs.pop(run_name, None)
+        _write_index(results_dir, {"version": INDEX_VERSION, "runs": runs})
+
+
+def reconcile(results_dir):
+    """Rescan run directories whose mtime no longer matches the index.
+
+    Costs one stat per run when nothing changed. Returns True if the index
+    was rewritten.
+    """
+    if not os.path.isdir(results_dir):
+        return False
+    with _lock:
+        index = load_index(results_dir)
+        known = index["runs"] if index else {}
+        runs = {}
+        changed = index is None
+        for entry in os.scandir(results_dir):
+            if not entry.is_dir():
+                continue
+            current = known.get(entry.name)
+            if current is not None and current.get("dir_mtime") == entry.stat().st_mtime_ns:
+                runs[entry.name] = current
+                continue
+            runs[entry.name] = scan_run(entry.path)
+            changed = True
+        if set(runs) != set(known):
+            changed = True
+        if changed:
+            _write_index(results_dir, {"version": INDEX_VERSION, "runs": runs})
+        return changed
+
+
+def list_indexed_runs(results_dir):
+    """Index entries of every run with at least one output, newest name first."""
+    index = load_index(results_dir)
+    if index is None:
+        reconcile(results_dir)
+        index = load_index(results_dir) or _empty_index()
+    runs = [r for r in index["runs"].values() if r.get("query_count")]
+    runs.sort(key=lambda r: r["name"], reverse=True)
+    return runs
@@ -0,0 +1,91 @@
+"""Mention detection on a streamed answer, and when to stop reading it.
+
+With `llm.streaming.enabled`, answers are read token by token. A
+`StreamCutoff` is fed each piece as it arrives, records where every tracked
+brand first appears, and tells the reader to stop once the answer is long
+enough to matter: after `max_chars` characters, or `chars_after_first_mention`
+characters past the first brand mention (by then the answer's lead
+recommendation is known). Stopping early saves output tokens and latency;
+position scores are then relative to the shortened answer.
+"""
+
+from .llm_clients import get_llm_setting
+from .mention_analyzer import compile_aliases
+
+
+def config_brands(config):
+    """{brand: aliases} of a brand config's target and competitors."""
+    brands = {config["target"]["name"]: config["target"]["aliases"]}
+    brands.update((c["name"], c["aliases"]) for c in config["competitors"])
+    return brands
+
+
+class StreamCutoff:
+    """Watches one streamed answer for tracked brands and decides when to stop reading it."""
+
+    def __init__(self, brands=None, max_chars=None, chars_after_first_mention=None):
+        brands = brands or {}
+        self.max_chars = max_chars
+        self.chars_after_first_mention = chars_after_first_mention
+        self._aliases = tuple(sorted((brand, tuple(aliases)) for brand, aliases in brands.items()))
+        self._patterns = [
+            (brand, pattern) for brand, pattern in ((b, compile_aliases(a)) for b, a in brands.items())
+            if pattern is not None
+        ]
+        # A match can straddle two pieces, so each scan re-reads the tail of the last one.
+        self._overlap = max((len(alias) for aliases in brands.values() for alias in aliases), default=0) + 1
+        self.reset()
+
+    @classmethod
+    def from_config(cls, provider_name, brands=None):
+        """A cutoff with the `llm.streaming` limits of `provider_name`."""
+        settings = get_llm_setting(provider_name, "streaming", {}) or {}
+        return cls(brands, settings.get("max_chars"), settings.get("chars_after_first_mention"))
+
+    def reset(self):
+        self.text = ""
+        self.first_positions = {}
+        self._scanned = 0
+
+    def signature(self):
+        """Everything that shapes the answer this cutoff produces (identical cutoffs cut identically)."""
+        return self.max_chars, self.chars_after_first_mention, self._aliases
+
+    def _detect(self, final=False):
+        lower = self.text.lower()
+        start = max(0, self._scanned - self._overlap)
+        for brand, pattern in self._patterns:
+            if brand in self.first_positions:
+                continue
+            match = pattern.search(lower, start)
+            # A match touching the end may still grow into a longer word; confirm it next time.
+            if match and (final or match.end() < len(lower)):
+                self.first_positions[brand] = match.start()
+        self._scanned = len(lower)
+
+    def feed(self, piece):
+        """Add the next piece of the answer; True once reading should stop."""
+        self.text += piece
+        if self._patterns:
+            self._detect()
+        return self.should_stop()
+
+    def finish(self):
+        """The answer ended: accept the matches still waiting at its end."""
+        if self._patterns:
+            self._detect(final=True)
+
+    def should_stop(self):
+        length = len(self.text)
+        if self.max_chars is not None and length >= self.max_chars:
+            return True
+        if self.chars_after_first_mention is not None and self.first_positions:
+            return length >= min(self.first_positions.values()) + self.chars_after_first_mention
+        return False
+
+    def first_mentions(self):
+        """[{"brand", "position"}] of the brands seen so far, in order of appearance."""
+        return [
+            {"brand": brand, "position": position}
+            for brand, position in sorted(self.first_positions.items(), key=lambda item: item[1])
+        ]
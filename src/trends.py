@@ -0,0 +1,152 @@
+"""Per-run brand totals kept in `data/results/trends.json` for cross-run trends.
+
+Charting a brand over time used to mean building every run's full analysis.
+Instead, when a run's analysis is built its totals (mentions, found-in, wins
+and position score) are recorded here once, overall and per provider and
+category, tagged with a fingerprint of the inputs they came from. Serving a
+trend is then a single cached file read plus a fingerprint check per run.
+"""
+
+import json
+import os
+import threading
+
+from .aggregations import as_frame, brand_totals
+
+TRENDS_FILE = 'trends.json'
+TRENDS_VERSION = 1
+
+METRICS = ('mentions', 'found_in', 'wins', 'avg_score')
+
+_lock = threading.Lock()
+
+# Parsed store of the last file read, reused while the file's mtime is unchanged.
+_cache = {
+    "path": None,
+    "stamp": None,
+    "trends": None,
+}
+
+
+def _trends_path(results_dir):
+    return os.path.join(results_dir, TRENDS_FILE)
+
+
+def _totals(totals):
+    """{brand: [mentions, found_in, wins, score_sum, rows]} from a brand_totals() frame."""
+    return {
+        str(brand): [int(count), int(found), int(wins), float(score_sum), int(rows)]
+        for brand, count, found, wins, score_sum, rows in zip(
+            totals.index, totals['count'], totals['found'], totals['wins'], totals['score_sum'], totals['rows']
+        )
+    }
+
+
+def _grouped_totals(results, key):
+    totals = brand_totals(results, by=(key, 'brand'))
+    grouped = {}
+    for group in totals.index.get_level_values(0).unique():
+        grouped[str(group)] = _totals(totals.xs(group, level=0))
+    return grouped
+
+
+def run_point(results):
+    """A run's brand totals, overall and per provider and category."""
+    df = as_frame(results)
+    return {
+        "brands": _totals(brand_totals(df)),
+        "providers": _grouped_totals(df, 'provider'),
+        "categories": _grouped_totals(df, 'category'),
+    }
+
+
+def load_trends(results_dir):
+    """{run_name: entry} of every recorded run (empty if nothing is recorded yet)."""
+    path = _trends_path(results_dir)
+    try:
+        stamp = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if _cache["path"] == path and _cache["stamp"] == stamp:
+        return _cache["trends"]
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {}
+    if not isinstance(stored, dict) or stored.get("version") != TRENDS_VERSION:
+        return {}
+    _cache.update(path=path, stamp=stamp, trends=stored["runs"])
+    return stored["runs"]
+
+
+def _write_trends(results_dir, runs):
+    path = _trends_path(results_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": TRENDS_VERSION, "runs": runs}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    _cache.update(path=path, stamp=os.stat(path).st_mtime_ns, trends=runs)
+
+
+def record_runs(results_dir, entries, keep=None):
+    """Store {run_name: {"fingerprint": ..., "point": run_point(...)}} entries.
+
+    With `keep`, entries of runs not in it (deleted runs) are dropped.
+    """
+    with _lock:
+        runs = dict(load_trends(results_dir))
+        runs.update(entries)
+        if keep is not None:
+            runs = {name: entry for name, entry in runs.items() if name in keep}
+        _write_trends(results_dir, runs)
+
+
+def _metrics(values):
+    if values is None:
+        return None
+    mentions, found_in, wins, score_sum, rows = values
+    return {
+        "mentions": mentions,
+        "found_in": found_in,
+        "wins": wins,
+        "avg_score": round(score_sum / rows, 2) if rows else 0.0,
+    }
+
+
+def _brand_series(points, brands):
+    """{brand: {metric: [value per point]}}, None where a point lacks the brand."""
+    series = {}
+    for brand in brands:
+        per_run = [_metrics(point.get(brand)) if point is not None else None for point in points]
+        series[brand] = {metric: [m[metric] if m else None for m in per_run] for metric in METRICS}
+    return series
+
+
+def _group_names(points, key):
+    names = {}
+    for point in points:
+        for name in point[key]:
+            names.setdefault(name, None)
+    return list(names)
+
+
+def series(points, brands):
+    """Align run points (oldest first) into per-run arrays for each brand.
+
+    Returns brand series overall and per provider and category:
+    `brands[brand][metric]`, `providers[provider][brand][metric]` and
+    `categories[category][brand][metric]`, each a list with one value per
+    point.
+    """
+    return {
+        "brands": _brand_series([p["brands"] for p in points], brands),
+        "providers": {
+            provider: _brand_series([p["providers"].get(provider) for p in points], brands)
+            for provider in _group_names(points, "providers")
+        },
+        "categories": {
+            category: _brand_series([p["categories"].get(category) for p in points], brands)
+            for category in _group_names(points, "categories")
+        },
+    }
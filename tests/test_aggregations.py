@@ -0,0 +1,77 @@
+# Tests for aggregations.py
+
+import pytest
+from src.aggregations import as_frame, brand_summary, provider_comparison, category_performance, query_outcomes
+
+
+def _row(provider, qid, category, brand, count, most_mentioned, score):
+    return {
+        'provider': provider,
+        'question_id': qid,
+        'category': category,
+        'brand': brand,
+        'is_target': brand == "Obsidian",
+        'found': count > 0,
+        'count': count,
+        'most_mentioned': most_mentioned,
+        'score': score,
+    }
+
+
+@pytest.fixture
+def results():
+    return [
+        _row("openai", 1, "recommendation", "Obsidian", 2, "Obsidian", 1.0),
+        _row("openai", 1, "recommendation", "Notion", 1, "Obsidian", 0.6),
+        _row("google", 1, "recommendation", "Obsidian", 0, "Notion", 0.0),
+        _row("google", 1, "recommendation", "Notion", 3, "Notion", 1.0),
+        _row("openai", 2, "comparison", "Obsidian", 0, None, 0.0),
+        _row("openai", 2, "comparison", "Notion", 0, None, 0.0),
+    ]
+
+
+class TestBrandSummary:
+
+    def test_totals_sorted_by_mentions(self, results):
+        summary = brand_summary(results)
+
+        assert [s['brand'] for s in summary] == ["Notion", "Obsidian"]
+        notion = summary[0]
+        assert notion['mentions'] == 4
+        assert notion['found_in'] == 2
+        assert notion['wins'] == 1
+        assert notion['avg_score'] == round(1.6 / 6 * 2, 2)
+
+    def test_accepts_frame_or_rows(self, results):
+        assert brand_summary(as_frame(results)) == brand_summary(results)
+
+
+class TestProviderAndCategory:
+
+    def test_provider_comparison_for_target(self, results):
+        comparison = provider_comparison(results, "Obsidian")
+
+        assert comparison['providers'] == ["google", "openai"]
+        assert comparison['mentions'] == [0, 2]
+        assert comparison['wins'] == [0, 1]
+        assert comparison['avg_scores'] == [0.0, round(1.0 / 4 * 2, 2)]
+
+    def test_category_win_rates(self, results):
+        performance = category_performance(results, "Obsidian")
+
+        assert performance['categories'] == ["comparison", "recommendation"]
+        assert performance['total_queries'] == [1, 2]
+        assert performance['win_rates'] == [0, 50.0]
+
+
+class TestQueryOutcomes:
+
+    def test_one_row_per_provider_question(self, results):
+        outcomes = query_outcomes(results)
+
+        assert list(zip(outcomes['provider'], outcomes['question_id'], outcomes['target_won'])) == [
+            ("openai", 1, True),
+            ("google", 1, False),
+            ("openai", 2, False),
+        ]
+        assert outcomes['winner'].tolist() == ["Obsidian", "Notion", None]
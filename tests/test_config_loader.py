@@ -1,8 +1,10 @@
 
 # tests for the config_loader module.
 
+import json
+import os
 from pathlib import Path
-from src.config_loader import load_config
+from src.config_loader import load_brand_config, load_config, save_brand_config, set_active_config
 
 import pytest
 
@@ -35,3 +37,42 @@ def test_load_config_contains_expected_values():
     max_tokens = config['llm']['max_tokens']
     assert isinstance(max_tokens, int)
     assert max_tokens > 0
+
+
+class TestBrandConfig:
+
+    @staticmethod
+    def _write(path, brand):
+        path.write_text(json.dumps({"target": {"name": brand, "aliases": [brand]}}), encoding="utf-8")
+
+    def test_newest_config_is_active_without_pointer(self, tmp_path):
+        self._write(tmp_path / "config_a.json", "A")
+        self._write(tmp_path / "config_b.json", "B")
+        os.utime(tmp_path / "config_a.json", (1, 1))
+
+        assert load_brand_config(tmp_path)["target"]["name"] == "B"
+
+    def test_pointer_selects_active_config(self, tmp_path):
+        self._write(tmp_path / "config_a.json", "A")
+        self._write(tmp_path / "config_b.json", "B")
+        os.utime(tmp_path / "config_a.json", (1, 1))
+        load_brand_config(tmp_path)
+
+        set_active_config("config_a.json", tmp_path)
+        assert load_brand_config(tmp_path)["target"]["name"] == "A"
+
+        (tmp_path / "config_a.json").unlink()
+        assert load_brand_config(tmp_path)["target"]["name"] == "B"
+
+    def test_cached_until_saved(self, tmp_path):
+        self._write(tmp_path / "config_a.json", "A")
+        config = load_brand_config(tmp_path)
+        config["target"]["name"] = "Edited"
+        assert load_brand_config(tmp_path)["target"]["name"] == "A"
+
+        save_brand_config(config, saved_config_path=tmp_path)
+        assert load_brand_config(tmp_path)["target"]["name"] == "Edited"
+
+        save_brand_config({"target": {"name": "New"}}, name="config_new.json", saved_config_path=tmp_path)
+        assert load_brand_config(tmp_path)["target"]["name"] == "New"
+        assert sorted(f.name for f in tmp_path.glob("*.json")) == ["config_a.json", "config_new.json"]
@@ -0,0 +1,279 @@
+# Tests for webapp/data_loader.py
+
+import base64
+import json
+import os
+import pytest
+from src.query_runner import append_summary
+from webapp import data_loader
+
+
+@pytest.fixture
+def results_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_loader, "RESULTS_DIR", tmp_path)
+    data_loader._raw_cache.clear()
+    return tmp_path
+
+
+def _entry(qid):
+    return {"id": qid, "question": f"Q{qid}?", "category": "test", "response": {"openai": {"text": "A"}}}
+
+
+class TestLoadRawResponse:
+
+    def test_reads_output_file(self, results_dir):
+        run_dir = results_dir / "run_a"
+        run_dir.mkdir()
+        (run_dir / "output_7.json").write_text(json.dumps(_entry(7)), encoding="utf-8")
+
+        assert data_loader.load_raw_response("run_a", 7) == _entry(7)
+        assert data_loader.load_raw_response("run_a", 8) is None
+
+    def test_falls_back_to_summary_log(self, results_dir):
+        run_dir = results_dir / "run_a"
+        run_dir.mkdir()
+        for qid in (3, 12, 5):
+            append_summary(str(run_dir), _entry(qid))
+
+        assert data_loader.load_raw_response("run_a", 12) == _entry(12)
+        assert data_loader.load_raw_response("run_a", 5) == _entry(5)
+
+    def test_finalized_run_read_from_summary_log(self, results_dir):
+        from src.query_runner import generate_summary
+
+        run_dir = results_dir / "run_a"
+        run_dir.mkdir()
+        for qid in (10, 2):
+            (run_dir / f"output_{qid}.json").write_text(json.dumps(_entry(qid)), encoding="utf-8")
+            append_summary(str(run_dir), _entry(qid))
+        assert data_loader.load_raw_responses("run_a") == [_entry(2), _entry(10)]
+
+        generate_summary(str(run_dir))
+        for path in run_dir.glob("output_*.json"):
+            path.unlink()
+        assert data_loader.load_raw_responses("run_a") == [_entry(2), _entry(10)]
+
+    def test_cached_entry_refreshed_when_file_changes(self, results_dir):
+        run_dir = results_dir / "run_a"
+        run_dir.mkdir()
+        path = run_dir / "output_1.json"
+        path.write_text(json.dumps(_entry(1)), encoding="utf-8")
+        data_loader.load_raw_response("run_a", 1)
+
+        updated = dict(_entry(1), question="Changed?")
+        path.write_text(json.dumps(updated), encoding="utf-8")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert data_loader.load_raw_response("run_a", 1)["question"] == "Changed?"
+
+
+class TestDashboard:
+
+    BRANDS = {
+        "target": "Obsidian",
+        "target_aliases": ["Obsidian"],
+        "competitors": ["Notion"],
+        "competitor_aliases": {"Notion": ["Notion"]},
+    }
+
+    @pytest.fixture
+    def run(self, results_dir, monkeypatch):
+        monkeypatch.setattr(data_loader, "load_brands", lambda: self.BRANDS)
+        monkeypatch.setattr(data_loader, "load_queries", lambda: [])
+        run_dir = results_dir / "run_a"
+        run_dir.mkdir()
+        for qid, text in ((1, "Obsidian and Notion"), (2, "Notion, Notion")):
+            entry = {"id": qid, "question": f"Q{qid}?", "category": "test",
+                     "response": {"openai": {"text": text}, "google": {"text": "Obsidian"}}}
+            (run_dir / f"output_{qid}.json").write_text(json.dumps(entry), encoding="utf-8")
+        return "run_a"
+
+    def test_bundle_matches_individual_views(self, run):
+        analysis = data_loader.load_analysis(run)
+
+        bundle = data_loader.get_dashboard(run)
+
+        assert bundle["summary"] == data_loader.get_run_summary(analysis, "Obsidian")
+        assert bundle["providers"] == data_loader.get_provider_comparison(analysis, "Obsidian")
+        assert bundle["categories"] == data_loader.get_category_performance(analysis, "Obsidian")
+        assert bundle["queries"] == data_loader.get_query_details(analysis, run)
+        assert bundle["queries"][1]["question"] == "Q2?"
+
+    def test_returns_only_requested_sections(self, run):
+        assert set(data_loader.get_dashboard(run, ["summary", "providers"])) == {"summary", "providers"}
+
+
+class TestQueryPage:
+
+    @pytest.fixture
+    def run(self, results_dir, monkeypatch):
+        monkeypatch.setattr(data_loader, "load_brands", lambda: TestDashboard.BRANDS)
+        monkeypatch.setattr(data_loader, "load_queries", lambda: [])
+        data_loader._query_indexes.clear()
+        run_dir = results_dir / "run_a"
+        run_dir.mkdir()
+        texts = {1: "Obsidian", 2: "Notion", 3: "Obsidian, Notion, Notion", 4: "Nothing", 5: "Obsidian"}
+        for qid, text in texts.items():
+            entry = {"id": qid, "question": f"Q{qid}?", "category": "even" if qid % 2 == 0 else "odd",
+                     "response": {"openai": {"text": text}, "google": {"text": "Obsidian"}}}
+            (run_dir / f"output_{qid}.json").write_text(json.dumps(entry), encoding="utf-8")
+        return "run_a"
+
+    def test_pages_through_all_queries(self, run):
+        seen, cursor = [], None
+        while True:
+            page = data_loader.query_page(run, cursor=cursor, limit=2, fields=["question_id"])
+            seen.extend(item["question_id"] for item in page["items"])
+            assert page["total"] == 5
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == [1, 2, 3, 4, 5]
+
+    def test_filters_and_projection(self, run):
+        page = data_loader.query_page(run, provider="openai", target_lost=True, fields=["question_id", "providers"])
+
+        assert [item["question_id"] for item in page["items"]] == [2, 3, 4]
+        assert all(set(item) == {"question_id", "providers"} for item in page["items"])
+        assert all(set(item["providers"]) == {"openai"} for item in page["items"])
+
+        assert data_loader.query_page(run, category="even", winner="Notion")["total"] == 1
+        assert data_loader.query_page(run, brand_found="Notion")["total"] == 2
+
+    def test_rejects_bad_cursor_and_fields(self, run):
+        with pytest.raises(ValueError):
+            data_loader.query_page(run, cursor="not-a-cursor")
+        with pytest.raises(ValueError):
+            data_loader.query_page(run, fields=["answer"])
+        for after in ("x", None, True, 1.5):
+            cursor = base64.urlsafe_b64encode(json.dumps({"after": after}).encode("utf-8")).decode("ascii")
+            with pytest.raises(ValueError):
+                data_loader.query_page(run, cursor=cursor)
+
+    def test_filtered_positions_reused_across_pages(self, run, monkeypatch):
+        calls = []
+        matches = data_loader._matches
+        monkeypatch.setattr(data_loader, "_matches", lambda *a: calls.append(1) or matches(*a))
+
+        first = data_loader.query_page(run, category="odd", limit=1)
+        second = data_loader.query_page(run, category="odd", cursor=first["next_cursor"], limit=1)
+
+        assert len(calls) == 5
+        assert [p["items"][0]["question_id"] for p in (first, second)] == [1, 3]
+        assert first["total"] == second["total"] == 3
+
+
+class TestCompareMany:
+
+    @pytest.fixture
+    def runs(self, results_dir, monkeypatch):
+        monkeypatch.setattr(data_loader, "load_brands", lambda: TestDashboard.BRANDS)
+        monkeypatch.setattr(data_loader, "load_queries", lambda: [])
+        data_loader._run_aggregates.clear()
+        for run_name, providers in (("run_a", ("openai", "google")), ("run_b", ("openai",))):
+            run_dir = results_dir / run_name
+            run_dir.mkdir()
+            entry = {"id": 1, "question": "Q1?", "category": "test",
+                     "response": {p: {"text": "Obsidian and Notion"} for p in providers}}
+            (run_dir / "output_1.json").write_text(json.dumps(entry), encoding="utf-8")
+        return ["run_a", "run_b"]
+
+    def test_series_are_aligned_per_run(self, runs):
+        result = data_loader.compare_many(runs)
+
+        assert [r["name"] for r in result["runs"]] == runs
+        assert result["brands"]["Obsidian"]["mentions"] == [2, 1]
+        assert result["providers"]["google"]["mentions"] == [1, None]
+        assert result["total_completions"] == [2, 1]
+
+    def test_aggregates_reused_until_run_changes(self, runs, monkeypatch):
+        data_loader.compare_many(runs)
+        builds = []
+        build = data_loader._build_analysis
+        monkeypatch.setattr(data_loader, "_build_analysis", lambda *a: builds.append(a[0]) or build(*a))
+
+        data_loader.compare_many(runs)
+        assert builds == []
+
+        run_dir = data_loader.RESULTS_DIR / "run_b"
+        (run_dir / "output_2.json").write_text(json.dumps(
+            {"id": 2, "question": "Q2?", "category": "test", "response": {"openai": {"text": "Notion"}}}
+        ), encoding="utf-8")
+        os.utime(run_dir, ns=(run_dir.stat().st_atime_ns, run_dir.stat().st_mtime_ns + 1_000_000))
+        result = data_loader.compare_many(runs)
+        assert builds == ["run_b"]
+        assert result["total_queries"] == [1, 2]
+
+    def test_unknown_run(self, runs):
+        with pytest.raises(FileNotFoundError):
+            data_loader.compare_many(["run_a", "missing"])
+
+    def test_fingerprint_sees_output_rewritten_in_place(self, runs):
+        run_dir = data_loader.RESULTS_DIR / "run_a"
+        before = data_loader.run_fingerprint("run_a")
+        dir_mtime = run_dir.stat().st_mtime_ns
+        output = next(run_dir.glob("output_*.json"))
+        output.write_text(output.read_text(encoding="utf-8").replace("}}}", "} }}"), encoding="utf-8")
+        os.utime(run_dir, ns=(dir_mtime, dir_mtime))
+
+        assert data_loader.run_fingerprint("run_a") != before
+
+
+
+class TestTrends:
+
+    @pytest.fixture
+    def runs(self, results_dir, monkeypatch):
+        monkeypatch.setattr(data_loader, "load_brands", lambda: TestDashboard.BRANDS)
+        monkeypatch.setattr(data_loader, "load_queries", lambda: [])
+        for run_name, brand, text in (("run_2026-01-01_00-00-00", "Obsidian", "Obsidian"),
+                                      ("run_2026-01-08_00-00-00", "Obsidian", "Obsidian, Obsidian"),
+                                      ("run_2026-01-15_00-00-00", "Other", "Obsidian")):
+            run_dir = results_dir / run_name
+            run_dir.mkdir()
+            (run_dir / "meta.json").write_text(json.dumps({"brand": brand}), encoding="utf-8")
+            entry = {"id": 1, "question": "Q1?", "category": "test", "response": {"openai": {"text": text}}}
+            (run_dir / "output_1.json").write_text(json.dumps(entry), encoding="utf-8")
+
+    def test_series_over_target_runs(self, runs):
+        result = data_loader.get_trends()
+
+        assert [r["name"] for r in result["runs"]] == ["run_2026-01-01_00-00-00", "run_2026-01-08_00-00-00"]
+        assert result["brands"]["Obsidian"]["mentions"] == [1, 2]
+        assert result["providers"]["openai"]["Notion"]["wins"] == [0, 0]
+
+    def test_recorded_points_are_reused(self, runs, monkeypatch):
+        data_loader.get_trends()
+        builds = []
+        build = data_loader._build_analysis
+        monkeypatch.setattr(data_loader, "_build_analysis", lambda *a: builds.append(a[0]) or build(*a))
+
+        assert data_loader.get_trends(["Obsidian"])["brands"]["Obsidian"]["mentions"] == [1, 2]
+        assert builds == []
+
+    def test_finished_run_recorded_with_its_own_brands(self, runs):
+        from src import trends
+
+        # The active config has moved on to another competitor set by the time the run finishes.
+        brands = ("Obsidian", ["Obsidian"], {"Roam": ["Roam"]})
+        data_loader.record_run_trend("run_2026-01-08_00-00-00", brands)
+
+        point = trends.load_trends(data_loader.RESULTS_DIR)["run_2026-01-08_00-00-00"]["point"]
+        assert "Roam" in json.dumps(point)
+        assert "Notion" not in json.dumps(point)
+
+
+class TestQueryDetails:
+
+    def test_question_falls_back_to_registry(self, results_dir, monkeypatch):
+        from src.query_registry import query_id, register
+
+        monkeypatch.setattr(data_loader, "ENTRIES_DIR", results_dir)
+        qid = query_id("Registered?")
+        register([{"id": qid, "query": "Registered?"}], results_dir / "query_registry.json")
+        analysis = [{"provider": "openai", "question_id": qid, "category": "test", "brand": "Obsidian",
+                     "is_target": True, "found": False, "count": 0, "most_mentioned": None, "score": 0.0}]
+
+        details = data_loader.get_query_details(analysis, "run_a", questions={})
+        assert details[0]["question"] == "Registered?"
@@ -0,0 +1,90 @@
+# Tests for webapp/http_cache.py
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from webapp.http_cache import IMMUTABLE, cached_response, make_etag
+
+
+def _client(etag, payload, calls, cache_control=None):
+    app = FastAPI()
+
+    @app.get("/item")
+    async def item(request: Request):
+        def build():
+            calls.append(1)
+            return payload
+        if cache_control:
+            return cached_response(request, etag, build, cache_control=cache_control)
+        return cached_response(request, etag, build)
+
+    return TestClient(app)
+
+
+class TestCachedResponse:
+
+    def test_sends_etag_then_answers_304(self):
+        calls = []
+        etag = make_etag("run_a", "abc")
+        client = _client(etag, {"value": 1}, calls)
+
+        first = client.get("/item")
+        assert first.json() == {"value": 1}
+        assert first.headers["etag"] == etag
+        assert first.headers["cache-control"] == "no-cache"
+
+        second = client.get("/item", headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert calls == [1]
+
+    def test_stale_or_weak_tags(self):
+        calls = []
+        etag = make_etag("run_a")
+        client = _client(etag, {"value": 1}, calls, cache_control=IMMUTABLE)
+
+        assert client.get("/item", headers={"If-None-Match": '"old"'}).status_code == 200
+        weak = client.get("/item", headers={"If-None-Match": f'"old", W/{etag}'})
+        assert weak.status_code == 304
+        assert weak.headers["cache-control"] == IMMUTABLE
+
+    def test_error_responses_are_not_cached(self):
+        calls = []
+        client = _client(make_etag("x"), JSONResponse({"error": "Not found"}, status_code=404), calls)
+
+        response = client.get("/item")
+        assert response.status_code == 404
+        assert "etag" not in response.headers
+
+    def test_no_etag_skips_caching(self):
+        calls = []
+        client = _client(None, {"value": 1}, calls)
+
+        response = client.get("/item", headers={"If-None-Match": "*"})
+        assert response.status_code == 200
+        assert "etag" not in response.headers
+
+
+class TestStreamSafeGZip:
+
+    def test_event_streams_are_not_compressed(self):
+        from fastapi.responses import StreamingResponse
+        from webapp.app import StreamSafeGZipMiddleware
+
+        app = FastAPI()
+        app.add_middleware(StreamSafeGZipMiddleware, minimum_size=10)
+        body = "data: " + "x" * 2000 + "\n\n"
+
+        @app.get("/events")
+        async def events():
+            return StreamingResponse(iter([body]), media_type="text/event-stream")
+
+        @app.get("/json")
+        async def json_body():
+            return {"value": "x" * 2000}
+
+        client = TestClient(app)
+        streamed = client.get("/events", headers={"Accept": "text/event-stream", "Accept-Encoding": "gzip"})
+        assert "content-encoding" not in streamed.headers
+        assert streamed.text == body
+        assert client.get("/json", headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "gzip"
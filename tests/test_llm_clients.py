@@ -0,0 +1,185 @@
+# Tests for llm_clients.py
+
+import asyncio
+import pytest
+
+from src import llm_clients
+from src.llm_clients import coalescing_stats, singleflight
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    llm_clients._coalescing_stats.clear()
+    yield
+    llm_clients._coalescing_stats.clear()
+
+
+class TestSingleflight:
+
+    def test_identical_concurrent_requests_share_one_call(self):
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"text": "answer"}
+
+        async def scenario():
+            return await asyncio.gather(
+                singleflight("openai", ("openai", "m", "Q?"), call),
+                singleflight("openai", ("openai", "m", "Q?"), call),
+                singleflight("openai", ("openai", "m", "Other?"), call),
+            )
+
+        results = asyncio.run(scenario())
+        assert results == [{"text": "answer"}] * 3
+        assert len(calls) == 2
+        assert coalescing_stats() == {"openai": {"calls": 2, "coalesced": 1}}
+
+    def test_sequential_requests_are_not_coalesced(self):
+        async def call():
+            return "answer"
+
+        async def scenario():
+            await singleflight("google", ("google", "Q?"), call)
+            await singleflight("google", ("google", "Q?"), call)
+
+        asyncio.run(scenario())
+        assert coalescing_stats() == {"google": {"calls": 2, "coalesced": 0}}
+
+    def test_failure_reaches_every_waiter(self):
+        async def call():
+            await asyncio.sleep(0.01)
+            raise ConnectionError("down")
+
+        async def scenario():
+            return await asyncio.gather(
+                singleflight("anthropic", ("anthropic", "Q?"), call),
+                singleflight("anthropic", ("anthropic", "Q?"), call),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(scenario())
+        assert all(isinstance(r, ConnectionError) for r in results)
+
+    def test_cancelled_caller_does_not_cancel_shared_call(self):
+        async def call():
+            await asyncio.sleep(0.02)
+            return "answer"
+
+        async def scenario():
+            first = asyncio.create_task(singleflight("openai", ("openai", "Q?"), call))
+            second = asyncio.create_task(singleflight("openai", ("openai", "Q?"), call))
+            await asyncio.sleep(0.005)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(scenario()) == "answer"
+
+
+class TestClientPool:
+
+    @pytest.fixture(autouse=True)
+    def api_keys(self, monkeypatch):
+        for provider in ("openai", "anthropic", "google"):
+            monkeypatch.setenv(llm_clients.get_provider_config(provider)["api_key_env"], "test-key")
+
+    def test_clients_are_built_once_per_pool_and_closed(self):
+        async def scenario():
+            async with llm_clients.client_pool() as pool:
+                first = llm_clients.build_client("openai")
+                assert llm_clients.build_client("openai") is first
+                assert pool.get("openai") is first
+                client = first[1]
+            return client
+
+        client = asyncio.run(scenario())
+        assert client.is_closed()
+
+    def test_connection_limits_follow_max_concurrency(self, monkeypatch):
+        monkeypatch.setitem(llm_clients.CONFIG["llm"], "max_concurrency", 3)
+        limits = llm_clients._http_limits("anthropic")
+        assert limits.max_keepalive_connections == 3
+        assert limits.max_connections == 6
+
+    def test_each_event_loop_gets_its_own_clients(self):
+        async def client():
+            return llm_clients.build_client("anthropic")[1]
+
+        assert asyncio.run(client()) is not asyncio.run(client())
+
+
+class TestAskStreaming:
+
+    @pytest.fixture
+    def fake_reader(self, monkeypatch):
+        """A provider whose stream yields `pieces` and reports usage at the end."""
+        state = {"pieces": [], "closed": 0}
+
+        async def read(client, question, model, meta):
+            try:
+                for piece in state["pieces"]:
+                    await asyncio.sleep(0)
+                    yield piece
+                meta["input_tokens"] = 7
+                meta["output_tokens"] = 42
+            finally:
+                state["closed"] += 1
+
+        monkeypatch.setitem(llm_clients.STREAM_READERS, "fake", read)
+        return state
+
+    def test_full_answer_reports_usage_and_timing(self, fake_reader):
+        fake_reader["pieces"] = ["Use ", "Obsidian", "."]
+        result = asyncio.run(llm_clients.ask_streaming("fake", None, "Q?", "m"))
+        assert result["text"] == "Use Obsidian."
+        assert result["tokens"] == {"input": 7, "output": 42, "total": 49}
+        assert result["stream"]["ttft_seconds"] >= 0
+        assert result["stream"]["stopped_early"] is False
+        assert fake_reader["closed"] == 1
+
+    def test_brand_ending_the_answer_is_a_mention(self, fake_reader):
+        from src.stream_cutoff import StreamCutoff
+
+        fake_reader["pieces"] = ["Best pick: ", "Notion"]
+        cutoff = StreamCutoff({"Notion": ["Notion"]})
+        result = asyncio.run(llm_clients.ask_streaming("fake", None, "Q?", "m", cutoff=cutoff))
+        assert result["stream"]["first_mentions"] == [{"brand": "Notion", "position": 11}]
+
+    def test_cutoff_stops_reading_and_closes_stream(self, fake_reader):
+        from src.stream_cutoff import StreamCutoff
+
+        fake_reader["pieces"] = ["Notion ", "is ", "great ", "for ", "teams ", "really."]
+        cutoff = StreamCutoff({"Notion": ["Notion"]}, chars_after_first_mention=12)
+        result = asyncio.run(llm_clients.ask_streaming("fake", None, "Q?", "m", cutoff=cutoff))
+        assert result["text"] == "Notion is great "
+        assert result["stream"]["stopped_early"] is True
+        assert result["stream"]["first_mentions"] == [{"brand": "Notion", "position": 0}]
+        # Usage never arrived, so output tokens are the pieces read.
+        assert result["tokens"]["output"] == 3
+        assert fake_reader["closed"] == 1
+
+    def test_ask_provider_streams_only_when_enabled(self, monkeypatch):
+        calls = []
+
+        async def fake_streaming(provider_key, client, question, model, cutoff=None):
+            calls.append("stream")
+            return {"text": "streamed"}
+
+        async def fake_openai(client, question, model, json_mode=False):
+            calls.append("plain")
+            return {"text": "plain"}
+
+        monkeypatch.setattr(llm_clients, "build_client", lambda name: ("openai", object()))
+        monkeypatch.setattr(llm_clients, "ask_streaming", fake_streaming)
+        monkeypatch.setattr(llm_clients, "ask_openai", fake_openai)
+        monkeypatch.setitem(llm_clients.CONFIG["llm"], "streaming", {"enabled": True})
+
+        async def scenario():
+            return [
+                await llm_clients.ask_provider("openai", "Q?"),
+                await llm_clients.ask_provider("openai", "Q?", json_mode=True),
+            ]
+
+        assert asyncio.run(scenario()) == [{"text": "streamed"}, {"text": "plain"}]
+        assert calls == ["stream", "plain"]
@@ -4,7 +4,8 @@
 
 import json
 import pytest
-from src.mention_analyzer import MentionsAnalyzer, load_answers
+from unittest.mock import patch
+from src.mention_analyzer import MentionsAnalyzer, Answer, load_answers
 
 
 class TestBrandDetection:
@@ -125,4 +126,104 @@ class TestLoadAnswers:
         monkeypatch.chdir(tmp_path)
         answers = load_answers("run_test")
 
-        assert [a.provider for a in answers] == ["anthropic"]
\ No newline at end of file
+        assert [a.provider for a in answers] == ["anthropic"]
+
+class TestParallelAnalysis:
+
+    def test_matches_sequential_output(self, monkeypatch):
+        brands = ("Obsidian", ["Obsidian", "obsidian.md"], {"Notion": ["Notion"], "Roam Research": ["Roam", "Roam Research"]})
+        texts = ["Obsidian beats Notion.", "Roam Research or Notion?", "", "Nothing relevant.", "obsidian.md, Roam, Notion, Notion"]
+        answers = [
+            Answer(provider, "test", i, "Q?", texts[i % len(texts)])
+            for i in range(40) for provider in ("openai", "google")
+        ]
+        monkeypatch.setattr(MentionsAnalyzer, "PARALLEL_MIN_ANSWERS", 1)
+
+        with patch("src.mention_analyzer.load_brands", return_value=brands):
+            analyzer = MentionsAnalyzer()
+            sequential = analyzer.mention_analyzer(answers)
+            parallel = analyzer.mention_analyzer(answers, workers=2, chunk_size=7)
+
+        assert parallel == sequential
+
+
+class TestStreamingAnalysis:
+
+    @pytest.fixture
+    def run(self, tmp_path, monkeypatch):
+        run_dir = tmp_path / "data" / "results" / "run_test"
+        run_dir.mkdir(parents=True)
+        texts = ["Obsidian beats Notion.", "Notion, Notion or Obsidian?", "Nothing relevant."]
+        for qid in (10, 2, 1):
+            payload = {
+                "id": qid,
+                "category": "comparison" if qid % 2 else "recommendation",
+                "question": f"Q{qid}?",
+                "response": {"openai": {"text": texts[qid % 3]}, "google": {"text": texts[(qid + 1) % 3]}},
+            }
+            (run_dir / f"output_{qid}.json").write_text(json.dumps(payload), encoding="utf-8")
+        monkeypatch.chdir(tmp_path)
+        return run_dir
+
+    def test_iter_answers_streams_in_id_order(self, run):
+        from src.mention_analyzer import iter_answers
+
+        answers = iter_answers("run_test")
+
+        assert not isinstance(answers, list)
+        assert [a.question_id for a in answers] == [1, 1, 2, 2, 10, 10]
+
+    def test_totals_match_full_summaries(self, run, capsys):
+        from src.mention_analyzer import MentionTotals, iter_answers, print_query_results, print_summary, save_analysis
+
+        brands = ("Obsidian", ["Obsidian"], {"Notion": ["Notion"]})
+        with patch("src.mention_analyzer.load_brands", return_value=brands):
+            analyzer = MentionsAnalyzer()
+            rows = analyzer.mention_analyzer(load_answers("run_test"))
+            print_summary(rows)
+            print_query_results(rows)
+            expected = capsys.readouterr().out
+
+            totals = MentionTotals()
+            save_analysis(totals.track(analyzer.iter_analysis(iter_answers("run_test"))), "run_test")
+            capsys.readouterr()
+            totals.print_summary()
+            totals.print_query_results()
+
+        assert capsys.readouterr().out == expected
+        assert json.loads((run / "analysis.json").read_text(encoding="utf-8")) == rows
+
+    def test_totals_fold_in_chunks(self, run, capsys, monkeypatch):
+        from src.mention_analyzer import MentionTotals, iter_answers, print_query_results, print_summary
+
+        brands = ("Obsidian", ["Obsidian"], {"Notion": ["Notion"]})
+        with patch("src.mention_analyzer.load_brands", return_value=brands):
+            analyzer = MentionsAnalyzer()
+            rows = analyzer.mention_analyzer(load_answers("run_test"))
+            print_summary(rows)
+            print_query_results(rows)
+            expected = capsys.readouterr().out
+
+            monkeypatch.setattr(MentionTotals, "CHUNK_ROWS", 3)
+            totals = MentionTotals()
+            for _ in totals.track(analyzer.iter_analysis(iter_answers("run_test"))):
+                pass
+            totals.print_summary()
+            totals.print_query_results()
+
+        assert capsys.readouterr().out == expected
+
+    def test_failed_save_keeps_previous_analysis(self, run):
+        from src.mention_analyzer import save_analysis
+
+        save_analysis([{"brand": "Obsidian"}], "run_test")
+
+        def rows():
+            yield {"brand": "Notion"}
+            raise RuntimeError("analysis failed")
+
+        with pytest.raises(RuntimeError):
+            save_analysis(rows(), "run_test")
+
+        assert json.loads((run / "analysis.json").read_text(encoding="utf-8")) == [{"brand": "Obsidian"}]
+        assert not list(run.glob("*.tmp"))
@@ -0,0 +1,72 @@
+# Tests for mention_store.py
+
+import json
+import pytest
+from unittest.mock import patch
+from src.mention_analyzer import MentionsAnalyzer, load_answers
+from src.mention_store import alias_fingerprint, analysis_rows, brand_aliases, update_store
+
+
+BRANDS = ("Obsidian", ["Obsidian", "obsidian.md"], {"Notion": ["Notion"], "Roam Research": ["Roam", "Roam Research"]})
+
+
+@pytest.fixture
+def run_dir(tmp_path, monkeypatch):
+    run_dir = tmp_path / "data" / "results" / "run_test"
+    run_dir.mkdir(parents=True)
+    texts = ["Obsidian beats Notion.", "Roam Research or Notion? Notion.", "Nothing relevant here."]
+    for qid, text in enumerate(texts, start=1):
+        payload = {
+            "id": qid,
+            "category": "test",
+            "question": f"Q{qid}?",
+            "response": {"openai": {"text": text}, "google": {"text": text.upper()}, "anthropic": None},
+        }
+        (run_dir / f"output_{qid}.json").write_text(json.dumps(payload), encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    return run_dir
+
+
+class TestAliasFingerprint:
+
+    def test_ignores_order_and_case(self):
+        assert alias_fingerprint(["Notion", "notion.so"]) == alias_fingerprint(["Notion.so", "NOTION"])
+
+    def test_changes_when_alias_added(self):
+        assert alias_fingerprint(["Notion"]) != alias_fingerprint(["Notion", "Notion.so"])
+
+
+class TestUpdateStore:
+
+    def test_rows_match_full_analysis(self, run_dir):
+        name, target, competitors = BRANDS
+        store, rescanned = update_store(str(run_dir), brand_aliases(*BRANDS))
+
+        with patch("src.mention_analyzer.load_brands", return_value=BRANDS):
+            expected = MentionsAnalyzer().mention_analyzer(load_answers("run_test"))
+
+        assert set(rescanned) == {"Obsidian", "Notion", "Roam Research"}
+        assert analysis_rows(store, name, competitors) == expected
+
+    def test_rescans_only_changed_brand(self, run_dir):
+        name, target, competitors = BRANDS
+        update_store(str(run_dir), brand_aliases(*BRANDS))
+
+        _, rescanned = update_store(str(run_dir), brand_aliases(*BRANDS))
+        assert rescanned == []
+
+        edited = dict(competitors, Notion=["Notion", "Notion.so"])
+        _, rescanned = update_store(str(run_dir), brand_aliases(name, target, edited))
+        assert rescanned == ["Notion"]
+
+    def test_concurrent_updates_leave_a_valid_store(self, run_dir):
+        from concurrent.futures import ThreadPoolExecutor
+        from src.mention_store import load_store
+
+        name, target, competitors = BRANDS
+        variants = [dict(competitors, Notion=["Notion", f"Notion{i}"]) for i in range(8)]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda c: update_store(str(run_dir), brand_aliases(name, target, c)), variants))
+
+        assert load_store(str(run_dir)) is not None
+        assert not list(run_dir.glob("*.tmp"))
@@ -0,0 +1,72 @@
+# Tests for onboarding_cache.py and the cached onboarding calls
+
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src import onboarding, onboarding_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(onboarding_cache, "CACHE_DIR", tmp_path)
+    onboarding_cache._memory.clear()
+    yield tmp_path
+    onboarding_cache._memory.clear()
+
+
+class TestCache:
+
+    def test_round_trip_survives_restart(self, cache_dir):
+        key = onboarding_cache.key("notion", "global")
+        onboarding_cache.put("competitors", key, ["Obsidian", "Roam"])
+        onboarding_cache._memory.clear()
+        assert onboarding_cache.get("competitors", key) == ["Obsidian", "Roam"]
+
+    def test_returns_copies(self, cache_dir):
+        key = onboarding_cache.key("notion")
+        onboarding_cache.put("competitors", key, ["Obsidian"])
+        onboarding_cache.get("competitors", key).append("Roam")
+        assert onboarding_cache.get("competitors", key) == ["Obsidian"]
+
+    def test_evicts_oldest_files(self, cache_dir, monkeypatch):
+        monkeypatch.setattr(onboarding_cache, "MAX_ENTRIES", 2)
+        for name in ("a", "b", "c"):
+            onboarding_cache.put("competitors", onboarding_cache.key(name), [name])
+        assert len(list((cache_dir / "competitors").glob("*.json"))) == 2
+
+    def test_content_hash_ignores_key_order(self):
+        assert onboarding_cache.content_hash({"a": 1, "b": [2]}) == onboarding_cache.content_hash({"b": [2], "a": 1})
+
+
+class TestCachedOnboarding:
+
+    def test_translation_is_asked_once_per_template_and_language(self, cache_dir):
+        templates = {"recommendation": ["Best {category_noun}?"]}
+        ask = AsyncMock(return_value={"text": json.dumps({"recommendation": ["Meilleur {category_noun} ?"]})})
+        with patch("src.onboarding.ask_anthropic", ask):
+            first = asyncio.run(onboarding.translate_templates(None, templates, "French"))
+            second = asyncio.run(onboarding.translate_templates(None, templates, " french "))
+            asyncio.run(onboarding.translate_templates(None, {"recommendation": ["Top {category_noun}?"]}, "French"))
+        assert first == second == {"recommendation": ["Meilleur {category_noun} ?"]}
+        assert ask.call_count == 2
+
+    def test_unparseable_translation_is_not_cached(self, cache_dir):
+        templates = {"recommendation": ["Best {category_noun}?"]}
+        ask = AsyncMock(return_value={"text": "not json"})
+        with patch("src.onboarding.ask_anthropic", ask):
+            asyncio.run(onboarding.translate_templates(None, templates, "French"))
+            asyncio.run(onboarding.translate_templates(None, templates, "French"))
+        assert ask.call_count == 2
+
+    def test_competitors_cached_by_brand_market_and_excludes(self, cache_dir):
+        ask = AsyncMock(return_value={"text": '["Obsidian", "Roam"]'})
+        with patch("src.onboarding.ask_anthropic", ask), \
+             patch("src.onboarding.build_client", return_value=("anthropic", None)):
+            first = asyncio.run(onboarding.regenerate_competitors("Notion", "notes", "English", "Global", ["Evernote"]))
+            again = asyncio.run(onboarding.regenerate_competitors("notion", "notes", "English", "global", ["evernote"]))
+            asyncio.run(onboarding.regenerate_competitors("Notion", "notes", "English", "Global", ["Evernote", "Roam"]))
+        assert first == again
+        assert [c["name"] for c in first] == ["Obsidian", "Roam"]
+        assert ask.call_count == 2
@@ -0,0 +1,73 @@
+# Tests for webapp/onboarding_jobs.py
+
+import asyncio
+import pytest
+
+from webapp import onboarding_jobs
+
+
+@pytest.fixture(autouse=True)
+def clean_jobs():
+    onboarding_jobs.jobs.clear()
+    onboarding_jobs._inflight.clear()
+    yield
+    onboarding_jobs.jobs.clear()
+    onboarding_jobs._inflight.clear()
+
+
+class TestSubmit:
+
+    def test_records_partial_results_and_result(self):
+        async def work(progress):
+            progress("placeholders", {"category": "notes"})
+            await asyncio.sleep(0)
+            progress("templates", {"recommendation": []})
+            return {"brand_name": "Obsidian"}
+
+        async def scenario():
+            job = onboarding_jobs.submit("onboard", {"brand_name": "Obsidian"}, work)
+            assert job["status"] == "queued"
+            await asyncio.sleep(0.01)
+            return job
+
+        job = asyncio.run(scenario())
+        assert job["status"] == "done"
+        assert job["partial"] == {"placeholders": {"category": "notes"}, "templates": {"recommendation": []}}
+        assert job["result"] == {"brand_name": "Obsidian"}
+
+    def test_identical_inflight_requests_share_a_job(self):
+        calls = []
+
+        async def work(progress):
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {}
+
+        async def scenario():
+            first = onboarding_jobs.submit("onboard", {"brand_name": "Obsidian"}, work)
+            second = onboarding_jobs.submit("onboard", {"brand_name": "Obsidian"}, work)
+            other = onboarding_jobs.submit("onboard", {"brand_name": "Notion"}, work)
+            await asyncio.sleep(0.05)
+            again = onboarding_jobs.submit("onboard", {"brand_name": "Obsidian"}, work)
+            await asyncio.sleep(0.05)
+            return first, second, other, again
+
+        first, second, other, again = asyncio.run(scenario())
+        assert first is second
+        assert other is not first
+        assert again is not first
+        assert len(calls) == 3
+
+    def test_failure_is_reported(self):
+        async def work(progress):
+            raise RuntimeError("no API key")
+
+        async def scenario():
+            job = onboarding_jobs.submit("competitors", {"brand_name": "Obsidian"}, work)
+            await asyncio.sleep(0.01)
+            return job
+
+        job = asyncio.run(scenario())
+        assert job["status"] == "failed"
+        assert job["error"] == "no API key"
+        assert onboarding_jobs._inflight == {}
@@ -0,0 +1,108 @@
+# Tests for webapp/query_cache.py
+
+import asyncio
+import pytest
+from src.query_registry import query_id
+from webapp import query_cache
+
+
+def _config(description, overrides=None):
+    return {
+        "language": "English",
+        "description": description,
+        "placeholders": {"use_cases": ["notes"], "category_noun": "app", "category_plural": "apps"},
+        "category_overrides": overrides or {},
+    }
+
+
+CATEGORY_COUNT = len(query_cache.CATEGORIES)
+
+
+@pytest.fixture
+def generated(tmp_path, monkeypatch):
+    monkeypatch.setattr(query_cache, "CACHE_DIR", tmp_path)
+    query_cache._cache.clear()
+    calls = []
+
+    async def fake_generate(cfg, cat_name):
+        description = query_cache.category_inputs(cfg, cat_name)["description"]
+        calls.append((cat_name, description))
+        return [f"{description} {cat_name}?"]
+
+    monkeypatch.setattr("src.queries_generator.generate_category", fake_generate)
+    yield calls
+    query_cache._cache.clear()
+
+
+class TestGetQueries:
+
+    def test_switching_configs_hits_cache(self, generated):
+        for description in ("notes", "crm", "notes", "crm"):
+            queries = asyncio.run(query_cache.get_queries(_config(description)))
+            assert queries[0]["query"] == f"{description} {query_cache.CATEGORIES[0][0]}?"
+            assert [q["id"] for q in queries] == [query_id(q["query"]) for q in queries]
+            assert len(queries) == CATEGORY_COUNT
+        assert len(generated) == 2 * CATEGORY_COUNT
+
+    def test_disk_entries_survive_restart_and_are_evicted(self, generated, tmp_path, monkeypatch):
+        monkeypatch.setattr(query_cache, "MAX_ENTRIES", 2 * CATEGORY_COUNT)
+        for description in ("a", "b", "c"):
+            asyncio.run(query_cache.get_queries(_config(description)))
+        assert len(list(tmp_path.glob("*.json"))) == 2 * CATEGORY_COUNT
+
+        query_cache._cache.clear()
+        generated.clear()
+        asyncio.run(query_cache.get_queries(_config("c")))
+        assert generated == []
+        asyncio.run(query_cache.get_queries(_config("a")))
+        assert len(generated) == CATEGORY_COUNT
+
+    def test_only_changed_categories_regenerate(self, generated):
+        asyncio.run(query_cache.get_queries(_config("notes")))
+        generated.clear()
+
+        queries = asyncio.run(query_cache.get_queries(_config("notes", {"opinion": {"description": "wikis"}})))
+        assert generated == [("opinion", "wikis")]
+        assert queries[-1]["query"] == f"wikis {query_cache.CATEGORIES[-1][0]}?"
+
+        asyncio.run(query_cache.get_queries(_config("notes"), regenerate=["comparison"]))
+        assert generated[1:] == [("comparison", "notes")]
+
+    def test_iter_queries_yields_cached_categories_first(self, generated):
+        asyncio.run(query_cache.get_queries(_config("notes")))
+
+        async def collect():
+            return [cat_name async for cat_name, _ in query_cache.iter_queries(_config("notes"), regenerate=["recommendation"])]
+
+        order = asyncio.run(collect())
+        assert order[-1] == "recommendation"
+        assert sorted(order) == sorted(name for name, _ in query_cache.CATEGORIES)
+
+    def test_concurrent_callers_share_generation_without_blocking(self, generated, monkeypatch):
+        release = None
+
+        async def slow_generate(cfg, cat_name):
+            generated.append((cat_name, cfg["description"]))
+            await release.wait()
+            return [f"{cfg['description']} {cat_name}?"]
+
+        monkeypatch.setattr("src.queries_generator.generate_category", slow_generate)
+
+        async def scenario():
+            nonlocal release
+            release = asyncio.Event()
+            # A consumer that stops reading after its first category must not hold up anyone else.
+            stalled = query_cache.iter_queries(_config("notes"))
+            first = asyncio.ensure_future(stalled.__anext__())
+            other = asyncio.ensure_future(query_cache.get_queries(_config("notes")))
+            crm = asyncio.ensure_future(query_cache.get_queries(_config("crm")))
+            await asyncio.sleep(0)
+            release.set()
+            await first
+            results = await asyncio.wait_for(asyncio.gather(other, crm), timeout=1)
+            await stalled.aclose()
+            return results
+
+        notes, crm = asyncio.run(scenario())
+        assert len(notes) == len(crm) == CATEGORY_COUNT
+        assert len(generated) == 2 * CATEGORY_COUNT
@@ -0,0 +1,65 @@
+# Tests for query_dedup.py
+
+import random
+import string
+
+from src.query_dedup import drop_near_duplicates, near_duplicates, normalize
+
+
+def _queries(texts):
+    return [{"id": i + 1, "category": "recommendation", "query": text} for i, text in enumerate(texts)]
+
+
+class TestNormalize:
+
+    def test_folds_case_accents_and_punctuation(self):
+        assert normalize("Quel est le MEILLEUR café — à Paris ?") == "quel est le meilleur cafe a paris"
+
+
+class TestNearDuplicates:
+
+    def test_finds_paraphrase(self):
+        texts = [
+            "Which project management tool is best for remote teams?",
+            "How do I choose a CRM for my shop?",
+            "Which project-management tool is the best for remote teams?",
+        ]
+        duplicates = near_duplicates(texts, 0.8)
+        assert list(duplicates) == [2]
+        earlier, similarity = duplicates[2]
+        assert earlier == 0
+        assert similarity >= 0.8
+
+    def test_keeps_distinct_questions(self):
+        texts = ["What is the best CRM for small businesses?", "What are good note apps for students?"]
+        assert near_duplicates(texts, 0.5) == {}
+
+    def test_keeps_first_of_each_group(self):
+        texts = ["Best budget laptop for students?"] * 3
+        assert near_duplicates(texts, 0.9) == {1: (0, 1.0), 2: (0, 1.0)}
+
+    def test_finds_copies_among_many(self):
+        rng = random.Random(7)
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(300)]
+        texts = [" ".join(rng.choices(words, k=10)) + "?" for _ in range(1000)]
+        texts += [text.upper() + "!" for text in texts[:50]]
+        duplicates = near_duplicates(texts, 0.8)
+        assert sorted(duplicates) == list(range(1000, 1050))
+        assert all(duplicates[1000 + i][0] == i for i in range(50))
+
+
+class TestDropNearDuplicates:
+
+    def test_reports_dropped_queries(self):
+        queries = _queries(["What is the best note app?", "How do I back up notes?", "what is the best note-app"])
+        kept, dropped = drop_near_duplicates(queries, 0.8)
+        assert [q["id"] for q in kept] == [1, 2]
+        assert len(dropped) == 1
+        assert dropped[0]["id"] == 3
+        assert dropped[0]["duplicate_of"] == 1
+        assert dropped[0]["similarity"] == 1.0
+
+    def test_no_threshold_keeps_everything(self, monkeypatch):
+        monkeypatch.setattr("src.query_dedup.default_threshold", lambda: None)
+        queries = _queries(["Same question?", "Same question?"])
+        assert drop_near_duplicates(queries) == (queries, [])
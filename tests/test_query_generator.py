@@ -7,8 +7,14 @@ import pytest
 from unittest.mock import patch, AsyncMock
 
 from src.queries_generator import (
-    build_prompt, parse_query_list, generate_all_queries, save_queries
+    build_prompt, parse_query_list, generate_all_queries, generate_category, iter_categories,
+    number_queries, save_queries
 )
+from src.query_registry import load_registry, query_id
+
+
+def _category(prompt):
+    return prompt.split("Query category: ")[1].split("\n")[0]
 
 
 class TestBuildPrompt:
@@ -51,10 +57,75 @@ class TestParseQueryList:
         assert result == []
         assert len(caplog.records) > 0
 
+    def test_unwraps_json_mode_object(self):
+        result = parse_query_list('{"questions": ["Question one?", "Question two?"]}')
+        assert result == ["Question one?", "Question two?"]
+
+
+_CFG = {
+    "language": "English",
+    "description": "note-taking apps",
+    "placeholders": {
+        "use_cases": ["writing notes"],
+        "category_noun": "note-taking app",
+        "category_plural": "note-taking apps",
+    },
+}
+
+
+class TestGenerateCategory:
+
+    @staticmethod
+    def _generate(answers):
+        calls = []
+
+        async def fake_ask(provider, prompt, json_mode=False):
+            calls.append((provider, json_mode))
+            return answers.get((provider, json_mode))
+
+        with patch("src.queries_generator.generation_providers", return_value=["openai", "anthropic"]), \
+             patch("src.queries_generator.ask_provider", side_effect=fake_ask):
+            queries = asyncio.run(generate_category(_CFG, "opinion"))
+        return queries, calls
+
+    def test_retries_unparseable_answer_in_json_mode(self):
+        queries, calls = self._generate({
+            ("openai", False): {"text": "Sure! Here are some questions."},
+            ("openai", True): {"text": '{"questions": ["Q1?"]}'},
+        })
+        assert queries == ["Q1?"]
+        assert calls == [("openai", False), ("openai", True)]
+
+    def test_falls_back_to_next_provider(self):
+        queries, calls = self._generate({("anthropic", True): {"text": '["Q1?"]'}})
+        assert queries == ["Q1?"]
+        assert calls == [("openai", False), ("anthropic", True)]
+
+    def test_every_provider_failing_returns_empty(self):
+        queries, calls = self._generate({})
+        assert queries == []
+        assert calls == [("openai", False), ("anthropic", True)]
+
+
+class TestIterCategories:
+
+    def test_yields_in_completion_order(self):
+        delays = {"recommendation": 0.03, "comparison": 0.0, "opinion": 0.01}
+
+        async def fake_generate(cfg, cat_name):
+            await asyncio.sleep(delays[cat_name])
+            return [f"{cat_name}?"]
+
+        async def collect():
+            return [cat_name async for cat_name, _ in iter_categories(_CFG, list(delays))]
+
+        with patch("src.queries_generator.generate_category", side_effect=fake_generate):
+            assert asyncio.run(collect()) == ["comparison", "opinion", "recommendation"]
+
 
 class TestGenerateAllQueries:
 
-    def test_generates_sequential_queries_per_category(self):
+    def test_generates_queries_with_stable_ids_per_category(self):
         fake_config = {
             "language": "English",
             "description": "note-taking apps",
@@ -67,19 +138,35 @@ class TestGenerateAllQueries:
 
         with patch("src.queries_generator.load_brand_config", return_value=fake_config), \
              patch("src.queries_generator.ask_provider", new_callable=AsyncMock) as mock_ask:
-            mock_ask.return_value = {"text": '["Query A?", "Query B?"]'}
+            mock_ask.side_effect = lambda provider, prompt, json_mode=False: {
+                "text": json.dumps([f"{_category(prompt)} query A?", f"{_category(prompt)} query B?"])
+            }
 
             queries = asyncio.run(generate_all_queries())
 
         assert mock_ask.call_count == 7
+        assert len(queries) == 14
 
         ids = [q["id"] for q in queries]
-        assert ids == list(range(1, len(queries) + 1))
+        assert ids == [query_id(q["query"]) for q in queries]
+        assert len(set(ids)) == len(ids)
 
         for q in queries:
             assert set(["id", "category", "query"]).issubset(q.keys())
 
 
+class TestNumberQueries:
+
+    def test_ids_do_not_depend_on_position(self):
+        first = number_queries([("recommendation", ["Best app?", "Cheapest app?"])])
+        second = number_queries([("opinion", ["Is it worth it?"]), ("recommendation", ["Cheapest app?"])])
+        assert first[1]["id"] == second[1]["id"]
+
+    def test_skips_repeated_question(self):
+        queries = number_queries([("recommendation", ["Best app?"]), ("opinion", ["best app", "Worst app?"])])
+        assert [q["query"] for q in queries] == ["Best app?", "Worst app?"]
+
+
 class TestSaveQueries:
 
     def test_writes_expected_json_structure(self, tmp_path):
@@ -99,3 +186,27 @@ class TestSaveQueries:
         assert data["brand"] == "Obsidian"
         assert data["competitors"] == ["Notion", "Roam"]
         assert data["queries"] == queries
+
+    def test_lists_dropped_queries_separately(self, tmp_path):
+        fake_config = {"target": {"name": "Obsidian"}, "competitors": []}
+        queries = [{"id": 1, "category": "recommendation", "query": "What is the best app?"}]
+        dropped = [{"id": 2, "category": "opinion", "query": "What's the best app?", "duplicate_of": 1, "similarity": 0.9}]
+        output_path = tmp_path / "queries.json"
+
+        with patch("src.queries_generator.load_brand_config", return_value=fake_config):
+            save_queries(queries, queries_path=output_path, dropped=dropped)
+
+        with open(output_path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        assert data["queries"] == queries
+        assert data["dropped"] == dropped
+
+    def test_registers_query_ids(self, tmp_path):
+        fake_config = {"target": {"name": "Obsidian"}, "competitors": []}
+        queries = number_queries([("recommendation", ["What is the best app?"])])
+
+        with patch("src.queries_generator.load_brand_config", return_value=fake_config):
+            save_queries(queries, queries_path=tmp_path / "queries.json")
+
+        assert load_registry(tmp_path / "query_registry.json") == {queries[0]["id"]: "What is the best app?"}
@@ -0,0 +1,47 @@
+# Tests for query_registry.py
+
+from src.query_registry import load_registry, lookup, query_id, register, select
+
+
+class TestQueryId:
+
+    def test_stable_and_js_safe(self):
+        qid = query_id("What is the best note-taking app?")
+        assert qid == query_id("what is the best note taking app")
+        assert 0 <= qid < 2**53
+
+    def test_differs_between_questions(self):
+        assert query_id("Best app for students?") != query_id("Best app for teachers?")
+
+
+class TestRegistry:
+
+    def test_registers_and_looks_up(self, tmp_path):
+        path = tmp_path / "query_registry.json"
+        register([{"id": query_id("Best app?"), "query": "Best app?"}], path)
+        register([{"id": query_id("Worst app?"), "query": "Worst app?"}], path)
+
+        assert lookup(query_id("Best app?"), path) == "Best app?"
+        assert load_registry(path) == {query_id("Best app?"): "Best app?", query_id("Worst app?"): "Worst app?"}
+
+    def test_keeps_first_text_of_an_id(self, tmp_path):
+        path = tmp_path / "query_registry.json"
+        register([{"id": query_id("Best app?"), "query": "Best app?"}], path)
+        register([{"id": query_id("Best app?"), "query": "best app"}], path)
+
+        assert lookup(query_id("Best app?"), path) == "Best app?"
+
+    def test_missing_registry_is_empty(self, tmp_path):
+        assert load_registry(tmp_path / "query_registry.json") == {}
+        assert lookup(1, tmp_path / "query_registry.json") is None
+
+    def test_select_resolves_registered_ids(self, tmp_path, caplog):
+        path = tmp_path / "query_registry.json"
+        old = {"id": query_id("Old question?"), "category": "best", "query": "Old question?"}
+        register([old], path)
+        current = [{"id": query_id("New question?"), "category": "best", "query": "New question?"}]
+
+        selected = select(current, {current[0]["id"], old["id"], 12345}, path)
+
+        assert selected == [current[0], {"id": old["id"], "category": None, "query": "Old question?"}]
+        assert "Unknown query id 12345" in caplog.text
@@ -1,6 +1,7 @@
+import json
 import pytest
 from unittest.mock import patch
-from src.query_runner import QueryRunner, QueryOutput
+from src.query_runner import QueryRunner, QueryOutput, append_summary, generate_summary, load_summary_results
 
 
 class TestQueryOutput:
@@ -58,6 +59,50 @@ class TestFilterQueries:
         result = QueryRunner.filter_queries(queries, start=2, limit=2)
         assert [q['id'] for q in result] == [2, 3]
 
+class TestSummary:
+
+    @staticmethod
+    def _write_output(run_dir, query_id):
+        entry = QueryOutput(query_id, f"Q{query_id}?", "test", {"openai": {"text": "A"}}).to_dict()
+        (run_dir / f"output_{query_id}.json").write_text(json.dumps(entry), encoding="utf-8")
+        return entry
+
+    def test_finalizes_appended_log(self, tmp_path):
+        run_dir = tmp_path / "run_2026-01-01_00-00-00"
+        run_dir.mkdir()
+        entries = [self._write_output(run_dir, i) for i in (1, 2)]
+        for entry in entries:
+            append_summary(str(run_dir), entry)
+
+        generate_summary(str(run_dir))
+
+        summary = json.loads((run_dir / "summary.json").read_text(encoding="utf-8"))
+        assert summary["run_info"]["timestamp"] == "2026-01-01_00-00-00"
+        assert summary["run_info"]["total_queries"] == 2
+        assert list(load_summary_results(str(run_dir))) == entries
+
+    def test_rebuilds_log_for_legacy_run(self, tmp_path):
+        run_dir = tmp_path / "run_legacy"
+        run_dir.mkdir()
+        entries = [self._write_output(run_dir, i) for i in (10, 2)]
+
+        generate_summary(str(run_dir))
+
+        assert list(load_summary_results(str(run_dir))) == sorted(entries, key=lambda e: e["id"])
+
+    def test_rebuilds_log_with_duplicate_and_missing_entry(self, tmp_path):
+        run_dir = tmp_path / "run_2026-01-01_00-00-00"
+        run_dir.mkdir()
+        entries = [self._write_output(run_dir, i) for i in (1, 2)]
+        # A retried query logged twice, and another never logged: the line count still matches.
+        append_summary(str(run_dir), entries[0])
+        append_summary(str(run_dir), entries[0])
+
+        generate_summary(str(run_dir))
+
+        assert list(load_summary_results(str(run_dir))) == entries
+
+
 class TestParseArgs:
 
     def test_parses_all_arguments(self):
@@ -76,3 +121,25 @@ class TestParseArgs:
             args = parse_args()
 
             assert (args.start, args.limit, args.ids, args.resume) == (None, None, None, None)
+
+
+class TestRunQueries:
+
+    def test_index_refreshed_at_start_and_end_only(self, tmp_path):
+        import asyncio
+
+        async def fake_ask_all(question, new_cutoff=None):
+            return {"openai": {"text": "A"}}
+
+        run_dir = tmp_path / "run_2026-01-01_00-00-00"
+        run_dir.mkdir()
+        data = {"queries": [{"id": i, "category": "test", "query": f"Q{i}?"} for i in (1, 2, 3)]}
+        brands = {"target": {"name": "Obsidian", "aliases": ["Obsidian"]}, "competitors": []}
+        with patch("src.query_runner.ask_all_providers", fake_ask_all), \
+                patch("src.query_runner.load_brand_config", return_value=brands), \
+                patch("src.query_runner.refresh_run") as refresh:
+            asyncio.run(QueryRunner.run_queries(data, resume_dir=str(run_dir)))
+
+        assert len(list(run_dir.glob("output_*.json"))) == 3
+        assert refresh.call_count == 2
+        refresh.assert_called_with(str(tmp_path), "run_2026-01-01_00-00-00")
@@ -0,0 +1,78 @@
+# Tests for run_index.py
+
+import json
+import os
+import pytest
+from src.run_index import list_indexed_runs, load_index, reconcile, refresh_run
+
+
+def _make_run(results_dir, name, outputs=1, label=None):
+    run_dir = results_dir / name
+    run_dir.mkdir(parents=True, exist_ok=True)
+    for qid in range(1, outputs + 1):
+        (run_dir / f"output_{qid}.json").write_text("{}", encoding="utf-8")
+    if label:
+        (run_dir / "meta.json").write_text(json.dumps({"label": label, "brand": "Obsidian"}), encoding="utf-8")
+    return run_dir
+
+
+class TestRunIndex:
+
+    def test_builds_index_on_first_listing(self, tmp_path):
+        _make_run(tmp_path, "run_2026-01-01_00-00-00", outputs=2, label="Obsidian #1")
+        _make_run(tmp_path, "run_2026-01-02_00-00-00", outputs=3)
+        _make_run(tmp_path, "run_empty", outputs=0)
+
+        runs = list_indexed_runs(str(tmp_path))
+
+        assert [r["name"] for r in runs] == ["run_2026-01-02_00-00-00", "run_2026-01-01_00-00-00"]
+        assert runs[1]["label"] == "Obsidian #1"
+        assert runs[1]["brand"] == "Obsidian"
+        assert runs[0]["query_count"] == 3
+        assert runs[0]["created"] == "2026-01-02T00:00:00"
+        assert (tmp_path / "index.json").exists()
+
+    def test_refresh_run_records_new_outputs(self, tmp_path):
+        run_dir = _make_run(tmp_path, "run_a", outputs=1)
+        list_indexed_runs(str(tmp_path))
+
+        (run_dir / "output_2.json").write_text("{}", encoding="utf-8")
+        (run_dir / "analysis.json").write_text("[]", encoding="utf-8")
+        refresh_run(str(tmp_path), "run_a")
+
+        entry = load_index(str(tmp_path))["runs"]["run_a"]
+        assert entry["query_count"] == 2
+        assert entry["has_analysis"] is True
+
+    def test_reconcile_picks_up_outside_changes(self, tmp_path):
+        _make_run(tmp_path, "run_a")
+        removed = _make_run(tmp_path, "run_b")
+        list_indexed_runs(str(tmp_path))
+
+        _make_run(tmp_path, "run_c", outputs=2)
+        for f in removed.iterdir():
+            f.unlink()
+        removed.rmdir()
+
+        assert reconcile(str(tmp_path)) is True
+        assert [r["name"] for r in list_indexed_runs(str(tmp_path))] == ["run_c", "run_a"]
+        assert reconcile(str(tmp_path)) is False
+
+
+class TestLatestRun:
+
+    def test_latest_run_follows_names_not_mtimes(self, tmp_path):
+        from src.mention_analyzer import latest_run_dir
+
+        for name in ("run_2024-05-01_10-00-00", "run_2024-05-02_09-00-00", "run_2024-05-02_09-00-00_2"):
+            _make_run(tmp_path, name)
+        # Reading an old run writes into its directory, making it the most recently modified.
+        (tmp_path / "run_2024-05-01_10-00-00" / "mentions.json").write_text("{}", encoding="utf-8")
+
+        assert latest_run_dir(str(tmp_path)) == "run_2024-05-02_09-00-00_2"
+
+    def test_suffixed_runs_order_numerically(self):
+        from src.run_index import run_sort_key
+
+        names = ["run_2024-05-02_09-00-00_10", "run_2024-05-02_09-00-00", "run_2024-05-02_09-00-00_2"]
+        assert sorted(names, key=run_sort_key) == [names[1], names[2], names[0]]
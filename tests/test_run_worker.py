@@ -0,0 +1,147 @@
+# Tests for webapp/run_worker.py
+
+import asyncio
+import queue
+import threading
+
+from webapp import run_worker
+
+
+def _next_matching(events, predicate):
+    while True:
+        snapshot = events.get(timeout=5)
+        if predicate(snapshot):
+            return snapshot
+
+
+class TestWorkerMain:
+
+    def test_runs_jobs_concurrently_and_cancels_one(self, monkeypatch):
+        monkeypatch.setattr(run_worker, "PROGRESS_INTERVAL", 0.01)
+        jobs, controls, events = queue.Queue(), queue.Queue(), queue.Queue()
+        started = []
+
+        # "a" only finishes once "b" has started, so both ran at once; "b" runs until cancelled.
+        async def fake_run(query_ids, run_label, state, config):
+            started.append(run_label)
+            state.update(running=True, run_name=f"run_{run_label}", label=run_label, total=len(query_ids))
+            while not state["cancel_requested"] and len(started) < 2:
+                await asyncio.sleep(0.01)
+            while not state["cancel_requested"] and run_label == "b":
+                await asyncio.sleep(0.01)
+            state.update(running=False, completed=1)
+
+        worker = threading.Thread(target=run_worker.worker_main, args=(jobs, controls, events, fake_run, 2))
+        worker.start()
+        for run_id in ("a", "b", "c"):
+            jobs.put({"id": run_id, "query_ids": [1, 2], "run_label": run_id, "config": {}})
+
+        assert _next_matching(events, lambda s: s["id"] == "a" and s["status"] == "done")["completed"] == 1
+        # "c" only starts once a slot is free, while "b" is still running.
+        _next_matching(events, lambda s: s["id"] == "c" and s["status"] == "done")
+        controls.put({"cancel": "b"})
+        _next_matching(events, lambda s: s["id"] == "b" and s["status"] == "cancelled")
+        assert started == ["a", "b", "c"]
+
+        jobs.put(None)
+        controls.put(None)
+        worker.join(5)
+        assert not worker.is_alive()
+
+    def test_job_cancelled_while_queued_never_runs(self, monkeypatch):
+        jobs, controls, events = queue.Queue(), queue.Queue(), queue.Queue()
+
+        async def fake_run(*args, **kwargs):
+            raise AssertionError("cancelled job ran")
+
+        controls.put({"cancel": "a"})
+        worker = threading.Thread(target=run_worker.worker_main, args=(jobs, controls, events, fake_run, 1))
+        worker.start()
+        # Give the control reader a moment to see the cancel before the job arrives.
+        threading.Event().wait(0.2)
+        jobs.put({"id": "a", "query_ids": None, "run_label": None, "config": {}})
+
+        assert events.get(timeout=5)["status"] == "cancelled"
+        jobs.put(None)
+        controls.put(None)
+        worker.join(5)
+
+
+class TestRunWorker:
+
+    def test_poll_applies_reports_and_detects_dead_worker(self, monkeypatch):
+        handle = run_worker.RunWorker()
+        monkeypatch.setattr(handle, "start", lambda: None)
+        state = handle.submit([1], "Weekly", config={})
+        assert handle.latest() is state
+
+        handle.events.put(dict(state, status="running", running=True, completed=3))
+        assert handle.poll(timeout=5)
+        assert state["completed"] == 3
+        assert handle.cancel(state["id"])
+
+        # No worker process was ever started, so a silent queue means it is gone.
+        assert not handle.poll(timeout=0.01)
+        assert state["status"] == "failed"
+        assert not handle.cancel(state["id"])
+
+    def test_dead_worker_requeues_waiting_runs(self, monkeypatch):
+        handle = run_worker.RunWorker()
+        monkeypatch.setattr(handle, "start", lambda: None)
+        running = handle.submit([1], "First", config={})
+        waiting = handle.submit([2], "Second", config={})
+        cancelled = handle.submit([3], "Third", config={})
+        handle.cancel(cancelled["id"])
+        handle.events.put(dict(running, status="running", running=True))
+        assert handle.poll(timeout=5)
+
+        assert not handle.poll(timeout=0.01)
+        assert running["status"] == "failed"
+        assert waiting["status"] == "queued"
+        assert cancelled["status"] == "cancelled"
+
+        # Only the waiting run's job is left for the next worker.
+        requeued = [handle.jobs.get(timeout=5)["id"]]
+        while True:
+            try:
+                requeued.append(handle.jobs.get(timeout=0.1)["id"])
+            except queue.Empty:
+                break
+        assert requeued == [waiting["id"]]
+
+    def test_submissions_race_readers_safely(self, monkeypatch):
+        monkeypatch.setattr(run_worker, "FINISHED_RUNS_KEPT", 0)
+        handle = run_worker.RunWorker()
+        monkeypatch.setattr(handle, "start", lambda: None)
+        errors = []
+        submitted = threading.Event()
+
+        def submit():
+            for _ in range(200):
+                state = handle.submit(None, None, config={})
+                handle.events.put(dict(state, status="done"))
+            submitted.set()
+
+        def read():
+            try:
+                while not submitted.is_set():
+                    handle.states()
+                    handle.is_active("x")
+                    handle.poll(timeout=0)
+            except RuntimeError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=submit), threading.Thread(target=read), threading.Thread(target=read)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        assert errors == []
+        assert len(handle.states()) <= 200
+
+    def test_progress_stream_of_unknown_run_is_404(self):
+        from fastapi.testclient import TestClient
+        from webapp import app as app_module
+
+        client = TestClient(app_module.app)
+        assert client.get("/api/runs/active", params={"id": "missing"}).status_code == 404
@@ -0,0 +1,83 @@
+# Tests for stream_cutoff.py
+
+from src.stream_cutoff import StreamCutoff, config_brands
+
+
+BRANDS = {"Obsidian": ["Obsidian"], "Notion": ["Notion", "Notion AI"]}
+
+
+def feed_all(cutoff, pieces):
+    """Feed pieces until the cutoff says stop; returns how many were read."""
+    for count, piece in enumerate(pieces, 1):
+        if cutoff.feed(piece):
+            return count
+    return len(pieces)
+
+
+class TestMentionDetection:
+
+    def test_finds_first_positions_across_pieces(self):
+        cutoff = StreamCutoff(BRANDS)
+        feed_all(cutoff, ["Try Obs", "idian, or No", "tion. Obsidian again."])
+        assert cutoff.first_mentions() == [
+            {"brand": "Obsidian", "position": 4},
+            {"brand": "Notion", "position": 17},
+        ]
+
+    def test_match_at_end_waits_for_word_boundary(self):
+        cutoff = StreamCutoff({"Roam": ["Roam"]})
+        cutoff.feed("Go Roam")
+        assert cutoff.first_mentions() == []
+        cutoff.feed("ing around.")
+        assert cutoff.first_mentions() == []
+
+    def test_finish_accepts_brand_ending_the_answer(self):
+        cutoff = StreamCutoff(BRANDS)
+        feed_all(cutoff, ["Best pick: ", "Notion"])
+        assert cutoff.first_mentions() == []
+        cutoff.finish()
+        assert cutoff.first_mentions() == [{"brand": "Notion", "position": 11}]
+
+    def test_reset_forgets_earlier_answer(self):
+        cutoff = StreamCutoff(BRANDS)
+        cutoff.feed("Notion is fine. ")
+        cutoff.reset()
+        assert cutoff.text == "" and cutoff.first_mentions() == []
+
+
+class TestStopping:
+
+    def test_without_limits_reads_everything(self):
+        cutoff = StreamCutoff(BRANDS)
+        assert feed_all(cutoff, ["Obsidian ", "x" * 500, "."]) == 3
+
+    def test_stops_at_max_chars(self):
+        cutoff = StreamCutoff(BRANDS, max_chars=10)
+        assert feed_all(cutoff, ["abcd", "efgh", "ijkl", "mnop"]) == 3
+
+    def test_stops_after_window_past_first_mention(self):
+        cutoff = StreamCutoff(BRANDS, chars_after_first_mention=20)
+        pieces = ["Intro text. ", "Notion ", "is good ", "for teams ", "and more ", "and more."]
+        read = feed_all(cutoff, pieces)
+        assert read == 4
+        assert len(cutoff.text) >= 12 + 20
+
+    def test_no_mention_means_no_window_stop(self):
+        cutoff = StreamCutoff(BRANDS, chars_after_first_mention=5)
+        assert feed_all(cutoff, ["nothing ", "to see ", "here"]) == 3
+
+
+class TestConfig:
+
+    def test_signature_ignores_alias_order_of_brands(self):
+        a = StreamCutoff({"A": ["a"], "B": ["b"]}, max_chars=5)
+        b = StreamCutoff({"B": ["b"], "A": ["a"]}, max_chars=5)
+        assert a.signature() == b.signature()
+        assert a.signature() != StreamCutoff({"A": ["a"], "B": ["b"]}, max_chars=6).signature()
+
+    def test_config_brands_lists_target_and_competitors(self):
+        config = {
+            "target": {"name": "Obsidian", "aliases": ["Obsidian", "Obsidian.md"]},
+            "competitors": [{"name": "Notion", "aliases": ["Notion"]}],
+        }
+        assert config_brands(config) == {"Obsidian": ["Obsidian", "Obsidian.md"], "Notion": ["Notion"]}
@@ -0,0 +1,67 @@
+# Tests for src/trends.py
+
+from src import trends
+from src.aggregations import brand_summary
+
+
+def _rows(provider, qid, category, counts, scores):
+    winner = max(counts, key=counts.get) if max(counts.values()) else None
+    return [
+        {"provider": provider, "question_id": qid, "category": category, "brand": brand,
+         "is_target": brand == "Obsidian", "found": count > 0, "count": count,
+         "most_mentioned": winner, "score": scores[brand]}
+        for brand, count in counts.items()
+    ]
+
+
+RESULTS = (
+    _rows("openai", 1, "best", {"Obsidian": 2, "Notion": 1}, {"Obsidian": 1.0, "Notion": 0.6})
+    + _rows("google", 1, "best", {"Obsidian": 0, "Notion": 3}, {"Obsidian": 0.0, "Notion": 1.0})
+    + _rows("openai", 2, "alternatives", {"Obsidian": 1, "Notion": 0}, {"Obsidian": 0.3, "Notion": 0.0})
+)
+
+
+class TestRunPoint:
+
+    def test_overall_totals_match_brand_summary(self):
+        point = trends.run_point(RESULTS)
+        series = trends.series([point], ["Obsidian", "Notion"])["brands"]
+
+        for row in brand_summary(RESULTS):
+            assert series[row["brand"]] == {
+                "mentions": [row["mentions"]],
+                "found_in": [row["found_in"]],
+                "wins": [row["wins"]],
+                "avg_score": [row["avg_score"]],
+            }
+
+    def test_groups_by_provider_and_category(self):
+        point = trends.run_point(RESULTS)
+
+        assert point["providers"]["google"]["Notion"][:3] == [3, 1, 1]
+        assert point["categories"]["alternatives"]["Obsidian"][:3] == [1, 1, 1]
+
+
+class TestSeries:
+
+    def test_missing_groups_and_brands_are_none(self):
+        first = trends.run_point(RESULTS)
+        second = trends.run_point([r for r in RESULTS if r["provider"] == "openai"])
+
+        result = trends.series([first, second], ["Obsidian", "Roam"])
+
+        assert result["providers"]["google"]["Obsidian"]["mentions"] == [0, None]
+        assert result["brands"]["Roam"]["wins"] == [None, None]
+        assert result["brands"]["Obsidian"]["mentions"] == [3, 3]
+
+
+class TestStore:
+
+    def test_record_and_drop_runs(self, tmp_path):
+        point = trends.run_point(RESULTS)
+        trends.record_runs(str(tmp_path), {"run_a": {"fingerprint": "a", "point": point}})
+        trends.record_runs(str(tmp_path), {"run_b": {"fingerprint": "b", "point": point}})
+        assert set(trends.load_trends(str(tmp_path))) == {"run_a", "run_b"}
+
+        trends.record_runs(str(tmp_path), {}, keep={"run_b"})
+        assert set(trends.load_trends(str(tmp_path))) == {"run_b"}
@@ -1,7 +1,10 @@
 import asyncio
 import json as json_module
+import logging
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request, Query
+from fastapi import BackgroundTasks, FastAPI, Request, Query
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import JSONResponse, StreamingResponse
 from pathlib import Path
@@ -10,10 +13,83 @@ from typing import Optional
 
 from . import data_loader
 from . import run_manager
+from . import run_worker
 from . import query_cache
-from src.onboarding import generate_placeholders, regenerate_competitors
+from . import onboarding_jobs
+from .http_cache import IMMUTABLE, cached_response, make_etag
+from src.llm_clients import client_pool, coalescing_stats
+from src.queries_generator import CATEGORIES, number_queries
+from src.query_dedup import drop_near_duplicates
 
-app = FastAPI(title="LLM SEO Monitor")
+logger = logging.getLogger(__name__)
+
+# How often the run index is checked against the results directory, to pick up
+# runs created, copied in or deleted outside the app.
+RUN_INDEX_RECONCILE_SECONDS = 30
+
+
+async def _reconcile_run_index():
+    while True:
+        try:
+            await asyncio.to_thread(data_loader.reconcile_runs)
+        except Exception as e:
+            logger.error(f"Run index reconcile failed: {e}")
+        await asyncio.sleep(RUN_INDEX_RECONCILE_SECONDS)
+
+
+# Runs are queued for a worker process; it mirrors their progress into runs_worker.runs.
+runs_worker = run_worker.RunWorker()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    runs_worker.start()
+    reconciler = asyncio.create_task(_reconcile_run_index())
+    progress = asyncio.create_task(runs_worker.pump())
+    try:
+        # Provider clients for previews and onboarding live as long as the server.
+        async with client_pool(warmup=True):
+            yield
+    finally:
+        reconciler.cancel()
+        progress.cancel()
+        await asyncio.to_thread(runs_worker.stop)
+
+
+class StreamSafeGZipMiddleware(GZipMiddleware):
+    """GZip, except for EventSource requests.
+
+    Starlette releases before SSE was excluded from compression buffer an
+    event stream inside the gzip encoder, so progress events would stall.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            accept = dict(scope["headers"]).get(b"accept", b"")
+            if b"text/event-stream" in accept:
+                await self.app(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
+
+
+app = FastAPI(title="LLM SEO Monitor", lifespan=lifespan)
+# Query details and dashboard bundles of large runs are hundreds of KB of
+# repetitive JSON.
+app.add_middleware(StreamSafeGZipMiddleware, minimum_size=1024)
+
+
+def _run_etag(request, *run_names):
+    """ETag of a derived run view, or None if a run does not exist."""
+    brands = data_loader.load_brands()
+    try:
+        fingerprints = [data_loader.run_fingerprint(name, brands) for name in run_names]
+    except FileNotFoundError:
+        return None
+    return make_etag(request.url.path, request.url.query, *fingerprints)
+
+
+def _is_finalized(run_name):
+    return not runs_worker.is_active(run_name)
 
 
 class BrandsUpdate(BaseModel):
@@ -61,24 +137,24 @@ async def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
-@app.post("/api/onboard")
+@app.post("/api/onboard", status_code=202)
 async def onboard(data: OnboardRequest):
-    try:
-        cfg = await generate_placeholders(data.brand_name, data.description, data.language, data.market)
-        return cfg
-    except Exception as e:
-        return JSONResponse({"error": str(e)}, status_code=500)
+    return onboarding_jobs.start_onboarding(data.brand_name, data.description, data.language, data.market)
 
 
-@app.post("/api/onboard/competitors")
+@app.post("/api/onboard/competitors", status_code=202)
 async def onboard_regenerate_competitors(data: CompetitorsRegenerateRequest):
-    try:
-        competitors = await regenerate_competitors(
-            data.brand_name, data.description, data.language, data.market, data.exclude
-        )
-        return {"competitors": competitors}
-    except Exception as e:
-        return JSONResponse({"error": str(e)}, status_code=500)
+    return onboarding_jobs.start_competitors(
+        data.brand_name, data.description, data.language, data.market, data.exclude
+    )
+
+
+@app.get("/api/onboard/jobs/{job_id}")
+async def onboard_job(job_id: str):
+    job = onboarding_jobs.jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    return job
 
 
 @app.get("/api/runs")
@@ -88,40 +164,88 @@ async def get_runs():
 
 @app.post("/api/runs/start")
 async def start_run(data: RunStart = RunStart()):
-    if run_manager.active_run["running"]:
-        return JSONResponse({"error": "A run is already active"}, status_code=409)
-    asyncio.create_task(run_manager.execute_run(data.query_ids, data.run_label))
-    return {"status": "started"}
+    state = await asyncio.to_thread(runs_worker.submit, data.query_ids, data.run_label)
+    return {"status": state["status"], "id": state["id"]}
+
+
+@app.get("/api/runs/queue")
+async def run_queue():
+    return runs_worker.states()
 
 
 @app.get("/api/runs/active")
-async def active_run_stream():
+async def active_run_stream(id: Optional[str] = None):
+    if id and runs_worker.get(id) is None:
+        return JSONResponse({"error": "Run not found"}, status_code=404)
+
     async def event_generator():
         started = False
         while True:
-            state = run_manager.active_run
+            state = runs_worker.get(id) if id else runs_worker.latest()
+            if state is None:
+                if id:
+                    # Forgotten while streamed (only finished runs are).
+                    break
+                # Nothing submitted yet: an idle record until something is.
+                state = dict(run_manager.new_run_state(None), status=None)
             data = json_module.dumps(state)
             yield f"data: {data}\n\n"
-            if state["running"]:
+            if state["running"] or state.get("status") == "queued":
                 started = True
-            if started and not state["running"]:
+            elif started or state.get("status") in run_worker.FINISHED_STATUSES:
                 break
             await asyncio.sleep(1)
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 
 @app.post("/api/runs/stop")
-async def stop_run():
-    if not run_manager.active_run["running"]:
+async def stop_run(id: Optional[str] = None):
+    state = runs_worker.get(id) if id else runs_worker.latest()
+    if state is None or not runs_worker.cancel(state["id"]):
         return JSONResponse({"error": "No active run"}, status_code=404)
-    run_manager.active_run["cancel_requested"] = True
-    return {"status": "stopping"}
+    return {"status": "stopping", "id": state["id"]}
 
 
 @app.get("/api/queries/preview")
-async def preview_queries():
-    queries = await query_cache.get_queries()
-    return {"queries": queries, "total": len(queries)}
+async def preview_queries(stream: bool = False):
+    if stream:
+        return StreamingResponse(_stream_preview(), media_type="text/event-stream")
+    queries, dropped = drop_near_duplicates(await query_cache.get_queries())
+    return {"queries": queries, "total": len(queries), "dropped": dropped}
+
+
+async def _stream_preview():
+    """SSE: one {"category", "queries"} event per category as it arrives, then a "done" event.
+
+    The final event carries the ids of the full list in order (near-duplicates
+    and cross-category repeats removed) and what was dropped.
+    """
+    by_category = {}
+    sent = set()
+    async for cat_name, texts in query_cache.iter_queries():
+        by_category[cat_name] = texts
+        queries = [q for q in number_queries([(cat_name, texts)]) if q["id"] not in sent]
+        sent.update(q["id"] for q in queries)
+        yield f"data: {json_module.dumps({'category': cat_name, 'queries': queries})}\n\n"
+    ordered = number_queries((cat_name, by_category[cat_name]) for cat_name, _ in CATEGORIES)
+    queries, dropped = drop_near_duplicates(ordered)
+    done = {"done": True, "ids": [q["id"] for q in queries], "total": len(queries), "dropped": dropped}
+    yield f"data: {json_module.dumps(done)}\n\n"
+
+
+@app.post("/api/queries/regenerate")
+async def regenerate_queries(category: Optional[str] = None):
+    names = [name for name, _ in CATEGORIES]
+    if category is not None and category not in names:
+        return JSONResponse({"error": f"Unknown category: {category}"}, status_code=400)
+    queries, dropped = drop_near_duplicates(await query_cache.get_queries(regenerate=[category] if category else names))
+    return {"queries": queries, "total": len(queries), "dropped": dropped}
+
+
+@app.get("/api/llm/stats")
+async def llm_stats():
+    """Request coalescing counts of this server process (runs report theirs in the worker's log)."""
+    return {"coalescing": coalescing_stats()}
 
 
 @app.get("/api/brands")
@@ -130,76 +254,131 @@ async def get_brands():
 
 
 @app.get("/api/runs/compare")
-async def compare_runs(run_a: str = Query(...), run_b: str = Query(...)):
-    analysis_a = data_loader.load_analysis(run_a)
-    analysis_b = data_loader.load_analysis(run_b)
+async def compare_runs(request: Request, run_a: str = Query(...), run_b: str = Query(...)):
+    return cached_response(request, _run_etag(request, run_a, run_b), lambda: _compare_runs(run_a, run_b))
+
+
+def _compare_runs(run_a, run_b):
     brands = data_loader.load_brands()
-    target = brands["target"]
     return {
-        "run_a": {
-            "name": run_a,
-            "label": data_loader.get_run_label(run_a),
-            "summary": {
-                "brands": data_loader.get_brand_summary(analysis_a),
-                "target": target,
-                "total_queries": len(set(r["question_id"] for r in analysis_a)),
-            },
-            "providers": data_loader.get_provider_comparison(analysis_a, target),
-            "categories": data_loader.get_category_performance(analysis_a, target),
-        },
-        "run_b": {
-            "name": run_b,
-            "label": data_loader.get_run_label(run_b),
-            "summary": {
-                "brands": data_loader.get_brand_summary(analysis_b),
-                "target": target,
-                "total_queries": len(set(r["question_id"] for r in analysis_b)),
-            },
-            "providers": data_loader.get_provider_comparison(analysis_b, target),
-            "categories": data_loader.get_category_performance(analysis_b, target),
-        },
+        key: {"name": name, "label": data_loader.get_run_label(name), **data_loader.run_aggregates(name, brands)}
+        for key, name in (("run_a", run_a), ("run_b", run_b))
     }
 
 
+@app.get("/api/compare")
+async def compare_many_runs(request: Request, runs: str = Query(...)):
+    run_names = list(dict.fromkeys(r.strip() for r in runs.split(",") if r.strip()))
+    if not run_names or len(run_names) > data_loader.COMPARE_MAX_RUNS:
+        return JSONResponse(
+            {"error": f"Pass between 1 and {data_loader.COMPARE_MAX_RUNS} run names"}, status_code=400
+        )
+
+    def build():
+        try:
+            return data_loader.compare_many(run_names)
+        except FileNotFoundError:
+            return JSONResponse({"error": "Run not found"}, status_code=404)
+
+    return await asyncio.to_thread(lambda: cached_response(request, _run_etag(request, *run_names), build))
+
+
+@app.get("/api/trends")
+async def get_trends(brands: Optional[str] = None):
+    names = [b.strip() for b in brands.split(",") if b.strip()] if brands else None
+    return await asyncio.to_thread(data_loader.get_trends, names)
+
+
 @app.get("/api/runs/{run_name}/summary")
-async def get_summary(run_name: str):
-    analysis = data_loader.load_analysis(run_name)
-    brands = data_loader.load_brands()
-    return {
-        "brands": data_loader.get_brand_summary(analysis),
-        "target": brands["target"],
-        "total_queries": len(set(r["question_id"] for r in analysis)),
-        "total_completions": len({(r["question_id"], r["provider"]) for r in analysis}),
-    }
+async def get_summary(request: Request, run_name: str):
+    def build():
+        analysis = data_loader.load_analysis(run_name)
+        brands = data_loader.load_brands()
+        return data_loader.get_run_summary(analysis, brands["target"])
+    return cached_response(request, _run_etag(request, run_name), build)
+
+
+@app.get("/api/runs/{run_name}/dashboard")
+async def get_dashboard(request: Request, run_name: str, sections: Optional[str] = None):
+    requested = [s.strip() for s in sections.split(",") if s.strip()] if sections else list(data_loader.DASHBOARD_SECTIONS)
+    unknown = [s for s in requested if s not in data_loader.DASHBOARD_SECTIONS]
+    if unknown:
+        return JSONResponse({"error": f"Unknown sections: {', '.join(unknown)}"}, status_code=400)
+    return cached_response(
+        request, _run_etag(request, run_name), lambda: data_loader.get_dashboard(run_name, requested)
+    )
 
 
 @app.get("/api/runs/{run_name}/providers")
-async def get_providers(run_name: str):
-    analysis = data_loader.load_analysis(run_name)
-    brands = data_loader.load_brands()
-    return data_loader.get_provider_comparison(analysis, brands["target"])
+async def get_providers(request: Request, run_name: str):
+    def build():
+        analysis = data_loader.load_analysis(run_name)
+        brands = data_loader.load_brands()
+        return data_loader.get_provider_comparison(analysis, brands["target"])
+    return cached_response(request, _run_etag(request, run_name), build)
 
 
 @app.get("/api/runs/{run_name}/categories")
-async def get_categories(run_name: str):
-    analysis = data_loader.load_analysis(run_name)
-    brands = data_loader.load_brands()
-    return data_loader.get_category_performance(analysis, brands["target"])
+async def get_categories(request: Request, run_name: str):
+    def build():
+        analysis = data_loader.load_analysis(run_name)
+        brands = data_loader.load_brands()
+        return data_loader.get_category_performance(analysis, brands["target"])
+    return cached_response(request, _run_etag(request, run_name), build)
 
 
 @app.get("/api/runs/{run_name}/queries")
-async def get_queries(run_name: str):
-    analysis = data_loader.load_analysis(run_name)
-    return data_loader.get_query_details(analysis, run_name)
+async def get_queries(
+    request: Request,
+    run_name: str,
+    category: Optional[str] = None,
+    provider: Optional[str] = None,
+    winner: Optional[str] = None,
+    target_lost: Optional[bool] = None,
+    brand_found: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=data_loader.QUERY_PAGE_MAX),
+):
+    filters = dict(category=category, provider=provider, winner=winner, target_lost=target_lost, brand_found=brand_found)
+
+    def build():
+        if all(v is None for v in (*filters.values(), fields, cursor, limit)):
+            analysis = data_loader.load_analysis(run_name)
+            return data_loader.get_query_details(analysis, run_name)
+        try:
+            return data_loader.query_page(
+                run_name,
+                fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+                cursor=cursor,
+                limit=limit or 50,
+                **filters,
+            )
+        except FileNotFoundError:
+            return JSONResponse({"error": "Run not found"}, status_code=404)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+    return cached_response(request, _run_etag(request, run_name), build)
 
 
 @app.get("/api/runs/{run_name}/queries/{query_id}/raw")
-async def get_query_raw(run_name: str, query_id: int):
-    raw = data_loader.load_raw_responses(run_name)
-    entry = next((r for r in raw if r["id"] == query_id), None)
-    if not entry:
-        return JSONResponse({"error": "Not found"}, status_code=404)
-    return entry
+async def get_query_raw(request: Request, run_name: str, query_id: int):
+    def build():
+        entry = data_loader.load_raw_response(run_name, query_id)
+        if not entry:
+            return JSONResponse({"error": "Not found"}, status_code=404)
+        return entry
+
+    # A raw answer only depends on its own output file, never on the brand config.
+    try:
+        stat = (data_loader.RESULTS_DIR / run_name / f"output_{query_id}.json").stat()
+    except (FileNotFoundError, NotADirectoryError):
+        return build()
+    etag = make_etag(run_name, query_id, stat.st_size, stat.st_mtime_ns)
+    if _is_finalized(run_name):
+        return cached_response(request, etag, build, cache_control=IMMUTABLE)
+    return cached_response(request, etag, build)
 
 
 @app.get("/api/brands/raw")
@@ -208,8 +387,9 @@ async def get_brands_raw():
 
 
 @app.put("/api/brands")
-async def update_brands(data: BrandsUpdate):
+async def update_brands(data: BrandsUpdate, background_tasks: BackgroundTasks):
     data_loader.save_brands(data.model_dump())
+    background_tasks.add_task(data_loader.refresh_run_mentions)
     return {"status": "ok"}
 
 
@@ -241,7 +421,6 @@ async def get_config(name: str):
 async def activate_config(name: str):
     if not data_loader.activate_config(name):
         return JSONResponse({"error": "Config not found"}, status_code=404)
-    query_cache.invalidate()
     return {"status": "ok"}
 
 
@@ -1,9 +1,23 @@
+import base64
+import bisect
+import hashlib
 import json
-import os
 import re
-import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from src.config_loader import load_brand_config
+from src import query_registry, run_index, trends
+from src.config_loader import active_config_path, load_brand_config, save_brand_config, set_active_config
+from src.query_runner import SUMMARY_LOG, load_summary_results
+from src.mention_store import alias_fingerprint, analysis_columns, brand_aliases, load_store, refresh_runs, source_signature, update_store
+from src.aggregations import (
+    ANALYSIS_COLUMNS,
+    as_frame,
+    brand_summary,
+    category_performance,
+    provider_comparison,
+)
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
@@ -33,6 +47,10 @@ def _read_run_brand(run_dir):
 
 
 def get_run_label(run_name):
+    index = run_index.load_index(RESULTS_DIR)
+    entry = index["runs"].get(run_name) if index else None
+    if entry:
+        return entry["label"]
     return _read_run_label(RESULTS_DIR / run_name)
 
 
@@ -40,24 +58,24 @@ def list_runs():
     if not RESULTS_DIR.exists():
         return []
 
-    runs = []
-    for d in RESULTS_DIR.iterdir():
-        if not d.is_dir():
-            continue
-        output_files = list(d.glob("output_*.json"))
-        if len(output_files) == 0:
-            continue
-        meta = _read_run_meta(d)
-        runs.append({
-            "name": d.name,
-            "label": meta.get("label") or d.name,
-            "brand": meta.get("brand") or None,
-            "query_count": len(output_files),
-            "has_analysis": (d / "analysis.json").exists(),
-        })
+    return [
+        {
+            "name": r["name"],
+            "label": r["label"],
+            "brand": r["brand"],
+            "query_count": r["query_count"],
+            "has_analysis": r["has_analysis"],
+            "created": r["created"],
+            "updated": r["updated"],
+        }
+        for r in run_index.list_indexed_runs(RESULTS_DIR)
+    ]
+
 
-    runs.sort(key=lambda r: r["name"], reverse=True)
-    return runs
+def reconcile_runs():
+    """Pick up run directories created or edited outside the app."""
+    if RESULTS_DIR.exists():
+        run_index.reconcile(RESULTS_DIR)
 
 
 def load_brands():
@@ -70,11 +88,20 @@ def load_brands():
             "competitors": [],
             "competitor_aliases": {},
         }
+    return _brands_data(
+        config["target"]["name"],
+        config["target"]["aliases"],
+        {c["name"]: c["aliases"] for c in config["competitors"]},
+    )
+
+
+def _brands_data(target, target_aliases, competitor_aliases):
+    """`load_brands()`'s shape for a (target, aliases, {competitor: aliases}) brand tuple."""
     return {
-        "target": config["target"]["name"],
-        "target_aliases": config["target"]["aliases"],
-        "competitors": [c["name"] for c in config["competitors"]],
-        "competitor_aliases": {c["name"]: c["aliases"] for c in config["competitors"]},
+        "target": target,
+        "target_aliases": target_aliases,
+        "competitors": list(competitor_aliases),
+        "competitor_aliases": dict(competitor_aliases),
     }
 
 
@@ -88,214 +115,158 @@ def load_queries():
 
 
 def load_raw_responses(run_name):
+    """Every raw output of a run, ordered by query id.
+
+    A finalized run (one with summary.json) is read from its summary log in
+    one pass instead of opening every output file.
+    """
     run_path = RESULTS_DIR / run_name
+    if (run_path / "summary.json").exists() and (run_path / SUMMARY_LOG).exists():
+        return sorted(load_summary_results(str(run_path)), key=lambda entry: entry["id"])
     responses = []
-    for f in sorted(run_path.glob("output_*.json")):
+    for f in sorted(run_path.glob("output_*.json"), key=lambda f: int(f.stem[7:])):
         with open(f, "r", encoding="utf-8") as fh:
             responses.append(json.load(fh))
     return responses
 
 
-def load_analysis(run_name):
-    return _build_analysis(run_name)
+# Parsed raw entries served by load_raw_response(), most recently used last.
+RAW_CACHE_SIZE = 256
+_raw_cache = OrderedDict()
 
+# Byte offset of each query id's line in a run's summary log, keyed by log path
+# and invalidated when the log's size or mtime changes.
+_summary_offsets = {}
 
-def _build_analysis(run_name):
-    raw = load_raw_responses(run_name)
-    brands_data = load_brands()
+_SUMMARY_ID = re.compile(rb'^\{"id": (-?\d+)[,}]')
 
-    target_name = brands_data["target"]
-    target_aliases = brands_data["target_aliases"]
-    competitor_aliases = brands_data["competitor_aliases"]
 
-    # Try to get categories from queries.json
-    queries = load_queries()
-    query_categories = {q["id"]: q["category"] for q in queries}
+def _summary_log_offsets(log_path, stat):
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    cached = _summary_offsets.get(log_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    offsets = {}
+    offset = 0
+    with open(log_path, "rb") as fh:
+        for line in fh:
+            match = _SUMMARY_ID.match(line)
+            if match:
+                offsets[int(match.group(1))] = offset
+            elif line.strip():
+                offsets[json.loads(line)["id"]] = offset
+            offset += len(line)
+    _summary_offsets[log_path] = (stamp, offsets)
+    return offsets
 
-    results = []
-    for entry in raw:
-        qid = entry["id"]
-        category = entry.get("category") or query_categories.get(qid, "unknown")
-
-        for provider, response_data in entry["response"].items():
-            if response_data is None:
-                continue
-
-            text = response_data["text"]
-            mentions = _detect_mentions(text, target_name, target_aliases, competitor_aliases)
-            top = max(mentions, key=lambda m: m["count"])
-            max_brand = top["brand"] if top["count"] > 0 else None
-
-            for mention in mentions:
-                results.append({
-                    "question_id": qid,
-                    "category": category,
-                    "provider": provider,
-                    "brand": mention["brand"],
-                    "is_target": mention["is_target"],
-                    "found": mention["found"],
-                    "count": mention["count"],
-                    "most_mentioned": max_brand,
-                    "score": _position_score(mention["first_position"], mention["text_length"]),
-                })
-
-    return results
-
-
-def _detect_mentions(text, target_name, target_aliases, competitor_aliases):
-    text_lower = text.lower()
-    text_length = len(text)
-    mentions = []
-
-    # Target
-    target_matches = []
-    for alias in target_aliases:
-        for m in re.finditer(r'\b' + re.escape(alias.lower()) + r'\b', text_lower):
-            target_matches.append(m)
-    target_matches.sort(key=lambda m: m.start())
-    mentions.append({
-        "brand": target_name,
-        "is_target": True,
-        "found": len(target_matches) > 0,
-        "count": len(target_matches),
-        "first_position": target_matches[0].start() if target_matches else None,
-        "text_length": text_length,
-    })
-
-    # Competitors
-    for brand_name, aliases in competitor_aliases.items():
-        brand_matches = []
-        for alias in aliases:
-            for m in re.finditer(r'\b' + re.escape(alias.lower()) + r'\b', text_lower):
-                brand_matches.append(m)
-        brand_matches.sort(key=lambda m: m.start())
-        mentions.append({
-            "brand": brand_name,
-            "is_target": False,
-            "found": len(brand_matches) > 0,
-            "count": len(brand_matches),
-            "first_position": brand_matches[0].start() if brand_matches else None,
-            "text_length": text_length,
-        })
 
-    return mentions
+def _read_raw_response(run_path, query_id):
+    """Locate one raw entry: its own output file, else its line in the summary log."""
+    output_path = run_path / f"output_{query_id}.json"
+    try:
+        stat = output_path.stat()
+    except FileNotFoundError:
+        pass
+    else:
+        return (str(output_path), stat.st_mtime_ns), lambda: json.loads(output_path.read_text(encoding="utf-8"))
 
+    log_path = run_path / SUMMARY_LOG
+    try:
+        stat = log_path.stat()
+    except FileNotFoundError:
+        return None, None
+    offset = _summary_log_offsets(str(log_path), stat).get(query_id)
+    if offset is None:
+        return None, None
 
-def _position_score(first_position, text_length):
-    if first_position is None:
-        return 0.0
-    relative = first_position / text_length
-    if relative <= 0.20:
-        return 1.0
-    elif relative <= 0.60:
-        return 0.6
-    else:
-        return 0.3
+    def read():
+        with open(log_path, "rb") as fh:
+            fh.seek(offset)
+            return json.loads(fh.readline())
 
+    return (str(log_path), stat.st_mtime_ns, offset), read
 
-def get_brand_summary(analysis):
-    brands = {}
-    for r in analysis:
-        brand = r["brand"]
-        if brand not in brands:
-            brands[brand] = {
-                "brand": brand,
-                "is_target": r["is_target"],
-                "count": 0,
-                "score_sum": 0.0,
-                "found": 0,
-                "wins": 0,
-            }
-        brands[brand]["count"] += r["count"]
-        brands[brand]["score_sum"] += r["score"]
-        if r["found"]:
-            brands[brand]["found"] += 1
-        if r["most_mentioned"] == brand:
-            brands[brand]["wins"] += 1
-
-    num_brands = len(brands)
-    total = len(analysis)
-    result = []
-    for brand, stats in brands.items():
-        avg_score = stats["score_sum"] / total * num_brands if total else 0
-        result.append({
-            "brand": stats["brand"],
-            "is_target": stats["is_target"],
-            "mentions": stats["count"],
-            "found_in": stats["found"],
-            "avg_score": round(avg_score, 2),
-            "wins": stats["wins"],
-        })
 
-    result.sort(key=lambda x: x["mentions"], reverse=True)
-    return result
+def load_raw_response(run_name, query_id):
+    """One query's raw output, or None. Costs a stat when the entry is cached."""
+    stamp, read = _read_raw_response(RESULTS_DIR / run_name, query_id)
+    if stamp is None:
+        return None
 
+    key = (run_name, query_id)
+    cached = _raw_cache.get(key)
+    if cached and cached[0] == stamp:
+        _raw_cache.move_to_end(key)
+        return cached[1]
 
-def get_provider_comparison(analysis, target_brand):
-    by_provider = {}
-    provider_totals = {}
+    entry = read()
+    _raw_cache[key] = (stamp, entry)
+    _raw_cache.move_to_end(key)
+    while len(_raw_cache) > RAW_CACHE_SIZE:
+        _raw_cache.popitem(last=False)
+    return entry
 
-    for r in analysis:
-        provider = r.get("provider", "unknown")
-        if provider not in provider_totals:
-            provider_totals[provider] = 0
-        provider_totals[provider] += 1
 
-        if r["brand"] != target_brand:
-            continue
+def load_analysis(run_name):
+    return _build_analysis(run_name)[0]
 
-        if provider not in by_provider:
-            by_provider[provider] = {"count": 0, "score_sum": 0.0, "found": 0, "wins": 0}
 
-        by_provider[provider]["count"] += r["count"]
-        by_provider[provider]["score_sum"] += r["score"]
-        if r["found"]:
-            by_provider[provider]["found"] += 1
-        if r["most_mentioned"] == target_brand:
-            by_provider[provider]["wins"] += 1
+def _build_analysis(run_name, brands_data=None):
+    """Analysis frame for a run plus its mention store (which carries question texts)."""
+    brands_data = brands_data or load_brands()
+    target_name = brands_data["target"]
+    competitor_aliases = brands_data["competitor_aliases"]
 
-    providers = sorted(by_provider.keys())
-    num_brands = len(set(r["brand"] for r in analysis))
+    # Mentions are cached per brand in the run directory and only rescanned
+    # for brands whose aliases changed since the last load.
+    store, _ = update_store(
+        RESULTS_DIR / run_name,
+        brand_aliases(target_name, brands_data["target_aliases"], competitor_aliases),
+    )
 
-    return {
-        "providers": providers,
-        "mentions": [by_provider[p]["count"] for p in providers],
-        "avg_scores": [
-            round(by_provider[p]["score_sum"] / provider_totals[p] * num_brands, 2)
-            if provider_totals.get(p) else 0
-            for p in providers
-        ],
-        "wins": [by_provider[p]["wins"] for p in providers],
-        "found_in": [by_provider[p]["found"] for p in providers],
-    }
+    # Try to get categories from queries.json
+    queries = load_queries()
+    query_categories = {q["id"]: q["category"] for q in queries}
 
+    return as_frame(analysis_columns(store, target_name, competitor_aliases, query_categories)), store
 
-def get_category_performance(analysis, target_brand):
-    categories = {}
 
-    for r in analysis:
-        cat = r.get("category", "unknown")
-        if cat not in categories:
-            categories[cat] = {"total": 0, "target_wins": 0}
+def refresh_run_mentions():
+    """Rescan, across every stored run, the brands whose aliases changed."""
+    if not RESULTS_DIR.exists():
+        return {}
+    brands_data = load_brands()
+    rescanned = refresh_runs(
+        RESULTS_DIR,
+        brand_aliases(brands_data["target"], brands_data["target_aliases"], brands_data["competitor_aliases"]),
+    )
+    # Trend points recorded under the old aliases are stale now; rebuild them
+    # from the fresh mention stores rather than on the next trends request.
+    get_trends()
+    return rescanned
 
-        if r["is_target"]:
-            categories[cat]["total"] += 1
-            if r["most_mentioned"] == target_brand:
-                categories[cat]["target_wins"] += 1
 
-    cat_names = sorted(categories.keys())
+def get_run_summary(analysis, target_brand):
     return {
-        "categories": cat_names,
-        "win_rates": [
-            round(categories[c]["target_wins"] / categories[c]["total"] * 100, 1)
-            if categories[c]["total"] else 0
-            for c in cat_names
-        ],
-        "total_queries": [categories[c]["total"] for c in cat_names],
-        "target_wins": [categories[c]["target_wins"] for c in cat_names],
+        "brands": get_brand_summary(analysis),
+        "target": target_brand,
+        "total_queries": int(analysis["question_id"].nunique()),
+        "total_completions": len(analysis[["question_id", "provider"]].drop_duplicates()),
     }
 
 
+def get_brand_summary(analysis):
+    return brand_summary(analysis)
+
+
+def get_provider_comparison(analysis, target_brand):
+    return provider_comparison(analysis, target_brand)
+
+
+def get_category_performance(analysis, target_brand):
+    return category_performance(analysis, target_brand)
+
+
 def load_templates():
     try:
         config = load_brand_config()
@@ -333,11 +304,7 @@ def save_brands(data):
     else:
         config["competitors"] = comps_in
 
-    configs_dir = ENTRIES_DIR / "configs"
-    files = list(configs_dir.glob("*.json"))
-    latest = max(files, key=lambda f: f.stat().st_mtime)
-    with open(latest, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=4, ensure_ascii=False)
+    save_brand_config(config)
 
 
 def save_templates(data):
@@ -364,7 +331,11 @@ def list_configs():
     if not CONFIGS_DIR.exists():
         return []
     files = sorted(CONFIGS_DIR.glob("*.json"), key=lambda f: f.stat().st_mtime, reverse=True)
-    return [{"name": f.stem, "created": f.stem.replace("config_", "")} for f in files]
+    try:
+        active = active_config_path(CONFIGS_DIR).name
+    except FileNotFoundError:
+        active = None
+    return [{"name": f.stem, "created": f.stem.replace("config_", ""), "active": f.name == active} for f in files]
 
 
 def load_config_by_name(name):
@@ -390,48 +361,366 @@ def activate_config(name):
     path = CONFIGS_DIR / f"{name}.json"
     if not path.exists():
         return False
-    # load_brand_config() picks the config file with the newest mtime, so bumping
-    # this one past every sibling makes it active without rewriting its contents.
-    # The +1 matters because clock granularity can make two touches tie.
-    newest = max(f.stat().st_mtime for f in CONFIGS_DIR.glob("*.json"))
-    stamp = max(time.time(), newest + 1)
-    os.utime(path, (stamp, stamp))
+    set_active_config(path.name, CONFIGS_DIR)
     return True
 
 
 def delete_config(name):
     path = CONFIGS_DIR / f"{name}.json"
     if path.exists():
+        # Removing the file moves the directory mtime, so the cached active config is dropped.
         path.unlink()
 
 
-def get_query_details(analysis, run_name):
-    raw = load_raw_responses(run_name)
-    questions = {entry["id"]: entry["question"] for entry in raw}
+def _registered_question(qid):
+    return query_registry.lookup(qid, ENTRIES_DIR / query_registry.REGISTRY_PATH.name) or ""
+
 
+def get_query_details(analysis, run_name, questions=None):
+    if questions is None:
+        store = load_store(RESULTS_DIR / run_name)
+        if store is not None:
+            questions = {int(qid): q for qid, q in store["questions"].items()}
+        else:
+            questions = {entry["id"]: entry["question"] for entry in load_raw_responses(run_name)}
+
+    analysis = as_frame(analysis)
     by_query = {}
-    for r in analysis:
-        qid = r["question_id"]
+    for r in analysis.itertuples(index=False):
+        qid = r.question_id
         if qid not in by_query:
             by_query[qid] = {
                 "question_id": qid,
-                "category": r.get("category", "unknown"),
-                "question": questions.get(qid, ""),
+                "category": r.category,
+                # Ids missing from the run's own records may still be in the query registry.
+                "question": questions.get(qid) or _registered_question(qid),
                 "providers": {},
             }
-        provider = r.get("provider", "unknown")
+        provider = r.provider
         if provider not in by_query[qid]["providers"]:
             by_query[qid]["providers"][provider] = {"brands": [], "winner": None}
 
         by_query[qid]["providers"][provider]["brands"].append({
-            "brand": r["brand"],
-            "is_target": r["is_target"],
-            "count": r["count"],
-            "found": r["found"],
-            "score": r["score"],
+            "brand": r.brand,
+            "is_target": r.is_target,
+            "count": r.count,
+            "found": r.found,
+            "score": r.score,
         })
-        if r["most_mentioned"] == r["brand"]:
-            by_query[qid]["providers"][provider]["winner"] = r["brand"]
+        if r.most_mentioned == r.brand:
+            by_query[qid]["providers"][provider]["winner"] = r.brand
 
     result = sorted(by_query.values(), key=lambda x: x["question_id"])
     return result
+
+
+DASHBOARD_SECTIONS = ("summary", "providers", "categories", "queries")
+
+
+def get_dashboard(run_name, sections=DASHBOARD_SECTIONS):
+    """Every dashboard view of a run from one brand-config read and one analysis load."""
+    brands_data = load_brands()
+    target = brands_data["target"]
+    analysis, store = _build_analysis(run_name, brands_data)
+
+    views = {
+        "summary": lambda: get_run_summary(analysis, target),
+        "providers": lambda: get_provider_comparison(analysis, target),
+        "categories": lambda: get_category_performance(analysis, target),
+        "queries": lambda: get_query_details(
+            analysis, run_name, {int(qid): q for qid, q in store["questions"].items()}
+        ),
+    }
+    return {section: views[section]() for section in sections}
+
+
+def run_fingerprint(run_name, brands_data=None):
+    """Changes whenever a run's output files or the brand aliases it is analyzed with change."""
+    brands_data = brands_data or load_brands()
+    # Output files' own mtimes and sizes: rewriting one in place leaves the directory's mtime alone.
+    parts = [run_name, source_signature(RESULTS_DIR / run_name)]
+    for brand_name, aliases in brand_aliases(
+        brands_data["target"], brands_data["target_aliases"], brands_data["competitor_aliases"]
+    ):
+        parts.append(f"{brand_name}={alias_fingerprint(aliases)}")
+    queries_path = ENTRIES_DIR / "queries.json"
+    if queries_path.exists():
+        # Answers stored without a category fall back to queries.json.
+        parts.append(str(queries_path.stat().st_mtime_ns))
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:20]
+
+
+QUERY_FIELDS = ("question_id", "category", "question", "providers")
+QUERY_PAGE_MAX = 500
+
+# Per-run query records plus the per-provider facts the filters test, for the
+# most recently used runs.
+QUERY_INDEX_RUNS = 16
+_query_indexes = OrderedDict()
+
+# Filter combinations whose matching records are remembered per run index.
+QUERY_FILTERS_KEPT = 32
+
+
+def _query_index(run_name, brands_data):
+    fingerprint = run_fingerprint(run_name, brands_data)
+    cached = _query_indexes.get(run_name)
+    if cached and cached[0] == fingerprint:
+        _query_indexes.move_to_end(run_name)
+        return cached[1]
+
+    target = brands_data["target"]
+    analysis, store = _build_analysis(run_name, brands_data)
+    records = get_query_details(analysis, run_name, {int(qid): q for qid, q in store["questions"].items()})
+    facts = [
+        {
+            provider: (
+                data["winner"],
+                data["winner"] == target,
+                frozenset(b["brand"] for b in data["brands"] if b["found"]),
+            )
+            for provider, data in record["providers"].items()
+        }
+        for record in records
+    ]
+    index = {"records": records, "facts": facts, "ids": [r["question_id"] for r in records], "matches": OrderedDict()}
+
+    _query_indexes[run_name] = (fingerprint, index)
+    _query_indexes.move_to_end(run_name)
+    while len(_query_indexes) > QUERY_INDEX_RUNS:
+        _query_indexes.popitem(last=False)
+    return index
+
+
+def encode_cursor(question_id):
+    return base64.urlsafe_b64encode(json.dumps({"after": question_id}).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        after = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))["after"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(after, int) or isinstance(after, bool):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return after
+
+
+def _matches(record, facts, category, provider, winner, target_lost, brand_found):
+    if category is not None and record["category"] != category:
+        return False
+    if provider is not None:
+        if provider not in facts:
+            return False
+        facts = {provider: facts[provider]}
+    if winner is not None and not any(w == winner for w, _, _ in facts.values()):
+        return False
+    if target_lost is not None and any(not won for _, won, _ in facts.values()) != target_lost:
+        return False
+    if brand_found is not None and not any(brand_found in found for _, _, found in facts.values()):
+        return False
+    return True
+
+
+def _matching(index, filters):
+    """(positions, question ids) of the index records passing `filters`, remembered per filter combination."""
+    matches = index["matches"]
+    if filters in matches:
+        matches.move_to_end(filters)
+        return matches[filters]
+    positions = [
+        position for position, (record, facts) in enumerate(zip(index["records"], index["facts"]))
+        if _matches(record, facts, *filters)
+    ]
+    matches[filters] = (positions, [index["ids"][p] for p in positions])
+    while len(matches) > QUERY_FILTERS_KEPT:
+        matches.popitem(last=False)
+    return matches[filters]
+
+
+def query_page(run_name, category=None, provider=None, winner=None, target_lost=None,
+               brand_found=None, fields=None, cursor=None, limit=50):
+    """One page of a run's query details, filtered and projected.
+
+    Filters are ANDed; `winner`, `target_lost` and `brand_found` hold if any
+    provider (or just `provider`, when given) satisfies them. With a
+    `provider` filter only that provider's results are returned.
+    """
+    fields = list(fields or QUERY_FIELDS)
+    unknown = [f for f in fields if f not in QUERY_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    limit = max(1, min(limit, QUERY_PAGE_MAX))
+
+    index = _query_index(run_name, load_brands())
+    positions, ids = _matching(index, (category, provider, winner, target_lost, brand_found))
+    start = bisect.bisect_right(ids, decode_cursor(cursor)) if cursor else 0
+
+    items = []
+    for position in positions[start:start + limit]:
+        record = index["records"][position]
+        item = {field: record[field] for field in fields}
+        if provider is not None and "providers" in item:
+            item["providers"] = {provider: record["providers"][provider]}
+        items.append(item)
+
+    has_more = start + limit < len(positions)
+    return {
+        "items": items,
+        "total": len(positions),
+        "next_cursor": encode_cursor(ids[start + limit - 1]) if has_more else None,
+    }
+
+
+COMPARE_MAX_RUNS = 50
+COMPARE_WORKERS = 8
+
+# Summary, provider and category aggregates of recently compared runs. They
+# are a few KB per run, so far more runs fit here than in the query index.
+RUN_AGGREGATES_RUNS = 128
+_run_aggregates = OrderedDict()
+_run_aggregates_lock = threading.Lock()
+
+
+def run_aggregates(run_name, brands_data=None):
+    """A run's summary, provider and category views, cached by run_fingerprint()."""
+    brands_data = brands_data or load_brands()
+    fingerprint = run_fingerprint(run_name, brands_data)
+    with _run_aggregates_lock:
+        cached = _run_aggregates.get(run_name)
+        if cached and cached[0] == fingerprint:
+            _run_aggregates.move_to_end(run_name)
+            return cached[1]
+
+    target = brands_data["target"]
+    analysis, _ = _build_analysis(run_name, brands_data)
+    aggregates = {
+        "summary": get_run_summary(analysis, target),
+        "providers": get_provider_comparison(analysis, target),
+        "categories": get_category_performance(analysis, target),
+    }
+
+    with _run_aggregates_lock:
+        _run_aggregates[run_name] = (fingerprint, aggregates)
+        _run_aggregates.move_to_end(run_name)
+        while len(_run_aggregates) > RUN_AGGREGATES_RUNS:
+            _run_aggregates.popitem(last=False)
+    return aggregates
+
+
+def _union(lists):
+    seen = {}
+    for values in lists:
+        for value in values:
+            seen.setdefault(value, None)
+    return list(seen)
+
+
+def _aligned(views, names_key, fields, names):
+    """{name: {field: [value per run]}} from per-run parallel arrays, None where a run lacks `name`."""
+    positions = [{name: i for i, name in enumerate(view[names_key])} for view in views]
+    return {
+        name: {
+            field: [view[field][pos[name]] if name in pos else None for view, pos in zip(views, positions)]
+            for field in fields
+        }
+        for name in names
+    }
+
+
+def compare_many(run_names):
+    """Aggregates of several runs aligned into per-run arrays for charting.
+
+    Runs are aggregated concurrently and every series has one entry per run,
+    in the order given; a run without a provider or category gets None there.
+    Raises FileNotFoundError for an unknown run.
+    """
+    run_names = list(dict.fromkeys(run_names))
+    brands_data = load_brands()
+    with ThreadPoolExecutor(max_workers=max(1, min(COMPARE_WORKERS, len(run_names)))) as pool:
+        aggregates = list(pool.map(lambda name: run_aggregates(name, brands_data), run_names))
+
+    summaries = [a["summary"] for a in aggregates]
+    providers = [a["providers"] for a in aggregates]
+    categories = [a["categories"] for a in aggregates]
+
+    brand_names = _union([[brands_data["target"]] + brands_data["competitors"]] + [
+        [b["brand"] for b in s["brands"]] for s in summaries
+    ])
+    by_brand = [{b["brand"]: b for b in s["brands"]} for s in summaries]
+    provider_names = _union(p["providers"] for p in providers)
+    category_names = _union(c["categories"] for c in categories)
+
+    index = run_index.load_index(RESULTS_DIR)
+    entries = index["runs"] if index else {}
+    return {
+        "target": brands_data["target"],
+        "runs": [
+            {"name": name, "label": get_run_label(name), "created": entries.get(name, {}).get("created")}
+            for name in run_names
+        ],
+        "total_queries": [s["total_queries"] for s in summaries],
+        "total_completions": [s["total_completions"] for s in summaries],
+        "brands": {
+            brand: {
+                field: [b.get(brand, {}).get(field) for b in by_brand]
+                for field in ("mentions", "found_in", "wins", "avg_score")
+            }
+            for brand in brand_names
+        },
+        "providers": _aligned(providers, "providers", ("mentions", "found_in", "wins", "avg_scores"), provider_names),
+        "categories": _aligned(categories, "categories", ("win_rates", "total_queries", "target_wins"), category_names),
+    }
+
+
+def _trend_entry(run_name, brands_data):
+    analysis, _ = _build_analysis(run_name, brands_data)
+    # Building the analysis can write the run's mention store, so fingerprint after it.
+    return {"fingerprint": run_fingerprint(run_name, brands_data), "point": trends.run_point(analysis)}
+
+
+def record_run_trend(run_name, brands=None):
+    """Record a run's totals in the trend store once its analysis is done.
+
+    `brands` is the (target, aliases, {competitor: aliases}) tuple the run
+    was analyzed with; it defaults to the active config.
+    """
+    brands_data = load_brands() if brands is None else _brands_data(*brands)
+    trends.record_runs(RESULTS_DIR, {run_name: _trend_entry(run_name, brands_data)})
+
+
+def get_trends(brands=None):
+    """Per-run series of brand totals across the run history, oldest run first.
+
+    Only runs made for the current target brand (or made before runs recorded
+    their brand) are included. Runs missing from the trend store, or recorded
+    under other aliases, are recorded first.
+    """
+    brands_data = load_brands()
+    target = brands_data["target"]
+    indexed = run_index.list_indexed_runs(RESULTS_DIR) if RESULTS_DIR.exists() else []
+    runs = sorted(
+        (r for r in indexed if r["brand"] in (None, target)),
+        key=lambda r: (r["created"], r["name"]),
+    )
+
+    stored = trends.load_trends(RESULTS_DIR)
+    stale = {}
+    for run in runs:
+        name = run["name"]
+        entry = stored.get(name)
+        if entry is None or entry["fingerprint"] != run_fingerprint(name, brands_data):
+            stale[name] = _trend_entry(name, brands_data)
+    if stale:
+        # Drop entries of deleted runs while writing anyway.
+        trends.record_runs(RESULTS_DIR, stale, keep={r["name"] for r in indexed})
+        stored = trends.load_trends(RESULTS_DIR)
+
+    return {
+        "target": target,
+        "runs": [{"name": r["name"], "label": r["label"], "created": r["created"]} for r in runs],
+        **trends.series(
+            [stored[r["name"]]["point"] for r in runs],
+            brands or [target] + brands_data["competitors"],
+        ),
+    }
@@ -0,0 +1,54 @@
+"""Conditional GET support for the run endpoints.
+
+Run data only changes when a run's output files or the brand aliases it is
+analyzed with change, both of which `data_loader.run_fingerprint()` tracks.
+Responses carry an ETag built from that fingerprint (plus the request's query
+string, since filters and sections change the body), and a matching
+`If-None-Match` is answered with an empty 304 before anything is loaded.
+"""
+
+import hashlib
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Derived views depend on the brand config, which can change at any time, so
+# browsers must revalidate (a cheap 304) before reusing them.
+REVALIDATE = "no-cache"
+
+# Raw outputs of a finished run are written once and never touched again.
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _matches(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Proxies may weaken the tag (W/"...") after compressing the body.
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return etag in tags
+
+
+def cached_response(request: Request, etag, build, cache_control=REVALIDATE):
+    """304 if the client already holds `etag`, otherwise the JSON `build()` returns.
+
+    `build` is only called on a miss. If it returns a Response (an error),
+    that is sent unchanged and without caching headers. An `etag` of None
+    (nothing to fingerprint, e.g. an unknown run) skips caching altogether.
+    """
+    if etag is None:
+        return build()
+    if _matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    payload = build()
+    if isinstance(payload, Response):
+        return payload
+    return JSONResponse(jsonable_encoder(payload), headers={"ETag": etag, "Cache-Control": cache_control})
@@ -0,0 +1,93 @@
+"""Onboarding requests as background jobs.
+
+An onboarding waits several seconds on Anthropic, which held the HTTP request
+open long enough for reverse proxies to time it out. The endpoints now only
+start a job and return its id; the job runs as a task on the server's event
+loop, stores partial results as they arrive (the placeholder suggestion, then
+the translated templates) and is polled for status. A request identical to
+one still in flight joins that job instead of starting another.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from collections import OrderedDict
+
+from src.onboarding import generate_placeholders, regenerate_competitors
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for status polls; older ones are forgotten.
+FINISHED_JOBS_KEPT = 50
+
+FINISHED_STATUSES = ("done", "failed")
+
+jobs = OrderedDict()
+
+# Request key -> id of the job still working on it.
+_inflight = {}
+
+# Strong references, so running jobs are not garbage collected mid-flight.
+_tasks = set()
+
+
+def _request_key(kind, params):
+    return json.dumps([kind, params], sort_keys=True, ensure_ascii=False)
+
+
+def _forget_finished():
+    finished = [i for i, job in jobs.items() if job["status"] in FINISHED_STATUSES]
+    for job_id in finished[:max(0, len(finished) - FINISHED_JOBS_KEPT)]:
+        del jobs[job_id]
+
+
+async def _run(job, key, work):
+    job["status"] = "running"
+    try:
+        job["result"] = await work(lambda stage, value: job["partial"].__setitem__(stage, value))
+        job["status"] = "done"
+    except Exception as e:
+        logger.error(f"Onboarding job {job['id']} failed: {e}")
+        job.update(status="failed", error=str(e))
+    finally:
+        _inflight.pop(key, None)
+
+
+def submit(kind, params, work):
+    """Start `work(progress)` as a job, or return the in-flight job for identical `params`.
+
+    Must be called from the event loop the job should run on.
+    """
+    key = _request_key(kind, params)
+    running = jobs.get(_inflight.get(key))
+    if running is not None:
+        return running
+    job = {"id": uuid.uuid4().hex[:12], "kind": kind, "status": "queued", "partial": {}, "result": None, "error": None}
+    jobs[job["id"]] = job
+    _inflight[key] = job["id"]
+    _forget_finished()
+    task = asyncio.create_task(_run(job, key, work))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+
+def start_onboarding(brand_name, description, language, market):
+    params = {"brand_name": brand_name, "description": description, "language": language, "market": market}
+    return submit("onboard", params, lambda progress: generate_placeholders(**params, progress=progress))
+
+
+def start_competitors(brand_name, description, language, market, exclude):
+    params = {
+        "brand_name": brand_name,
+        "description": description,
+        "language": language,
+        "market": market,
+        "exclude": list(exclude or []),
+    }
+
+    async def work(progress):
+        return {"competitors": await regenerate_competitors(**params)}
+
+    return submit("competitors", params, work)
@@ -3,37 +3,57 @@
 `generate_all_queries()` fires one LLM call per query category (7 total) every
 time it is invoked. Both the `/api/queries/preview` endpoint and `execute_run()`
 need the same list, so without a cache a single session regenerates it several
-times over. This module wraps the generator with a fingerprint of the brand
-config inputs that actually feed `build_prompt()`, so identical inputs reuse the
-previous result and any config edit forces a fresh generation.
+times over. This module caches each category's queries under a fingerprint of
+the inputs that feed that category's `build_prompt()` call, so identical inputs
+reuse the previous result and a config edit only regenerates the categories
+whose prompt it actually changes.
+
+Several fingerprints are kept at once, so switching back and forth between
+brand configs keeps hitting the cache.
 """
 
 import asyncio
+import hashlib
 import json
+import os
+import weakref
+from collections import OrderedDict
 from pathlib import Path
 
+from src import queries_generator
 from src.config_loader import load_brand_config
-from src.queries_generator import generate_all_queries
+from src.queries_generator import CATEGORIES, category_inputs, number_queries
 
-_cache = {
-    "fingerprint": None,
-    "queries": None,
-}
+# Per-category query lists by fingerprint, least recently used first. Room for
+# every category of a handful of configs.
+MAX_ENTRIES = 64
+_cache = OrderedDict()
 
-_lock = asyncio.Lock()
+# Generations in flight per event loop, by fingerprint. A caller needing a
+# category that is already being generated waits on the same task, so
+# concurrent previews and runs never generate it twice, and nobody holds a
+# lock while a slow consumer reads its results.
+_generating = weakref.WeakKeyDictionary()
 
 # The in-process cache is empty after every server restart (and every --reload
 # reload), which made the first page load pay the full ~6s generation again even
-# though nothing about the brand config had changed. Mirror the cache to disk so
-# a restart reuses the previous result.
-CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "entries" / "query_cache.json"
+# though nothing about the brand config had changed. Mirror the cache to disk,
+# one file per fingerprint, so a restart reuses previous results. File mtimes
+# track recency for eviction.
+CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "entries" / "query_cache"
+
+
+def _cache_file(fingerprint):
+    return CACHE_DIR / f"{hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]}.json"
 
 
 def _read_disk_cache(fingerprint):
-    """Queries previously generated for this fingerprint, or None."""
+    """Category queries previously generated for this fingerprint, or None."""
+    path = _cache_file(fingerprint)
     try:
-        with CACHE_PATH.open("r", encoding="utf-8") as fh:
+        with path.open("r", encoding="utf-8") as fh:
             stored = json.load(fh)
+        os.utime(path)
     except (FileNotFoundError, json.JSONDecodeError, OSError):
         return None
     if stored.get("fingerprint") != fingerprint:
@@ -43,52 +63,103 @@ def _read_disk_cache(fingerprint):
 
 
 def _write_disk_cache(fingerprint, queries):
+    path = _cache_file(fingerprint)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
     try:
-        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
-        with CACHE_PATH.open("w", encoding="utf-8") as fh:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with tmp_path.open("w", encoding="utf-8") as fh:
             json.dump({"fingerprint": fingerprint, "queries": queries}, fh, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        files = sorted(CACHE_DIR.glob("*.json"), key=lambda f: f.stat().st_mtime_ns)
+        for stale in files[:max(0, len(files) - MAX_ENTRIES)]:
+            stale.unlink()
     except OSError:
         pass
 
 
-def compute_fingerprint(cfg=None):
-    """Stable string built from every brand-config value used in the prompts."""
-    cfg = cfg if cfg is not None else load_brand_config()
-    language = cfg["language"]
-    placeholders = cfg["placeholders"]
-    payload = {
-        "language": language,
-        "market": cfg.get("market") or language,
-        "description": cfg["description"],
-        "use_cases": placeholders["use_cases"],
-        "category_noun": placeholders["category_noun"],
-        "category_plural": placeholders["category_plural"],
-    }
-    return json.dumps(payload, sort_keys=True, ensure_ascii=False)
-
-
-async def get_queries():
-    """Return the generated query list, reusing the cache when inputs are unchanged."""
-    async with _lock:
-        fingerprint = compute_fingerprint()
-        if fingerprint == _cache["fingerprint"] and _cache["queries"] is not None:
-            return _cache["queries"]
-
-        queries = _read_disk_cache(fingerprint)
-        if queries is None:
-            queries = await generate_all_queries()
-            _write_disk_cache(fingerprint, queries)
+def _remember(fingerprint, queries):
+    _cache[fingerprint] = queries
+    _cache.move_to_end(fingerprint)
+    while len(_cache) > MAX_ENTRIES:
+        _cache.popitem(last=False)
 
-        _cache["fingerprint"] = fingerprint
-        _cache["queries"] = queries
-        return queries
 
+def compute_fingerprint(cfg, cat_name):
+    """Stable string built from every value used in one category's prompt."""
+    return json.dumps(category_inputs(cfg, cat_name), sort_keys=True, ensure_ascii=False)
 
-def invalidate():
-    """Drop the cached queries (next call regenerates)."""
-    _cache["fingerprint"] = None
-    _cache["queries"] = None
-    try:
-        CACHE_PATH.unlink()
-    except OSError:
-        pass
+
+def _cached(fingerprint):
+    if fingerprint in _cache:
+        _cache.move_to_end(fingerprint)
+        return _cache[fingerprint]
+    queries = _read_disk_cache(fingerprint)
+    if queries is not None:
+        _remember(fingerprint, queries)
+    return queries
+
+
+async def _generate(cfg, cat_name, fingerprint):
+    queries = await queries_generator.generate_category(cfg, cat_name)
+    if queries:
+        _write_disk_cache(fingerprint, queries)
+        _remember(fingerprint, queries)
+    return queries
+
+
+def _generation(cfg, cat_name, fingerprint):
+    """The task generating `fingerprint`'s queries, started unless one is already in flight.
+
+    It runs to completion even if every caller stops waiting, so its result
+    still lands in the cache.
+    """
+    generating = _generating.setdefault(asyncio.get_running_loop(), {})
+    task = generating.get(fingerprint)
+    if task is None:
+        task = asyncio.ensure_future(_generate(cfg, cat_name, fingerprint))
+        generating[fingerprint] = task
+
+        def finished(t):
+            generating.pop(fingerprint, None)
+            # Retrieve the outcome so a failure nobody is waiting for any more isn't reported as unhandled.
+            if not t.cancelled():
+                t.exception()
+
+        task.add_done_callback(finished)
+    return task
+
+
+async def iter_queries(cfg=None, regenerate=()):
+    """Yield (category, query strings) for every category as soon as it is available.
+
+    Cached categories whose inputs are unchanged come first, then generated
+    ones in the order their answers arrive. `cfg` is the brand config to
+    generate for, by default the active one. Categories named in
+    `regenerate` are generated afresh regardless.
+    """
+    cfg = cfg if cfg is not None else load_brand_config()
+    cached, pending = [], {}
+    for cat_name, _ in CATEGORIES:
+        fingerprint = compute_fingerprint(cfg, cat_name)
+        queries = None if cat_name in regenerate else _cached(fingerprint)
+        if queries is None:
+            pending[_generation(cfg, cat_name, fingerprint)] = cat_name
+        else:
+            cached.append((cat_name, queries))
+
+    for cat_name, queries in cached:
+        yield cat_name, queries
+    waiting = set(pending)
+    while waiting:
+        done, waiting = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            yield pending[task], task.result()
+
+
+async def get_queries(cfg=None, regenerate=()):
+    """Return the generated query list, reusing cached categories whose inputs are unchanged.
+
+    Arguments as for `iter_queries()`.
+    """
+    by_category = {cat_name: queries async for cat_name, queries in iter_queries(cfg, regenerate)}
+    return number_queries((cat_name, by_category[cat_name]) for cat_name, _ in CATEGORIES)
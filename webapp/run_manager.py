@@ -1,25 +1,35 @@
 from src.queries_generator import save_queries
 from . import query_cache
 from . import data_loader
-from src.query_runner import QueryOutput, generate_summary
+from src.query_runner import QueryOutput, append_summary, generate_summary
 from datetime import datetime
 from src.llm_clients import ask_all_providers
-from src.mention_analyzer import load_answers, save_analysis, MentionsAnalyzer
-from src.config_loader import CONFIG
+from src.mention_analyzer import iter_answers, save_analysis, MentionsAnalyzer
+from src.config_loader import CONFIG, load_brand_config
+from src.run_index import refresh_run
+from src.query_dedup import drop_near_duplicates
+from src import query_registry
+from src.stream_cutoff import StreamCutoff, config_brands
+from functools import partial
 import os
 import json
 import asyncio
 
-active_run = {
-    "running": False,
-    "run_name": None,
-    "label": None,
-    "total": 0,
-    "completed": 0,
-    "current_query": None,
-    "error": None,
-    "cancel_requested": False
-}
+def new_run_state(run_id):
+    """Progress record of one queued run, as the SSE endpoint streams it."""
+    return {
+        "id": run_id,
+        "status": "queued",
+        "running": False,
+        "run_name": None,
+        "label": None,
+        "total": 0,
+        "completed": 0,
+        "current_query": None,
+        "error": None,
+        "cancel_requested": False,
+        "dropped": 0,
+    }
 
 
 def _current_brand():
@@ -32,66 +42,99 @@ def _default_label(brand_name=None):
     return f"{brand_name} #{existing + 1}"
 
 
-async def execute_run(query_ids=None, run_label=None):
-    active_run["running"] = True
-    active_run["run_name"] = None
-    active_run["label"] = None
-    active_run["completed"] = 0
-    active_run["total"] = 0
-    active_run["current_query"] = None
-    active_run["error"] = None
-    active_run["cancel_requested"] = False
+def _make_run_dir():
+    """Create a fresh run directory; concurrent runs can start within the same second."""
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    run_name = f"run_{timestamp}"
+    suffix = 1
+    while True:
+        run_dir = os.path.join("data/results", run_name)
+        try:
+            os.makedirs(run_dir)
+            return run_name, run_dir
+        except FileExistsError:
+            suffix += 1
+            run_name = f"run_{timestamp}_{suffix}"
+
+
+async def execute_run(query_ids=None, run_label=None, state=None, config=None):
+    """Run the queries of a brand config and analyze the answers.
+
+    Progress goes to `state` (default: a fresh `new_run_state()`). `config`
+    is the brand config to run, by default the active one at the time the
+    run starts.
+    """
+    state = state if state is not None else new_run_state(None)
+    state["running"] = True
+    state["run_name"] = None
+    state["label"] = None
+    state["completed"] = 0
+    state["total"] = 0
+    state["current_query"] = None
+    state["error"] = None
+    state["cancel_requested"] = False
+    state["dropped"] = 0
 
     try:
-        generated_qs = await query_cache.get_queries()
-        save_queries(generated_qs)
+        config = config if config is not None else load_brand_config()
+        # Near-duplicates are left out of the run; queries.json lists them under "dropped".
+        generated_qs, dropped = drop_near_duplicates(await query_cache.get_queries(config))
+        save_queries(generated_qs, config=config, dropped=dropped)
+        state["dropped"] = len(dropped)
 
         if query_ids:
-            generated_qs = [q for q in generated_qs if q["id"] in query_ids]
+            generated_qs = query_registry.select(generated_qs, query_ids, data_loader.ENTRIES_DIR / query_registry.REGISTRY_PATH.name)
 
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        run_name = f"run_{timestamp}"
-        run_dir = os.path.join("data/results", run_name)
-        os.makedirs(run_dir, exist_ok=True)
+        run_name, run_dir = _make_run_dir()
 
-        brand_name = _current_brand()
+        brand_name = config["target"]["name"] or "Run"
         label = (run_label or "").strip() or _default_label(brand_name)
         with open(os.path.join(run_dir, "meta.json"), "w", encoding="utf-8") as f:
             json.dump({"label": label, "brand": brand_name}, f, indent=2, ensure_ascii=False)
+        refresh_run(data_loader.RESULTS_DIR, run_name)
 
-        active_run["run_name"] = run_name
-        active_run["label"] = label
-        active_run["total"] = len(generated_qs)
+        state["run_name"] = run_name
+        state["label"] = label
+        state["total"] = len(generated_qs)
 
         parallel_workers = CONFIG["query_runner"]["parallel_workers"]
         semaphore = asyncio.Semaphore(parallel_workers)
+        # Streamed answers watch for the config's brands, to stop reading once they have placed.
+        new_cutoff = partial(StreamCutoff.from_config, brands=config_brands(config))
 
         async def process_one(query):
             async with semaphore:
-                if active_run["cancel_requested"]:
+                if state["cancel_requested"]:
                     return
-                active_run['current_query'] = query['query']
-                responses = await ask_all_providers(query['query'])
+                state['current_query'] = query['query']
+                responses = await ask_all_providers(query['query'], new_cutoff=new_cutoff)
 
                 output = QueryOutput(query['id'], query['query'], query['category'], responses)
                 output_path = os.path.join(run_dir, f"output_{query['id']}.json")
                 with open(output_path, "w", encoding="utf-8") as f:
                     json.dump(output.to_dict(), f, indent=4, ensure_ascii=False)
+                append_summary(run_dir, output.to_dict())
 
-                active_run['completed'] += 1
+                state['completed'] += 1
 
         await asyncio.gather(*(process_one(query) for query in generated_qs))
+        # Indexed at start and end only; the API's reconciler shows progress in between.
+        refresh_run(data_loader.RESULTS_DIR, run_name)
 
-        active_run['current_query'] = 'Analyzing results...'
+        state['current_query'] = 'Analyzing results...'
         generate_summary(run_dir=run_dir)
-        answers = load_answers(run_name)
         analyzer = MentionsAnalyzer()
-        results = analyzer.mention_analyzer(answers)
-        save_analysis(results, run_name)
+        brands = (
+            config["target"]["name"],
+            config["target"]["aliases"],
+            {c["name"]: c["aliases"] for c in config["competitors"]},
+        )
+        save_analysis(analyzer.iter_analysis(iter_answers(run_name), brands), run_name)
+        data_loader.record_run_trend(run_name, brands)
 
     except Exception as e:
-        active_run['error'] = str(e)
+        state['error'] = str(e)
 
     finally:
-        active_run['running'] = False
-        active_run["cancel_requested"] = False
+        state['running'] = False
+        state["cancel_requested"] = False
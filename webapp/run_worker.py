@@ -0,0 +1,277 @@
+"""Executes queued runs in a separate worker process.
+
+A run's file writes, summary and mention analysis are synchronous and, run
+inside the API server's event loop, stalled every request while a run was
+finishing. The server now only queues jobs for a worker process and mirrors
+the progress it reports back into one state dict per run (see
+`run_manager.new_run_state()`), which the SSE endpoint streams.
+
+The worker executes up to `query_runner.concurrent_runs` runs at once in a
+single event loop, so they share the per-provider limiters in
+`llm_clients`. For each run a companion task snapshots its state and sends
+every change back over a queue; cancellation travels the other way on a
+control queue.
+
+Submissions run in a thread (they load the brand config), progress is applied
+in another, and the endpoints read on the event loop, so the run table is
+guarded by a lock and readers work on snapshots of it.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+
+from src.config_loader import CONFIG, load_brand_config
+from src.llm_clients import client_pool, coalescing_stats
+from . import run_manager
+
+logger = logging.getLogger(__name__)
+
+# How often the worker checks a run's state for changes to report.
+PROGRESS_INTERVAL = 0.25
+
+# Finished runs kept for status queries; older ones are forgotten.
+FINISHED_RUNS_KEPT = 50
+
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+
+def concurrent_runs():
+    return max(1, int(CONFIG["query_runner"].get("concurrent_runs", 1)))
+
+
+async def _run_job(job, events, cancelled, runner):
+    run_id = job["id"]
+    state = run_manager.new_run_state(run_id)
+    done = asyncio.Event()
+
+    async def publish():
+        last = None
+        while True:
+            finished = done.is_set()
+            if run_id in cancelled:
+                state["cancel_requested"] = True
+            snapshot = dict(state)
+            if snapshot != last:
+                events.put(snapshot)
+                last = snapshot
+            if finished:
+                return
+            await asyncio.sleep(PROGRESS_INTERVAL)
+
+    if run_id in cancelled:
+        cancelled.discard(run_id)
+        state["status"] = "cancelled"
+        events.put(dict(state))
+        return
+
+    state["status"] = "running"
+    publisher = asyncio.create_task(publish())
+    try:
+        await runner(job.get("query_ids"), job.get("run_label"), state=state, config=job.get("config"))
+    except Exception as e:
+        logger.error(f"Run {run_id} failed: {e}")
+        state.update(running=False, error=str(e))
+    finally:
+        if state["error"]:
+            state["status"] = "failed"
+        elif run_id in cancelled:
+            state["status"] = "cancelled"
+        else:
+            state["status"] = "done"
+        cancelled.discard(run_id)
+        done.set()
+        await publisher
+        logger.info(f"Run {run_id} finished; LLM request coalescing so far: {coalescing_stats()}")
+
+
+async def _serve(jobs, controls, events, runner, max_runs):
+    cancelled = set()
+    slots = asyncio.Semaphore(max_runs)
+    running = set()
+
+    async def read_controls():
+        while True:
+            message = await asyncio.to_thread(controls.get)
+            if message is None:
+                return
+            cancelled.add(message["cancel"])
+
+    control_reader = asyncio.create_task(read_controls())
+    while True:
+        job = await asyncio.to_thread(jobs.get)
+        if job is None:
+            break
+        # Further jobs stay in the queue (and "queued") until a slot frees up.
+        await slots.acquire()
+        task = asyncio.create_task(_run_job(job, events, cancelled, runner))
+        running.add(task)
+        task.add_done_callback(lambda t: (running.discard(t), slots.release()))
+    await asyncio.gather(*running)
+    await control_reader
+
+
+async def _serve_with_clients(jobs, controls, events, runner, max_runs):
+    async with client_pool():
+        await _serve(jobs, controls, events, runner, max_runs)
+
+
+def worker_main(jobs, controls, events, runner=None, max_runs=None):
+    """Worker process entry point: execute queued jobs until a None job arrives."""
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve_with_clients(jobs, controls, events, runner or run_manager.execute_run, max_runs or concurrent_runs()))
+
+
+class RunWorker:
+    """Server-side handle on the worker process, its queues and the run states."""
+
+    def __init__(self):
+        # Spawn rather than fork: the server has an event loop and threads running.
+        self._ctx = multiprocessing.get_context("spawn")
+        self.jobs = self._ctx.Queue()
+        self.controls = self._ctx.Queue()
+        self.events = self._ctx.Queue()
+        self.process = None
+        self.runs = OrderedDict()
+        # Jobs of runs not finished yet, to requeue them if the worker dies.
+        self._jobs = {}
+        self._stopping = False
+        # Guards `runs` and `_jobs`; `_process_lock` keeps two threads from each starting a worker.
+        self._lock = threading.Lock()
+        self._process_lock = threading.Lock()
+
+    def start(self):
+        with self._process_lock:
+            if self.process is not None and self.process.is_alive():
+                return
+            self._stopping = False
+            self.process = self._ctx.Process(
+                target=worker_main, args=(self.jobs, self.controls, self.events), name="run-worker", daemon=True
+            )
+            self.process.start()
+
+    def submit(self, query_ids=None, run_label=None, config=None):
+        """Queue a run of `config` (default: the active brand config) and return its state."""
+        run_id = uuid.uuid4().hex[:12]
+        state = run_manager.new_run_state(run_id)
+        job = {
+            "id": run_id,
+            "query_ids": query_ids,
+            "run_label": run_label,
+            "config": config if config is not None else load_brand_config(),
+        }
+        self.start()
+        # Registered and queued together, so a recovery in between cannot drain the job yet keep the run.
+        with self._lock:
+            self.runs[run_id] = state
+            self._jobs[run_id] = job
+            self.jobs.put(job)
+            self._forget_finished()
+        return state
+
+    def cancel(self, run_id):
+        with self._lock:
+            state = self.runs.get(run_id)
+            if state is None or state["status"] in FINISHED_STATUSES:
+                return False
+            state["cancel_requested"] = True
+        self.controls.put({"cancel": run_id})
+        return True
+
+    def get(self, run_id):
+        with self._lock:
+            return self.runs.get(run_id)
+
+    def states(self):
+        """Copies of every known run's state, oldest submission first."""
+        with self._lock:
+            return [dict(state) for state in self.runs.values()]
+
+    def latest(self):
+        """State of the most recently submitted run, or None."""
+        with self._lock:
+            return next(reversed(self.runs.values()), None)
+
+    def is_active(self, run_name):
+        with self._lock:
+            return any(s["run_name"] == run_name and s["status"] == "running" for s in self.runs.values())
+
+    def _forget_finished(self):
+        # Callers hold `_lock`.
+        finished = [i for i, s in self.runs.items() if s["status"] in FINISHED_STATUSES]
+        for run_id in finished[:max(0, len(finished) - FINISHED_RUNS_KEPT)]:
+            del self.runs[run_id]
+        for run_id in [i for i in self._jobs if i not in self.runs or self.runs[i]["status"] in FINISHED_STATUSES]:
+            del self._jobs[run_id]
+
+    def _recover(self):
+        """After the worker died: fail the runs it was executing and requeue the ones still waiting.
+
+        Jobs left on the queue are drained first, so a respawned worker never
+        runs a job whose state was already reported as failed.
+        """
+        with self._lock:
+            while True:
+                try:
+                    self.jobs.get(timeout=0.05)
+                except queue.Empty:
+                    break
+            waiting = []
+            for run_id, state in self.runs.items():
+                if state["status"] == "running" or (state["status"] == "queued" and self._stopping):
+                    state.update(status="failed", running=False, error="Run worker exited unexpectedly")
+                elif state["status"] == "queued":
+                    if state["cancel_requested"]:
+                        state.update(status="cancelled")
+                    else:
+                        waiting.append(self._jobs[run_id])
+            self._forget_finished()
+            for job in waiting:
+                self.jobs.put(job)
+        if waiting:
+            logger.warning(f"Run worker exited unexpectedly; requeued {len(waiting)} waiting run(s)")
+            self.start()
+
+    def poll(self, timeout=1.0):
+        """Apply the next progress report to its run's state. Returns False if none arrived."""
+        try:
+            snapshot = self.events.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                pending = any(s["status"] in ("queued", "running") for s in self.runs.values())
+            if pending and (self.process is None or not self.process.is_alive()):
+                self._recover()
+            return False
+        with self._lock:
+            state = self.runs.get(snapshot["id"])
+            if state is not None:
+                # A cancel requested here may not have reached the worker's last snapshot yet.
+                cancel_requested = state["cancel_requested"] and snapshot["status"] in ("queued", "running")
+                state.update(snapshot)
+                state["cancel_requested"] = state["cancel_requested"] or cancel_requested
+        return True
+
+    async def pump(self):
+        """Mirror progress reports into the run states for as long as the server runs."""
+        while True:
+            await asyncio.to_thread(self.poll)
+
+    def stop(self, timeout=5):
+        self._stopping = True
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            with self._lock:
+                run_ids = list(self.runs)
+            for run_id in run_ids:
+                self.cancel(run_id)
+            self.jobs.put(None)
+            self.controls.put(None)
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.process = None